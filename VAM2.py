@@ -1,16 +1,33 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import requests
 import io
-import streamlit.components.v1 as components
-import plotly.graph_objects as go
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
 
+from vogel import vogel_approximation_method, transportation_simplex, generate_excel, plot_sankey, run_portfolio
+from vogel import SANKEY_TOP_K, WEBGL_LANES
+from vogel import STREAMING_CELLS, export_lanes, generate_excel_streaming
+from vogel import FeedbackQueue
+from vogel import sample_scenarios, solve_scenarios
+from vogel import sensitivity_analysis, sensitivity_frames
+from vogel import Diagnostics, enable_json_logging
+from vogel import ResultCache, instance_key
+from vogel import RunStore
+from vogel import kpi_cube, kpi_frames
+from vogel import DISTANCE_METRICS, build_costs, coordinates_key, distance_matrix, read_sites
+from vogel import instance_frames, load_instance, read_matrix, read_vector, split_instance, validate_instance
+
 # --- CONFIGURATION TELEGRAM ---
 TOKEN = st.secrets.get("TELEGRAM_TOKEN", "")
 CHAT_ID = st.secrets.get("TELEGRAM_CHAT_ID", "")
 
+# Largest manual instance; the editors keep their values at this size.
+MAX_MANUAL = 10
+
 st.set_page_config(
     page_title="VOGEL SYSTEM",
     page_icon="🚚",
@@ -21,6 +38,8 @@ st.set_page_config(
 # --- CSS MODERNE ET ÉLÉGANT ---
 st.markdown("""
 <style>
+@import url('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css');
+
 /* Variables globales */
 :root {
     --primary: #3B82F6;
@@ -237,276 +256,398 @@ with st.sidebar:
     # Paramètres
     st.markdown('<div class="glass-card" style="padding: 1.5rem;">', unsafe_allow_html=True)
     currency = st.selectbox("💱 Currency", ["€ Euro", "$ USD", "£ GBP", "¥ JPY", "₹ INR"])
-    num_sources = st.number_input("🏭 Suppliers", min_value=2, max_value=10, value=3)
-    num_dests = st.number_input("👥 Customers", min_value=2, max_value=10, value=3)
+    input_mode = st.radio("📥 Input", ["✏️ Manual entry", "📂 File import"], key="input_mode")
+    manual_input = input_mode == "✏️ Manual entry"
+    if manual_input:
+        # Defaults go through session state so a reloaded run can set them too.
+        st.session_state.setdefault("num_sources", 3)
+        st.session_state.setdefault("num_dests", 3)
+        num_sources = st.number_input("🏭 Suppliers", min_value=2, max_value=MAX_MANUAL, key="num_sources")
+        num_dests = st.number_input("👥 Customers", min_value=2, max_value=MAX_MANUAL, key="num_dests")
+    use_portfolio = st.toggle("🏁 Heuristic portfolio", key="use_portfolio",
+                              help="Race VAM, Russell, least-cost and north-west corner and start MODI from the best plan.")
+    portfolio_budget = None
+    if use_portfolio:
+        portfolio_budget = st.number_input("⏱️ Time budget (s)", min_value=0.1, max_value=60.0, value=2.0, step=0.5, key="portfolio_budget")
+    solve_budget = st.number_input(
+        "⏳ Solve budget (s)", min_value=0.0, max_value=3600.0, value=0.0, step=5.0, key="solve_budget",
+        help="0 solves to optimality; otherwise the best plan found within the budget is shown.",
+    ) or None
+    show_diagnostics = st.toggle("🩺 Diagnostics", key="show_diagnostics")
+    profile_run = trace_memory = False
+    if show_diagnostics:
+        profile_run = st.checkbox("cProfile capture", key="profile_run")
+        trace_memory = st.checkbox("tracemalloc peaks", key="trace_memory")
     st.markdown('</div>', unsafe_allow_html=True)
 
+# Stage timers are always on; profiling and memory tracing only when asked for.
+diagnostics = Diagnostics(profile=profile_run, memory=trace_memory)
+
 # --- Fonctions principales ---
-def send_telegram_feedback(name, message):
-    if not TOKEN or TOKEN == "TON_TOKEN_BOT_TELEGRAM":
+@st.cache_resource
+def get_result_cache():
+    # One cache for every session, so unchanged inputs are never solved twice.
+    return ResultCache(max_entries=32, ttl=3600)
+
+@st.cache_resource
+def get_run_store():
+    # Run history across sessions and restarts; identical inputs are answered from it.
+    return RunStore("vogel_runs.sqlite")
+
+def manual_values():
+    # What the manual editors hold, kept at MAX_MANUAL so resizing never drops values.
+    return st.session_state.setdefault("manual_values", {
+        "costs": np.zeros((MAX_MANUAL, MAX_MANUAL)),
+        "supply": np.zeros(MAX_MANUAL),
+        "demand": np.zeros(MAX_MANUAL),
+    })
+
+def load_run_into_editors(run_id):
+    # Button callback, so the widget values can still be set before they are drawn.
+    run = get_run_store().load(run_id)
+    n_rows, n_cols = run["costs"].shape
+    st.session_state.loaded_run = {key: run[key] for key in ("id", "costs", "supply", "demand", "source_names", "dest_names")}
+    st.session_state.run_optimization = False
+    st.session_state.reload_page = True
+    for key in ("costs_editor", "demand_editor"):
+        st.session_state.pop(key, None)
+    if 2 <= n_rows <= MAX_MANUAL and 2 <= n_cols <= MAX_MANUAL:
+        values = manual_values()
+        values["costs"][:n_rows, :n_cols] = run["costs"]
+        values["supply"][:n_rows] = run["supply"]
+        values["demand"][:n_cols] = run["demand"]
+        st.session_state.input_mode = "✏️ Manual entry"
+        st.session_state.num_sources = n_rows
+        st.session_state.num_dests = n_cols
+        for i, name in enumerate(run["source_names"]):
+            st.session_state[f"src_{i}"] = name
+        for j, name in enumerate(run["dest_names"]):
+            st.session_state[f"dst_{j}"] = name
+    else:
+        st.session_state.input_mode = "📂 File import"
+
+def show_progress(bar, state):
+    if state["stage"] == "vam":
+        bar.progress(min(float(state["allocated"]), 1.0),
+                     text=f"🧮 VAM · {state['allocated']:.0%} allocated · {state['elapsed']:.1f} s")
         return
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-    text = f"🚀 *New feedback on VAM app*\n\n*Name:* {name}\n*Message:* {message}"
+    objective, bound = state["objective"], state["bound"]
+    gap = (objective - bound) / abs(objective) if objective else 0.0
+    bar.progress(min(max(1.0 - gap, 0.0), 1.0), text=(
+        f"🔁 MODI · {state['pivots']} pivots · cost {objective:,.2f} · bound {bound:,.2f} · "
+        f"gap {gap:.1%} · {state['elapsed']:.1f} s"
+    ))
+
+def solve_with_progress(solve, inline=False):
+    # Runs solve(progress) off the script thread and mirrors its progress in a bar.
+    # The stop flag is set however the script leaves (a rerun included), so an
+    # abandoned solve ends at its next check instead of running on. inline=True
+    # keeps it on the script thread, where cProfile can see it.
+    bar = st.progress(0.0, text="🧠 Running optimization algorithm...")
+    if inline:
+        result = solve(lambda state: show_progress(bar, state))
+        bar.empty()
+        return result
+    updates = queue.Queue()
+    stop = threading.Event()
+
+    def progress(state):
+        updates.put(state)
+        return stop.is_set()
+
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vam-solve")
+    future = pool.submit(solve, progress)
     try:
-        requests.post(url, json={"chat_id": CHAT_ID, "text": text, "parse_mode": "Markdown"})
-    except:
-        pass
-
-def vogel_approximation_method(cost_matrix, supply, demand):
-    supply = np.array(supply, dtype=float)
-    demand = np.array(demand, dtype=float)
-    costs = np.array(cost_matrix, dtype=float)
-    
-    n_rows, n_cols = costs.shape
-    original_cols = n_cols
-    original_rows = n_rows
-    
-    if supply.sum() > demand.sum():
-        diff = supply.sum() - demand.sum()
-        demand = np.append(demand, diff)
-        costs = np.c_[costs, np.zeros(n_rows)] 
-        n_cols += 1
-    elif demand.sum() > supply.sum():
-        diff = demand.sum() - supply.sum()
-        supply = np.append(supply, diff)
-        costs = np.r_[costs, [np.zeros(n_cols)]]
-        n_rows += 1
-        
-    allocation = np.zeros((n_rows, n_cols))
-    costs_temp = costs.copy()
-    supply_temp = supply.copy()
-    demand_temp = demand.copy()
-    INF = 10**9 
-
-    while supply_temp.sum() > 0 and demand_temp.sum() > 0:
-        row_penalties = []
-        col_penalties = []
-
-        for r in range(n_rows):
-            if supply_temp[r] == 0:
-                row_penalties.append(-1)
-            else:
-                row_valid = [c for c in costs_temp[r, :] if c < INF]
-                if len(row_valid) >= 2:
-                    sorted_row = np.sort(row_valid)
-                    row_penalties.append(sorted_row[1] - sorted_row[0])
-                elif len(row_valid) == 1:
-                    row_penalties.append(row_valid[0])
-                else:
-                    row_penalties.append(-1)
-
-        for c in range(n_cols):
-            if demand_temp[c] == 0:
-                col_penalties.append(-1)
-            else:
-                col_valid = [costs_temp[r, c] for r in range(n_rows) if costs_temp[r, c] < INF]
-                if len(col_valid) >= 2:
-                    sorted_col = np.sort(col_valid)
-                    col_penalties.append(sorted_col[1] - sorted_col[0])
-                elif len(col_valid) == 1:
-                    col_penalties.append(col_valid[0])
-                else:
-                    col_penalties.append(-1)
-        
-        row_penalties = np.array(row_penalties)
-        col_penalties = np.array(col_penalties)
-        max_row_p = np.max(row_penalties)
-        max_col_p = np.max(col_penalties)
-        
-        if max_row_p >= max_col_p:
-            row_idx = np.argmax(row_penalties)
-            valid_cols = np.where(costs_temp[row_idx, :] < INF)[0]
-            if len(valid_cols) > 0:
-                col_idx = valid_cols[np.argmin(costs_temp[row_idx, valid_cols])]
-            else:
-                col_idx = np.argmax(demand_temp > 0)
-        else:
-            col_idx = np.argmax(col_penalties)
-            valid_rows = np.where(costs_temp[:, col_idx] < INF)[0]
-            if len(valid_rows) > 0:
-                row_idx = valid_rows[np.argmin(costs_temp[valid_rows, col_idx])]
-            else:
-                row_idx = np.argmax(supply_temp > 0)
-
-        qty = min(supply_temp[row_idx], demand_temp[col_idx])
-        allocation[row_idx, col_idx] = qty
-        supply_temp[row_idx] -= qty
-        demand_temp[col_idx] -= qty
-        
-        if supply_temp[row_idx] == 0:
-            costs_temp[row_idx, :] = INF
-        if demand_temp[col_idx] == 0:
-            costs_temp[:, col_idx] = INF
-
-    total_cost = np.sum(allocation[:original_rows, :original_cols] * costs[:original_rows, :original_cols])
-    return allocation[:original_rows, :original_cols], total_cost
-
-def generate_excel(input_df, demand_df, res_df, total_cost, currency):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        worksheet = workbook.add_worksheet('Rapport VAM')
-        writer.sheets['Rapport VAM'] = worksheet
-        
-        bold_fmt = workbook.add_format({'bold': True, 'font_size': 12})
-        title_fmt = workbook.add_format({'bold': True, 'font_size': 14, 'color': '#2c3e50'})
-        
-        row = 0
-        worksheet.write(row, 0, "1. Input Data", title_fmt)
-        row += 2
-        input_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
-        row += len(input_df) + 3
-        
-        worksheet.write(row, 0, "2. Customer Demand", title_fmt)
-        row += 2
-        demand_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
-        row += len(demand_df) + 4
-        
-        worksheet.write(row, 0, "3. Optimal Solution", title_fmt)
-        row += 2
-        res_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
-        row += len(res_df) + 3
-        
-        worksheet.write(row, 0, f"Total Minimum Cost: {total_cost:,.2f} {currency}", title_fmt)
-        
-    return output.getvalue()
-
-def plot_sankey(allocation_matrix, source_names, dest_names):
-    labels = source_names + dest_names
-    source_indices = []
-    target_indices = []
-    values = []
-    custom_data = []
-    n_sources = len(source_names)
-    
-    for r in range(allocation_matrix.shape[0]):
-        for c in range(allocation_matrix.shape[1]):
-            qty = allocation_matrix[r, c]
-            if qty > 0:
-                source_indices.append(r)
-                target_indices.append(n_sources + c)
-                values.append(qty)
-                custom_data.append(f"{source_names[r]} → {dest_names[c]}")
-    
-    fig = go.Figure(data=[go.Sankey(
-        node = dict(
-            pad = 15,
-            thickness = 20,
-            line = dict(color = "white", width = 0.5),
-            label = labels,
-            color = "#3B82F6"
-        ),
-        link = dict(
-            source = source_indices,
-            target = target_indices,
-            value = values,
-            color = "rgba(59, 130, 246, 0.4)",
-            customdata = custom_data,
-            hovertemplate='%{customdata}<br />Quantity: %{value}<extra></extra>'
-        ))])
-    fig.update_layout(
-        title_text="Supply Chain Flow",
-        font_size=14,
-        height=500,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        while not future.done() or not updates.empty():
+            try:
+                state = updates.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            while not updates.empty():
+                state = updates.get_nowait()
+            show_progress(bar, state)
+        return future.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
+        bar.empty()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def parse_uploaded_instance(files):
+    # files: ((name, bytes),) for one instance file, or cost matrix, supply and demand files.
+    if len(files) == 1:
+        name, data = files[0]
+        input_df, demand_df = load_instance(io.BytesIO(data), name)
+        return input_df, demand_df, validate_instance(*split_instance(input_df, demand_df))
+    (cost_name, cost_data), (supply_name, supply_data), (demand_name, demand_data) = files
+    costs, row_labels, col_labels = read_matrix(io.BytesIO(cost_data), cost_name)
+    supply = read_vector(io.BytesIO(supply_data), supply_name)
+    demand = read_vector(io.BytesIO(demand_data), demand_name)
+    errors = validate_instance(costs, supply, demand)
+    if errors:
+        return None, None, errors
+    input_df, demand_df = instance_frames(costs, supply, demand, row_labels, col_labels)
+    return input_df, demand_df, []
+
+@st.cache_resource
+def get_distance_cache():
+    # Distance matrices by coordinate hash, so new rates or fees reuse the geometry.
+    return ResultCache(max_entries=4, ttl=3600)
+
+def costs_from_sites(files, metric, rate, fixed_fee, max_distance):
+    # files: the supplier and customer site lists as (name, bytes).
+    (source_names, source_xy, supply), (dest_names, dest_xy, demand) = (
+        read_sites(io.BytesIO(data), name) for name, data in files
     )
-    return fig
+    if supply is None or demand is None:
+        raise ValueError("Both site files need a quantity column (supply and demand).")
+    with diagnostics.stage("distances"):
+        distances = get_distance_cache().get_or_compute(
+            coordinates_key(source_xy, dest_xy, metric),
+            lambda: distance_matrix(source_xy, dest_xy, metric)
+        )
+    with diagnostics.stage("costs"):
+        costs = build_costs(distances, rate, fixed_fee, max_distance)
+    return instance_frames(costs, supply, demand, source_names, dest_names)
+
+@st.cache_resource
+def get_feedback_queue():
+    # One delivery thread per server; the form only enqueues and returns.
+    return FeedbackQueue(TOKEN, CHAT_ID, spool_dir=".feedback_spool").start()
+
+def send_telegram_feedback(name, message):
+    if not TOKEN or TOKEN == "TON_TOKEN_BOT_TELEGRAM":
+        return
+    get_feedback_queue().submit(name, message)
 
 # --- SECTION 1: CONFIGURATION ---
-st.markdown("""
-<div class="glass-card">
-    <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
-        <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #3B82F6 0%, #8B5CF6 100%); 
-             border-radius: 12px; display: flex; align-items: center; justify-content: center;">
-            <i class="fas fa-users" style="color: white; font-size: 1.25rem;"></i>
-        </div>
-        <div>
-            <h3 style="color: #1F2937; margin: 0;">Entity Configuration</h3>
+@st.fragment
+def manual_inputs(num_sources, num_dests):
+    # Renaming and editing rerun only this fragment; the solver sees the changes on
+    # the next launch. Values live in session state, so a resize or a rename keeps
+    # them, and editors reset only when their rows or columns change.
+    st.markdown("""
+    <div class="glass-card">
+        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+            <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #3B82F6 0%, #8B5CF6 100%); 
+                 border-radius: 12px; display: flex; align-items: center; justify-content: center;">
+                <i class="fas fa-users" style="color: white; font-size: 1.25rem;"></i>
+            </div>
+            <div>
+                <h3 style="color: #1F2937; margin: 0;">Entity Configuration</h3>
+            </div>
         </div>
     </div>
-</div>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
-col1, col2 = st.columns(2)
-with col1:
-    with st.expander("🏭 Suppliers", expanded=True):
-        source_names = []
-        for i in range(num_sources):
-            source_names.append(st.text_input(
-                f"Supplier {i+1}",
-                value=f"Supplier {i+1}",
-                key=f"src_{i}"
-            ))
+    col1, col2 = st.columns(2)
+    with col1:
+        with st.expander("🏭 Suppliers", expanded=True):
+            source_names = []
+            for i in range(num_sources):
+                st.session_state.setdefault(f"src_{i}", f"Supplier {i+1}")
+                source_names.append(st.text_input(f"Supplier {i+1}", key=f"src_{i}"))
 
-with col2:
-    with st.expander("👥 Customers", expanded=True):
-        dest_names = []
-        for i in range(num_dests):
-            dest_names.append(st.text_input(
-                f"Customer {i+1}",
-                value=f"Customer {i+1}",
-                key=f"dst_{i}"
-            ))
-
-# --- SECTION 2: DATA INPUT ---
-st.markdown("""
-<div class="glass-card">
-    <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
-        <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #10B981 0%, #06B6D4 100%); 
-             border-radius: 12px; display: flex; align-items: center; justify-content: center;">
-            <i class="fas fa-database" style="color: white; font-size: 1.25rem;"></i>
-        </div>
-        <div>
-            <h3 style="color: #1F2937; margin: 0;">Cost & Capacity Matrix</h3>
+    with col2:
+        with st.expander("👥 Customers", expanded=True):
+            dest_names = []
+            for i in range(num_dests):
+                st.session_state.setdefault(f"dst_{i}", f"Customer {i+1}")
+                dest_names.append(st.text_input(f"Customer {i+1}", key=f"dst_{i}"))
+
+    # --- SECTION 2: DATA INPUT ---
+    st.markdown("""
+    <div class="glass-card">
+        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+            <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #10B981 0%, #06B6D4 100%); 
+                 border-radius: 12px; display: flex; align-items: center; justify-content: center;">
+                <i class="fas fa-database" style="color: white; font-size: 1.25rem;"></i>
+            </div>
+            <div>
+                <h3 style="color: #1F2937; margin: 0;">Cost & Capacity Matrix</h3>
+            </div>
         </div>
     </div>
-</div>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
-# Cost matrix
-costs_data = {}
-for dest in dest_names:
-    costs_data[dest] = [0.0] * num_sources
-
-df_costs = pd.DataFrame(costs_data, index=source_names)
-df_costs["SUPPLY CAPACITY"] = [0.0] * num_sources
-
-edited_costs = st.data_editor(
-    df_costs,
-    use_container_width=True,
-    key="costs_editor",
-    column_config={
-        "SUPPLY CAPACITY": st.column_config.NumberColumn(
-            "SUPPLY CAPACITY",
-            help="Production capacity of each supplier"
-        )
-    }
-)
+    values = manual_values()
+    df_costs = pd.DataFrame(values["costs"][:num_sources, :num_dests], index=source_names, columns=dest_names)
+    df_costs["SUPPLY CAPACITY"] = values["supply"][:num_sources]
 
-# Demand
-st.markdown("""
-<div class="glass-card">
-    <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
-        <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #F59E0B 0%, #EF4444 100%); 
-             border-radius: 12px; display: flex; align-items: center; justify-content: center;">
-            <i class="fas fa-shopping-cart" style="color: white; font-size: 1.25rem;"></i>
+    edited_costs = st.data_editor(
+        df_costs,
+        use_container_width=True,
+        key="costs_editor",
+        column_config={
+            "SUPPLY CAPACITY": st.column_config.NumberColumn(
+                "SUPPLY CAPACITY",
+                help="Production capacity of each supplier"
+            )
+        }
+    )
+    values["costs"][:num_sources, :num_dests] = edited_costs.iloc[:, :-1].to_numpy(dtype=float)
+    values["supply"][:num_sources] = edited_costs.iloc[:, -1].to_numpy(dtype=float)
+
+    # Demand
+    st.markdown("""
+    <div class="glass-card">
+        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+            <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #F59E0B 0%, #EF4444 100%); 
+                 border-radius: 12px; display: flex; align-items: center; justify-content: center;">
+                <i class="fas fa-shopping-cart" style="color: white; font-size: 1.25rem;"></i>
+            </div>
+            <div>
+                <h3 style="color: #1F2937; margin: 0;">Customer Demand</h3>
+            </div>
         </div>
-        <div>
-            <h3 style="color: #1F2937; margin: 0;">Customer Demand</h3>
+    </div>
+    """, unsafe_allow_html=True)
+
+    df_demand = pd.DataFrame([values["demand"][:num_dests]], index=["DEMAND"], columns=dest_names)
+    edited_demand = st.data_editor(df_demand, use_container_width=True, key="demand_editor")
+    values["demand"][:num_dests] = edited_demand.iloc[0].to_numpy(dtype=float)
+    return source_names, dest_names, edited_costs, edited_demand
+
+if manual_input:
+    source_names, dest_names, edited_costs, edited_demand = manual_inputs(num_sources, num_dests)
+else:
+    st.markdown("""
+    <div class="glass-card">
+        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+            <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #10B981 0%, #06B6D4 100%); 
+                 border-radius: 12px; display: flex; align-items: center; justify-content: center;">
+                <i class="fas fa-file-import" style="color: white; font-size: 1.25rem;"></i>
+            </div>
+            <div>
+                <h3 style="color: #1F2937; margin: 0;">Bulk Matrix Import</h3>
+            </div>
         </div>
     </div>
-</div>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
+    
+    import_layout = st.radio(
+        "File layout",
+        ["Single instance file", "Cost matrix + supply + demand files", "Site coordinates"],
+        horizontal=True,
+        key="import_layout"
+    )
+    if import_layout == "Single instance file":
+        uploads = (st.file_uploader(
+            "📄 Instance",
+            type=["csv", "parquet", "npz"],
+            help="CSV/Parquet with a SUPPLY CAPACITY column and a DEMAND row, or NPZ with costs, supply and demand arrays",
+            key="instance_file"
+        ),)
+    elif import_layout == "Site coordinates":
+        col1, col2 = st.columns(2)
+        site_help = "CSV with name, lat/lon (or x/y for plane coordinates) and quantity columns"
+        with col1:
+            supplier_sites = st.file_uploader("🏭 Supplier sites", type=["csv"], help=site_help, key="supplier_sites")
+        with col2:
+            customer_sites = st.file_uploader("👥 Customer sites", type=["csv"], help=site_help, key="customer_sites")
+        g1, g2, g3, g4 = st.columns(4)
+        distance_metric = g1.selectbox("Distance", DISTANCE_METRICS, key="distance_metric",
+                                       help="haversine: great-circle km from lat/lon; euclidean: plane x/y")
+        distance_rate = g2.number_input("Rate per km", min_value=0.0, value=1.0, step=0.1, key="distance_rate")
+        lane_fee = g3.number_input("Fixed fee per lane", min_value=0.0, value=0.0, step=1.0, key="lane_fee")
+        max_distance = g4.number_input("Max distance (0 = none)", min_value=0.0, value=0.0, step=50.0, key="max_distance",
+                                       help="Longer lanes are forbidden") or None
+        uploads = (supplier_sites, customer_sites)
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            cost_file = st.file_uploader(
+                "💰 Cost matrix",
+                type=["csv", "xlsx", "parquet", "npy"],
+                help="Header row of customers; an optional first text column of suppliers",
+                key="cost_file"
+            )
+        with col2:
+            supply_file = st.file_uploader("🏭 Supply", type=["csv", "xlsx", "parquet", "npy"], key="supply_file")
+        with col3:
+            demand_file = st.file_uploader("👥 Demand", type=["csv", "xlsx", "parquet", "npy"], key="demand_file")
+        uploads = (cost_file, supply_file, demand_file)
+    
+    edited_costs = edited_demand = None
+    source_names, dest_names = [], []
+    loaded_run = st.session_state.get("loaded_run")
+    if not any(uploads) and loaded_run is not None:
+        edited_costs, edited_demand = instance_frames(
+            loaded_run["costs"], loaded_run["supply"], loaded_run["demand"],
+            loaded_run["source_names"], loaded_run["dest_names"],
+        )
+        st.caption(f"🗂️ Run #{loaded_run['id']} reloaded from the history; import files to replace it.")
+    if all(uploads):
+        try:
+            with st.spinner("📂 Reading files..."), diagnostics.stage("import"):
+                files = tuple((f.name, f.getvalue()) for f in uploads)
+                if import_layout == "Site coordinates":
+                    edited_costs, edited_demand = costs_from_sites(files, distance_metric, distance_rate, lane_fee, max_distance)
+                    import_errors = validate_instance(*split_instance(edited_costs, edited_demand))
+                else:
+                    edited_costs, edited_demand, import_errors = parse_uploaded_instance(files)
+            for message in import_errors:
+                st.error(f"❌ {message}")
+            if import_errors:
+                edited_costs = edited_demand = None
+        except Exception as e:
+            st.error(f"❌ Import error: {str(e)}")
+    
+    if edited_costs is not None:
+        source_names = list(edited_costs.index)
+        dest_names = list(edited_demand.columns)
+        
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Suppliers", f"{len(source_names):,}")
+        m2.metric("Customers", f"{len(dest_names):,}")
+        m3.metric("Total Supply", f"{edited_costs.iloc[:, -1].sum():,.2f}")
+        m4.metric("Total Demand", f"{edited_demand.iloc[0, :].sum():,.2f}")
+        
+        with st.expander("🔎 Preview", expanded=False):
+            page_size = 50
+            n_pages = max(1, -(-len(edited_costs) // page_size))
+            page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, key="preview_page")
+            st.dataframe(edited_costs.iloc[(page - 1) * page_size:page * page_size], use_container_width=True)
+            st.dataframe(edited_demand, use_container_width=True)
 
-demand_data = {dest: [0.0] for dest in dest_names}
-df_demand = pd.DataFrame(demand_data, index=["DEMAND"])
-edited_demand = st.data_editor(df_demand, use_container_width=True, key="demand_editor")
+# --- RUN HISTORY ---
+@st.fragment
+def run_history():
+    # Browsing and diffing runs reruns only this panel; loading one refills the
+    # editors, which needs the whole page.
+    if st.session_state.pop("reload_page", False):
+        st.rerun()
+    with st.expander("🗂️ Run history", expanded=False):
+        run_store = get_run_store()
+        saved_runs = run_store.runs()
+        if saved_runs.empty:
+            st.caption("No saved runs yet. Every solve is saved here, and identical inputs are answered from it.")
+        else:
+            st.dataframe(saved_runs.drop(columns="input_hash"), use_container_width=True, hide_index=True)
+            run_labels = {
+                run.id: f"#{run.id} {run.name or ''} · {run.suppliers}×{run.customers} · {run.total_cost:,.2f}"
+                for run in saved_runs.itertuples()
+            }
+            h1, h2 = st.columns([3, 1])
+            history_run = h1.selectbox("Run", list(run_labels), format_func=run_labels.get, key="history_run")
+            h2.button("📥 Load into editors", on_click=load_run_into_editors, args=(history_run,), key="history_load",
+                      use_container_width=True)
+            if len(run_labels) > 1:
+                d1, d2 = st.columns(2)
+                diff_a = d1.selectbox("Compare run", list(run_labels), index=1, format_func=run_labels.get, key="diff_a")
+                diff_b = d2.selectbox("with run", list(run_labels), format_func=run_labels.get, key="diff_b")
+                if diff_a != diff_b:
+                    plan_diff = run_store.diff(diff_a, diff_b)
+                    st.caption(f"{len(plan_diff)} lanes changed · Δ cost {plan_diff['Δ Cost'].sum():,.2f}")
+                    st.dataframe(plan_diff, use_container_width=True, hide_index=True)
+
+run_history()
 
 # --- OPTIMIZATION BUTTON ---
 st.markdown("---")
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
+    run_name = st.text_input("🏷️ Run name", key="run_name", placeholder="Saved in the run history with this name")
     if st.button(
         "🚀 LAUNCH OPTIMIZATION",
         type="primary",
@@ -516,17 +657,148 @@ with col2:
         st.session_state.run_optimization = True
 
 # --- SECTION 3: RESULTS ---
-if 'run_optimization' in st.session_state and st.session_state.run_optimization:
+@st.fragment
+def scenario_panel(costs, supply, demand, vam_cost, diagnostics):
+    # Scenario settings rerun only this tab, not the plan above or its charts.
+    unit = currency.split()[0]
+    sc1, sc2, sc3, sc4 = st.columns(4)
+    n_scenarios = sc1.number_input("Scenarios", min_value=10, max_value=5000, value=200, step=10, key="n_scenarios")
+    cost_vol = sc2.slider("Fuel price volatility (%)", 0, 50, 10, key="cost_volatility")
+    demand_vol = sc3.slider("Demand volatility (%)", 0, 50, 10, key="demand_volatility")
+    scenario_seed = sc4.number_input("Seed", min_value=0, value=0, step=1, key="scenario_seed")
+
+    if st.button("🎲 RUN SCENARIOS", use_container_width=True, key="scenario_button"):
+        st.session_state.run_scenarios = True
+
+    if st.session_state.get("run_scenarios"):
+        def run_scenarios():
+            tensor, supplies, demands = sample_scenarios(
+                costs, supply, demand, int(n_scenarios),
+                cost_volatility=cost_vol / 100,
+                demand_volatility=demand_vol / 100,
+                seed=int(scenario_seed)
+            )
+            _, scenario_costs, stats = solve_scenarios(tensor, supplies, demands)
+            return scenario_costs, stats
+
+        scenario_key = instance_key(
+            costs, supply, demand,
+            scenarios=int(n_scenarios),
+            cost_volatility=cost_vol,
+            demand_volatility=demand_vol,
+            seed=int(scenario_seed)
+        )
+        with st.spinner("🎲 Solving scenarios..."), diagnostics.stage("scenarios"):
+            scenario_costs, stats = get_result_cache().get_or_compute(scenario_key, run_scenarios)
+
+        if stats["infeasible"]:
+            st.warning(
+                f"⚠️ {stats['infeasible']} of {stats['scenarios']} scenarios have demand that can only be met over "
+                "forbidden lanes; they are left out of the figures below."
+            )
+        s1, s2, s3, s4 = st.columns(4)
+        s1.metric("Mean VAM Cost", f"{stats['mean']:,.2f} {unit}")
+        s2.metric("P5", f"{stats['p5']:,.2f} {unit}")
+        s3.metric("Median", f"{stats['p50']:,.2f} {unit}")
+        s4.metric("P95", f"{stats['p95']:,.2f} {unit}")
+
+        hist_fig = px.histogram(
+            x=scenario_costs,
+            nbins=40,
+            labels={'x': f'VAM Cost ({unit})'},
+            color_discrete_sequence=['#3B82F6']
+        )
+        for label in ("p5", "p50", "p95"):
+            hist_fig.add_vline(x=stats[label], line_dash="dash", line_color="#6B7280", annotation_text=label.upper())
+        hist_fig.add_vline(x=vam_cost, line_color="#10B981", annotation_text="Base")
+        hist_fig.update_layout(
+            yaxis_title="Scenarios",
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(hist_fig, use_container_width=True)
+        st.dataframe(pd.DataFrame([stats]), use_container_width=True, hide_index=True)
+
+@st.fragment
+def results_section(edited_costs, edited_demand, source_names, dest_names, import_stages):
+    # Reruns on its own for widgets inside it (the scenarios have their own
+    # fragment), with the inputs of the last full run.
+    diagnostics = Diagnostics(profile=profile_run, memory=trace_memory)
+    diagnostics.stages.extend(import_stages)
     try:
-        costs = edited_costs.iloc[:, :-1].values.astype(float)
-        supply = edited_costs.iloc[:, -1].values.astype(float)
-        demand = edited_demand.iloc[0, :].values.astype(float)
+        with diagnostics.stage("parse"):
+            costs, supply, demand = split_instance(edited_costs, edited_demand)
         
         if np.any(costs < 0) or np.any(supply < 0) or np.any(demand < 0):
             st.error("❌ Values must be positive.")
         else:
-            with st.spinner("🧠 Running optimization algorithm..."):
-                allocation, total_cost = vogel_approximation_method(costs, supply, demand)
+            cache = get_result_cache()
+            solve_key = instance_key(costs, supply, demand, optimizer="modi", portfolio=portfolio_budget, budget=solve_budget)
+            
+            # After an edit, MODI restarts from the previous optimal basis of the same shape.
+            previous = st.session_state.get("last_basis")
+            if previous is not None and previous["costs"].shape != costs.shape:
+                previous = None
+            
+            def solve(progress=None):
+                solver_stats = {}
+                started = time.perf_counter()
+                portfolio = None
+                if use_portfolio:
+                    with diagnostics.stage("portfolio"):
+                        vam_allocation, vam_cost, portfolio = run_portfolio(costs, supply, demand, time_budget=portfolio_budget)
+                    solver_stats["initial_heuristic"] = portfolio[0]["heuristic"]
+                else:
+                    with diagnostics.stage("vam"):
+                        vam_allocation, vam_cost = vogel_approximation_method(
+                            costs, supply, demand, stats=solver_stats, time_budget=solve_budget, progress=progress
+                        )
+                remaining = None if solve_budget is None else max(solve_budget - (time.perf_counter() - started), 0.0)
+                with diagnostics.stage("modi"):
+                    allocation, total_cost, pivots, basis = transportation_simplex(
+                        costs, supply, demand, vam_allocation,
+                        basis=None if previous is None else previous["basis"],
+                        basis_costs=None if previous is None else previous["costs"],
+                        return_basis=True,
+                        stats=solver_stats,
+                        time_budget=remaining,
+                        progress=progress,
+                    )
+                return vam_cost, allocation, total_cost, pivots, basis, solver_stats, portfolio
+            
+            run_store = get_run_store()
+            stored_run = fresh = None
+            with diagnostics.stage("solve"):
+                result = cache.get(solve_key)
+                if result is None:
+                    stored_run = run_store.find(costs, supply, demand)
+                    if stored_run is not None:
+                        run = run_store.load(stored_run)
+                        result = (
+                            run["vam_cost"], run["allocation"], run["total_cost"], run["pivots"], run["basis"],
+                            run["stats"]["solver"], run["stats"]["portfolio"],
+                        )
+                        cache.put(solve_key, result)
+                if result is None:
+                    result = solve_with_progress(solve, inline=diagnostics.profile)
+                    fresh = True
+                    # Plans cut short by the budget are not cached: a later run may do better.
+                    if result[5]["optimal"]:
+                        cache.put(solve_key, result)
+            vam_cost, allocation, total_cost, pivots, basis, solver_stats, portfolio = result
+            if fresh:
+                run_store.save(
+                    costs, supply, demand, allocation, vam_cost, total_cost, pivots, basis,
+                    optimal=solver_stats["optimal"],
+                    name=run_name or None,
+                    source_names=source_names,
+                    dest_names=dest_names,
+                    stats={"solver": solver_stats, "portfolio": portfolio},
+                    timings={s["stage"]: s["seconds"] for s in diagnostics.stages if s["stage"].startswith("solve")},
+                )
+            warm = solver_stats["warm_start"]
+            diagnostics.count(solver_stats, rows=costs.shape[0], cols=costs.shape[1])
+            st.session_state.last_basis = {"costs": costs, "basis": basis}
             
             # Prepare results
             final_sources = source_names.copy()
@@ -543,8 +815,84 @@ if 'run_optimization' in st.session_state and st.session_state.run_optimization:
                 columns=final_dests[:allocation.shape[1]]
             )
             
+            def render():
+                with diagnostics.stage("sankey"):
+                    sankey_fig = plot_sankey(
+                        allocation,
+                        final_sources[:allocation.shape[0]],
+                        final_dests[:allocation.shape[1]],
+                        top_k=SANKEY_TOP_K,
+                        webgl_threshold=WEBGL_LANES
+                    )
+                
+                # Charts, tables and the Excel report all read this one pass over the lanes.
+                with diagnostics.stage("kpis"):
+                    cube = kpi_cube(costs, supply, demand, allocation)
+                    kpis = kpi_frames(cube, source_names, dest_names)
+                
+                with diagnostics.stage("bar"):
+                    bar_fig = px.bar(
+                        x=source_names,
+                        y=cube["supplier_cost"],
+                        labels={'x': 'Supplier', 'y': f'Cost ({currency.split()[0]})'},
+                        color=cube["supplier_cost"],
+                        color_continuous_scale='Viridis'
+                    )
+                    bar_fig.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)'
+                    )
+                
+                # Ranging and shadow prices come from the final basis, with no re-solve.
+                with diagnostics.stage("sensitivity"):
+                    sensitivity = sensitivity_frames(
+                        sensitivity_analysis(costs, supply, demand, basis),
+                        costs, allocation, source_names, dest_names,
+                        basic_only=costs.size > STREAMING_CELLS
+                    )
+                return sankey_fig, bar_fig, sensitivity, kpis
+            
+            # Keyed on the solve options and the plan itself (sensitivity also reads
+            # the basis), plus the names and currency that only change the rendering.
+            render_key = instance_key(
+                costs, supply, demand,
+                solve=solve_key,
+                plan=instance_key(allocation, basis, [total_cost]),
+                sources=tuple(source_names),
+                dests=tuple(dest_names),
+                currency=currency
+            )
+            
+            def cached(key, compute):
+                # Like plans cut short by the budget, their renders and exports are not kept.
+                if not solver_stats["optimal"]:
+                    return compute()
+                return cache.get_or_compute(key, compute)
+            
+            with diagnostics.stage("render"):
+                sankey_fig, bar_fig, sensitivity, kpis = cached(render_key, render)
+            
+            # Export files are built on click, in Streamlit's download thread, and
+            # cached with the render so a second click is free.
+            def excel_report():
+                if costs.size > STREAMING_CELLS:
+                    return generate_excel_streaming(
+                        costs, supply, demand, allocation, total_cost, currency.split()[0],
+                        final_sources, final_dests, sensitivity=sensitivity, kpis=kpis
+                    )
+                return generate_excel(
+                    edited_costs, edited_demand, res_df, total_cost, currency.split()[0],
+                    sensitivity=sensitivity, kpis=kpis
+                )
+            
+            def lanes_file(fmt):
+                return lambda: cached(
+                    f"{render_key}:lanes:{fmt}",
+                    lambda: export_lanes(allocation, costs, final_sources, final_dests, fmt=fmt)
+                )
+            
             # Tabs for results
-            tab1, tab2, tab3 = st.tabs(["📊 Results", "📈 Visualization", "💾 Export"])
+            tab1, tab2, tab3, tab4 = st.tabs(["📊 Results", "📈 Visualization", "💾 Export", "🎲 Scenarios"])
             
             with tab1:
                 st.markdown(f"""
@@ -565,13 +913,72 @@ if 'run_optimization' in st.session_state and st.session_state.run_optimization:
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # Allocation table
-                st.dataframe(
-                    res_df.style.applymap(
-                        lambda x: 'background-color: #D1FAE5; color: #065F46; font-weight: 600;' if x > 0 else ''
-                    ),
-                    use_container_width=True
-                )
+                m1, m2, m3 = st.columns(3)
+                initial_label = f"{portfolio[0]['heuristic']} Initial Cost" if portfolio else "VAM Initial Cost"
+                m1.metric(initial_label, f"{vam_cost:,.2f} {currency.split()[0]}")
+                m2.metric("Optimal Cost", f"{total_cost:,.2f} {currency.split()[0]}", f"{total_cost - vam_cost:,.2f}", delta_color="inverse")
+                m3.metric("MODI Pivots", pivots)
+                if warm:
+                    st.caption("♻️ Warm start: MODI resumed from the previous optimal basis.")
+                if stored_run is not None:
+                    st.caption(f"🗂️ Same inputs as run #{stored_run}: plan loaded from the run history.")
+                if not solver_stats["optimal"]:
+                    bound = solver_stats["lower_bound"]
+                    gap = (total_cost - bound) / abs(total_cost) if total_cost else 0.0
+                    st.warning(
+                        f"⏳ Time budget reached: best plan found so far, at most {gap:.1%} above the optimum "
+                        f"(lower bound {bound:,.2f} {currency.split()[0]})."
+                    )
+                
+                # Allocation table (highlighting is skipped on large imported plans)
+                if res_df.size <= 10_000:
+                    st.dataframe(
+                        res_df.style.applymap(
+                            lambda x: 'background-color: #D1FAE5; color: #065F46; font-weight: 600;' if x > 0 else ''
+                        ),
+                        use_container_width=True
+                    )
+                else:
+                    st.dataframe(res_df, use_container_width=True)
+                
+                if portfolio:
+                    with st.expander("🏁 Heuristic Portfolio", expanded=False):
+                        st.caption(f"Best initial plan within {portfolio_budget:g} s; MODI started from it.")
+                        st.dataframe(
+                            pd.DataFrame(portfolio).rename(columns={
+                                "heuristic": "Heuristic", "total_cost": "Initial Cost", "seconds": "Seconds", "status": "Status",
+                            }),
+                            use_container_width=True,
+                            hide_index=True,
+                        )
+                
+                with st.expander("📦 Supplier & Customer KPIs", expanded=False):
+                    kpi_suppliers, kpi_customers, kpi_summary = kpis
+                    summary = dict(zip(kpi_summary["KPI"], kpi_summary["Value"]))
+                    k1, k2, k3 = st.columns(3)
+                    k1.metric("Units Allocated", f"{summary['Units allocated']:,.2f}")
+                    k2.metric("Dummy Share", f"{summary['Dummy share']:.1%}",
+                              help="Units sent to or taken from the dummy line: unused capacity or unmet demand.")
+                    k3.metric("Lanes Used", f"{summary['Lanes used']:,.0f}")
+                    st.dataframe(
+                        kpi_suppliers, use_container_width=True, hide_index=True,
+                        column_config={"Utilization": st.column_config.ProgressColumn("Utilization", format="percent")},
+                    )
+                    st.dataframe(
+                        kpi_customers, use_container_width=True, hide_index=True,
+                        column_config={"Fill Rate": st.column_config.ProgressColumn("Fill Rate", format="percent")},
+                    )
+                
+                with st.expander("📐 Sensitivity Analysis", expanded=False):
+                    sens_lanes, sens_prices = sensitivity
+                    if not solver_stats["optimal"]:
+                        st.info("The plan is not optimal yet; ranges and prices refer to the last basis reached.")
+                    st.caption(
+                        "Each unit cost can move between Cost Lower and Cost Upper without changing the optimal plan. "
+                        "Shadow prices give the change in total cost per extra unit of supply or demand."
+                    )
+                    st.dataframe(sens_lanes, use_container_width=True, hide_index=True)
+                    st.dataframe(sens_prices, use_container_width=True, hide_index=True)
             
             with tab2:
                 st.markdown("""
@@ -580,11 +987,6 @@ if 'run_optimization' in st.session_state and st.session_state.run_optimization:
                 </div>
                 """, unsafe_allow_html=True)
                 
-                sankey_fig = plot_sankey(
-                    allocation,
-                    final_sources[:allocation.shape[0]],
-                    final_dests[:allocation.shape[1]]
-                )
                 st.plotly_chart(sankey_fig, use_container_width=True)
                 
                 # Cost distribution
@@ -595,25 +997,6 @@ if 'run_optimization' in st.session_state and st.session_state.run_optimization:
                 </div>
                 """, unsafe_allow_html=True)
                 
-                real_rows = min(costs.shape[0], allocation.shape[0])
-                real_cols = min(costs.shape[1], allocation.shape[1])
-                
-                cost_per_source = []
-                for r in range(real_rows):
-                    row_cost = np.sum(allocation[r, :real_cols] * costs[r, :real_cols])
-                    cost_per_source.append(row_cost)
-                
-                bar_fig = px.bar(
-                    x=source_names[:real_rows],
-                    y=cost_per_source,
-                    labels={'x': 'Supplier', 'y': f'Cost ({currency.split()[0]})'},
-                    color=cost_per_source,
-                    color_continuous_scale='Viridis'
-                )
-                bar_fig.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
                 st.plotly_chart(bar_fig, use_container_width=True)
             
             with tab3:
@@ -631,53 +1014,100 @@ if 'run_optimization' in st.session_state and st.session_state.run_optimization:
                 </div>
                 """, unsafe_allow_html=True)
                 
-                excel_data = generate_excel(edited_costs, edited_demand, res_df, total_cost, currency.split()[0])
-                
+                stamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     st.download_button(
                         label="📥 DOWNLOAD EXCEL REPORT",
-                        data=excel_data,
-                        file_name=f"vogel_optimization_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                        data=lambda: cached(f"{render_key}:excel", excel_report),
+                        file_name=f"vogel_optimization_{stamp}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+                    # Non-zero lanes only (supplier, customer, qty, unit_cost, cost), for pipelines.
+                    st.download_button(
+                        label="🗂️ DOWNLOAD LANES (PARQUET)",
+                        data=lanes_file("parquet"),
+                        file_name=f"vogel_lanes_{stamp}.parquet",
+                        mime="application/vnd.apache.parquet",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+                    st.download_button(
+                        label="🗂️ DOWNLOAD LANES (CSV)",
+                        data=lanes_file("csv"),
+                        file_name=f"vogel_lanes_{stamp}.csv",
+                        mime="text/csv",
+                        on_click="ignore",
                         use_container_width=True
                     )
     
+            
+            with tab4:
+                st.markdown("""
+                <div class="glass-card">
+                    <h3 style="color: #1F2937; margin: 0 0 1rem 0;">Monte Carlo Scenarios</h3>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                scenario_panel(costs, supply, demand, vam_cost, diagnostics)
+            
+            if show_diagnostics:
+                with st.expander("🩺 Diagnostics", expanded=False):
+                    st.caption(f"Run {diagnostics.run_id} · cached stages take ~0 s and skip their inner timers.")
+                    st.dataframe(pd.DataFrame(diagnostics.stages), use_container_width=True, hide_index=True)
+                    st.json(diagnostics.counters)
+                    if profile_run:
+                        st.code(diagnostics.profile_text(), language="text")
+                enable_json_logging()
+                diagnostics.log(source="app")
+    
     except Exception as e:
         st.error(f"❌ Calculation error: {str(e)}")
 
+if st.session_state.get("run_optimization") and edited_costs is None:
+    st.warning("⚠️ Import an instance before launching the optimization.")
+elif st.session_state.get("run_optimization"):
+    results_section(edited_costs, edited_demand, source_names, dest_names, list(diagnostics.stages))
+
 # --- FEEDBACK SECTION ---
-st.markdown("---")
-st.markdown("""
-<div class="glass-card">
-    <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
-        <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #3B82F6 0%, #8B5CF6 100%); 
-             border-radius: 12px; display: flex; align-items: center; justify-content: center;">
-            <i class="fas fa-comment-dots" style="color: white; font-size: 1.25rem;"></i>
-        </div>
-        <div>
-            <h3 style="color: #1F2937; margin: 0;">Feedback</h3>
+@st.fragment
+def feedback_section():
+    # Sending feedback reruns only the form, never the solver or the charts.
+    st.markdown("---")
+    st.markdown("""
+    <div class="glass-card">
+        <div style="display: flex; align-items: center; gap: 1rem; margin-bottom: 1rem;">
+            <div style="width: 48px; height: 48px; background: linear-gradient(135deg, #3B82F6 0%, #8B5CF6 100%); 
+                 border-radius: 12px; display: flex; align-items: center; justify-content: center;">
+                <i class="fas fa-comment-dots" style="color: white; font-size: 1.25rem;"></i>
+            </div>
+            <div>
+                <h3 style="color: #1F2937; margin: 0;">Feedback</h3>
+            </div>
         </div>
     </div>
-</div>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
-with st.form("feedback_form", clear_on_submit=True):
-    name = st.text_input("Your Name", placeholder="Enter your name")
-    message = st.text_area("Your Message", placeholder="Share your thoughts...", height=100)
+    with st.form("feedback_form", clear_on_submit=True):
+        name = st.text_input("Your Name", placeholder="Enter your name")
+        message = st.text_area("Your Message", placeholder="Share your thoughts...", height=100)
     
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        submitted = st.form_submit_button("📨 SEND FEEDBACK", type="primary", use_container_width=True)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            submitted = st.form_submit_button("📨 SEND FEEDBACK", type="primary", use_container_width=True)
     
-    if submitted and message:
-        try:
-            send_telegram_feedback(name if name else "Anonymous", message)
-            st.success("✅ Thank you for your feedback!")
-        except:
-            st.success("✅ Feedback recorded. Thank you!")
-    elif submitted:
-        st.warning("⚠️ Please write a message before sending.")
+        if submitted and message:
+            try:
+                send_telegram_feedback(name if name else "Anonymous", message)
+                st.success("✅ Thank you for your feedback!")
+            except:
+                st.success("✅ Feedback recorded. Thank you!")
+        elif submitted:
+            st.warning("⚠️ Please write a message before sending.")
+
+feedback_section()
 
 # --- FOOTER ---
 st.markdown("---")
@@ -686,8 +1116,3 @@ st.markdown("""
     <p style="font-size: 0.9rem;">VOGEL PRO SYSTEM © 2024</p>
 </div>
 """, unsafe_allow_html=True)
-
-# Ajouter FontAwesome
-components.html("""
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-""", height=0)
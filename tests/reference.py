@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from vogel.solver import INF
+
+def baseline_vam(cost_matrix, supply, demand):
+    # VAM as the app first shipped it, every penalty recomputed at each step: the
+    # reference the incremental engines must reproduce cell for cell.
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    costs = np.array(cost_matrix, dtype=float)
+    n_rows, n_cols = original_rows, original_cols = costs.shape
+    if supply.sum() > demand.sum():
+        demand = np.append(demand, supply.sum() - demand.sum())
+        costs = np.c_[costs, np.zeros(n_rows)]
+        n_cols += 1
+    elif demand.sum() > supply.sum():
+        supply = np.append(supply, demand.sum() - supply.sum())
+        costs = np.r_[costs, [np.zeros(n_cols)]]
+        n_rows += 1
+
+    allocation = np.zeros((n_rows, n_cols))
+    costs_temp = costs.copy()
+    while supply.sum() > 0 and demand.sum() > 0:
+        penalties = []
+        for lines, amount in ((costs_temp, supply), (costs_temp.T, demand)):
+            line_penalties = []
+            for line, left in zip(lines, amount):
+                valid = np.sort(line[line < INF])
+                if left == 0 or len(valid) == 0:
+                    line_penalties.append(-1)
+                elif len(valid) == 1:
+                    line_penalties.append(valid[0])
+                else:
+                    line_penalties.append(valid[1] - valid[0])
+            penalties.append(np.array(line_penalties))
+        row_p, col_p = penalties
+        if row_p.max() >= col_p.max():
+            row_idx = np.argmax(row_p)
+            valid = np.flatnonzero(costs_temp[row_idx] < INF)
+            col_idx = valid[np.argmin(costs_temp[row_idx, valid])] if len(valid) else -1
+        else:
+            col_idx = np.argmax(col_p)
+            valid = np.flatnonzero(costs_temp[:, col_idx] < INF)
+            row_idx = valid[np.argmin(costs_temp[valid, col_idx])] if len(valid) else -1
+        if row_idx < 0 or col_idx < 0:
+            # The engines' fallback; the original picked a lane of the exhausted
+            # line, which could be one with nothing left, and then looped forever.
+            row_idx, col_idx = np.argmax(supply > 0), np.argmax(demand > 0)
+        qty = min(supply[row_idx], demand[col_idx])
+        allocation[row_idx, col_idx] = qty
+        supply[row_idx] -= qty
+        demand[col_idx] -= qty
+        if supply[row_idx] == 0:
+            costs_temp[row_idx, :] = INF
+        if demand[col_idx] == 0:
+            costs_temp[:, col_idx] = INF
+
+    allocation = allocation[:original_rows, :original_cols]
+    return allocation, np.sum(allocation * costs[:original_rows, :original_cols])
+
+def lp_optimum(cost_matrix, supply, demand):
+    # Optimal cost from HiGHS over the allowed lanes, or None when every plan needs
+    # a forbidden one. The larger side of unequal totals is left partly unused, as
+    # the dummy line leaves it.
+    optimize = pytest.importorskip("scipy.optimize")
+    sparse = pytest.importorskip("scipy.sparse")
+    costs = np.asarray(cost_matrix, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    n_rows, n_cols = costs.shape
+    lanes = np.flatnonzero(costs.ravel() < INF)
+    if len(lanes) == 0:
+        return 0.0 if min(supply.sum(), demand.sum()) == 0 else None
+    rows, cols = np.divmod(lanes, n_cols)
+    ones = np.ones(len(lanes))
+    by_row = sparse.coo_matrix((ones, (rows, np.arange(len(lanes)))), shape=(n_rows, len(lanes)))
+    by_col = sparse.coo_matrix((ones, (cols, np.arange(len(lanes)))), shape=(n_cols, len(lanes)))
+    if supply.sum() >= demand.sum():
+        result = optimize.linprog(costs.ravel()[lanes], A_ub=by_row, b_ub=supply, A_eq=by_col, b_eq=demand, method="highs")
+    else:
+        result = optimize.linprog(costs.ravel()[lanes], A_ub=by_col, b_ub=demand, A_eq=by_row, b_eq=supply, method="highs")
+    return result.fun if result.status == 0 else None
+
+def random_instance(rng, max_rows=12, max_cols=12, forbidden=0.0, balanced=False, integer=False):
+    # Costs up to 60, a `forbidden` share of them at INF, and totals that differ
+    # unless `balanced`. Integer costs make ties and degenerate steps common.
+    n_rows, n_cols = rng.integers(2, max_rows + 1), rng.integers(2, max_cols + 1)
+    costs = rng.integers(1, 60, (n_rows, n_cols)).astype(float)
+    if not integer:
+        costs += np.round(rng.random((n_rows, n_cols)), 2)
+    costs[rng.random((n_rows, n_cols)) < forbidden] = INF
+    supply = rng.integers(1, 40, n_rows).astype(float)
+    demand = rng.integers(1, 40, n_cols).astype(float)
+    if balanced:
+        demand[-1] += supply.sum() - demand.sum()
+        if demand[-1] < 0:
+            supply[-1] -= demand[-1]
+            demand[-1] = 0.0
+    return costs, supply, demand
+
+def assert_plan(allocation, supply, demand, tol=1e-6):
+    # Non-negative, within every supply and demand, and shipping the smaller total.
+    allocation = np.asarray(allocation)
+    assert allocation.min() >= -tol
+    assert np.all(allocation.sum(axis=1) <= np.asarray(supply) + tol)
+    assert np.all(allocation.sum(axis=0) <= np.asarray(demand) + tol)
+    assert allocation.sum() == pytest.approx(min(np.sum(supply), np.sum(demand)))
+
+def dense(lanes, shape):
+    # The ((rows, cols, qty), total) lane list of the sparse, lean and out-of-core
+    # solvers as a dense allocation.
+    (rows, cols, qty), _ = lanes
+    allocation = np.zeros(shape)
+    allocation[rows, cols] = qty
+    return allocation
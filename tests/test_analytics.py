@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vogel import kpi_cube, kpi_frames
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+COSTS = np.array([[4.0, INF, 8.0], [6.0, 5.0, 3.0], [7.0, 2.0, INF]])
+
+CASES = {
+    "balanced": ([10.0, 12.0, 8.0], [9.0, 11.0, 10.0]),
+    "extra supply": ([14.0, 12.0, 8.0], [9.0, 11.0, 10.0]),
+    "extra demand": ([10.0, 12.0, 8.0], [9.0, 15.0, 10.0]),
+}
+
+def plan(supply, demand):
+    allocation, _ = vogel_approximation_method(COSTS, supply, demand)
+    allocation, total_cost, _ = transportation_simplex(COSTS, supply, demand, allocation)
+    return np.asarray(supply), np.asarray(demand), allocation, total_cost
+
+def padded(allocation, supply, demand):
+    # The plan as the app shows it, with the dummy line that balances it.
+    if supply.sum() > demand.sum():
+        return np.c_[allocation, supply - allocation.sum(axis=1)]
+    if demand.sum() > supply.sum():
+        return np.r_[allocation, [demand - allocation.sum(axis=0)]]
+    return allocation
+
+@pytest.mark.parametrize("case", list(CASES))
+@pytest.mark.parametrize("form", ["dense", "padded", "lanes"])
+def test_cube_matches_dense_sums(case, form):
+    supply, demand, real, total_cost = plan(*CASES[case])
+    allocation = real
+    if form == "padded":
+        allocation = padded(real, supply, demand)
+    elif form == "lanes":
+        rows, cols = np.nonzero(real)
+        allocation = (rows, cols, real[rows, cols])
+    cube = kpi_cube(COSTS, supply, demand, allocation)
+
+    shipped, received = real.sum(axis=1), real.sum(axis=0)
+    dummy = abs(supply.sum() - demand.sum())
+    assert cube["total_cost"] == pytest.approx(total_cost)
+    assert cube["total_cost"] == pytest.approx(np.sum(real * COSTS))
+    np.testing.assert_allclose(cube["supplier_cost"], (real * COSTS).sum(axis=1))
+    np.testing.assert_allclose(cube["customer_cost"], (real * COSTS).sum(axis=0))
+    np.testing.assert_allclose(cube["supplier_utilization"], shipped / supply)
+    np.testing.assert_allclose(cube["supplier_unused"], supply - shipped, atol=1e-9)
+    np.testing.assert_allclose(cube["customer_fill_rate"], received / demand)
+    np.testing.assert_allclose(cube["customer_shortfall"], demand - received, atol=1e-9)
+    np.testing.assert_allclose(cube["customer_unit_cost"], (real * COSTS).sum(axis=0) / received)
+    assert cube["dummy_qty"] == pytest.approx(dummy)
+    assert cube["total_qty"] == pytest.approx(max(supply.sum(), demand.sum()))
+    assert cube["dummy_share"] == pytest.approx(dummy / max(supply.sum(), demand.sum()))
+    # No forbidden lane carries flow.
+    assert np.all(cube["lane_unit_cost"] < INF)
+
+def test_balanced_plan_has_no_dummy():
+    supply, demand, allocation, _ = plan(*CASES["balanced"])
+    cube = kpi_cube(COSTS, supply, demand, allocation)
+    assert cube["dummy_qty"] == 0.0 and cube["dummy_share"] == 0.0
+    np.testing.assert_allclose(cube["supplier_utilization"], 1.0)
+    np.testing.assert_allclose(cube["customer_fill_rate"], 1.0)
+
+def test_zero_demand_has_no_rate():
+    supply, demand = np.array([5.0, 5.0, 5.0]), np.array([6.0, 0.0, 4.0])
+    cube = kpi_cube(COSTS, supply, demand, plan(supply, demand)[2])
+    assert np.isnan(cube["customer_fill_rate"][1]) and np.isnan(cube["customer_unit_cost"][1])
+    assert cube["customer_received"][1] == 0.0
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_frames(case):
+    supply, demand, allocation, total_cost = plan(*CASES[case])
+    cube = kpi_cube(COSTS, supply, demand, padded(allocation, supply, demand))
+    suppliers, customers, summary = kpi_frames(cube, ["A", "B", "C"], ["X", "Y", "Z"])
+    assert list(suppliers["Supplier"]) == ["A", "B", "C"]
+    assert list(customers["Customer"]) == ["X", "Y", "Z"]
+    np.testing.assert_allclose(suppliers["Utilization"], cube["supplier_utilization"])
+    np.testing.assert_allclose(customers["Fill Rate"], cube["customer_fill_rate"])
+    values = dict(zip(summary["KPI"], summary["Value"]))
+    assert values["Total cost"] == pytest.approx(total_cost)
+    assert values["Units on the dummy line"] == pytest.approx(abs(supply.sum() - demand.sum()))
+    assert values["Dummy share"] == pytest.approx(cube["dummy_share"])
+    # Dummy lanes are not counted as used lanes.
+    assert values["Lanes used"] == np.count_nonzero(allocation)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from vogel import ResultCache, instance_key
+
+COSTS = np.array([[4.0, 6.0], [5.0, 3.0]])
+SUPPLY = np.array([5.0, 5.0])
+DEMAND = np.array([4.0, 6.0])
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_least_recently_used_is_evicted():
+    cache = ResultCache(max_entries=2, ttl=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.put("a", 10)
+    cache.put("d", 4)
+    assert cache.get("c") is None
+    assert cache.get("a") == 10
+    assert len(cache) == 2
+
+def test_entries_expire():
+    clock = Clock()
+    cache = ResultCache(ttl=10.0, clock=clock)
+    cache.put("a", 1)
+    clock.now = 10.0
+    assert cache.get("a") == 1
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    # A put restarts the entry's time to live.
+    cache.put("a", 2)
+    clock.now = 20.0
+    assert cache.get("a") == 2
+
+def test_hit_and_miss_counts():
+    cache = ResultCache()
+    cache.get("a")
+    cache.put("a", 1)
+    cache.get("a")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_get_or_compute():
+    clock = Clock()
+    cache = ResultCache(ttl=5.0, clock=clock)
+    calls = []
+
+    def compute():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert cache.get_or_compute("a", compute) == 1
+    assert cache.get_or_compute("a", compute) == 1
+    clock.now = 6.0
+    assert cache.get_or_compute("a", compute) == 2
+    assert calls == [0.0, 6.0]
+
+def test_instance_key_is_stable():
+    key = instance_key(COSTS, SUPPLY, DEMAND, optimizer="modi", budget=None)
+    # Same content in other containers and dtypes, options in another order.
+    assert instance_key(COSTS.tolist(), [5, 5], [4, 6], budget=None, optimizer="modi") == key
+    assert instance_key(COSTS.astype(np.float32), SUPPLY, DEMAND, optimizer="modi", budget=None) == key
+    # A fixed digest: keys must not change between processes or releases.
+    assert key == "724ac05de8e9a8fab7db59741a3a0e20696cc384f5baea7289b33b5e49b2a601"
+
+@pytest.mark.parametrize("options", [
+    {"optimizer": "vam", "budget": None},
+    {"optimizer": "modi", "budget": 5.0},
+    {"optimizer": "modi"},
+    {"optimizer": "modi", "budget": None, "portfolio": 1.0},
+])
+def test_instance_key_changes_with_every_option(options):
+    assert instance_key(COSTS, SUPPLY, DEMAND, **options) != instance_key(COSTS, SUPPLY, DEMAND, optimizer="modi", budget=None)
+
+def test_instance_key_changes_with_the_instance():
+    key = instance_key(COSTS, SUPPLY, DEMAND)
+    assert instance_key(COSTS.T, SUPPLY, DEMAND) != key
+    assert instance_key(COSTS.reshape(1, 4), [10.0], [4, 6, 0, 0]) != key
+    assert instance_key(COSTS, DEMAND, SUPPLY) != key
+    assert instance_key(COSTS + 1e-12, SUPPLY, DEMAND) != key
@@ -0,0 +1,115 @@
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from vogel import (
+    export_lanes,
+    generate_excel_streaming,
+    iter_lanes,
+    kpi_cube,
+    kpi_frames,
+    sensitivity_analysis,
+    sensitivity_frames,
+)
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+COSTS = np.array([[4.0, INF, 8.0, 5.0], [INF, 5.0, 3.0, 6.0], [6.0, 7.0, INF, 4.0]])
+SUPPLY = np.array([12.0, 10.0, 9.0])
+DEMAND = np.array([7.0, 6.0, 8.0, 5.0])
+SOURCES = ["Paris", "Lyon", "Lille"]
+DESTS = ["North", "South", "East", "West", "Dummy (Demand)"]
+
+@pytest.fixture(scope="module")
+def plan():
+    # Supply exceeds demand by 5: the unused capacity goes on a dummy customer
+    # column, as the app adds it for display and export.
+    allocation, _ = vogel_approximation_method(COSTS, SUPPLY, DEMAND)
+    allocation, total_cost, _, basis = transportation_simplex(COSTS, SUPPLY, DEMAND, allocation, return_basis=True)
+    padded = np.c_[allocation, SUPPLY - allocation.sum(axis=1)]
+    return padded, total_cost, basis
+
+def lane_frame(plan):
+    padded, _, _ = plan
+    rows, cols = np.nonzero(padded > 0)
+    return rows, cols, padded[rows, cols]
+
+def test_iter_lanes_in_blocks(plan):
+    padded, total_cost, _ = plan
+    rows, cols, qty = lane_frame(plan)
+    for allocation in (padded, (rows[::-1], cols[::-1], qty[::-1])):
+        blocks = list(iter_lanes(allocation, COSTS, block_rows=1))
+        got_rows, got_cols, got_qty, unit_cost = (np.concatenate(parts) for parts in zip(*blocks))
+        order = np.lexsort((got_cols, got_rows))
+        np.testing.assert_array_equal(got_rows[order], rows)
+        np.testing.assert_array_equal(got_cols[order], cols)
+        np.testing.assert_array_equal(got_qty[order], qty)
+        assert np.dot(got_qty, unit_cost) == pytest.approx(total_cost)
+        # Dummy lanes cost nothing, and no allowed lane is priced as forbidden.
+        assert np.all(unit_cost[got_cols == len(DEMAND)] == 0.0)
+        assert np.all(unit_cost < INF)
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_lanes_round_trip(plan, tmp_path, fmt):
+    padded, total_cost, _ = plan
+    data = export_lanes(padded, COSTS, SOURCES, DESTS, fmt=fmt)
+    export_lanes(padded, COSTS, SOURCES, DESTS, fmt=fmt, path=str(tmp_path / f"lanes.{fmt}"))
+    assert (tmp_path / f"lanes.{fmt}").read_bytes() == data
+    read = pd.read_csv if fmt == "csv" else pd.read_parquet
+    lanes = read(io.BytesIO(data))
+    assert list(lanes.columns) == ["supplier", "customer", "qty", "unit_cost", "cost"]
+    assert len(lanes) == np.count_nonzero(padded)
+    assert lanes["qty"].sum() == pytest.approx(SUPPLY.sum())
+    assert (lanes["qty"] * lanes["unit_cost"]).sum() == pytest.approx(total_cost)
+    assert lanes["cost"].sum() == pytest.approx(total_cost)
+    dummy = lanes[lanes["customer"] == "Dummy (Demand)"]
+    assert dummy["qty"].sum() == pytest.approx(SUPPLY.sum() - DEMAND.sum())
+    assert np.all(dummy["unit_cost"] == 0.0)
+
+def test_unknown_lane_format(plan):
+    with pytest.raises(ValueError, match="Unknown lane format"):
+        export_lanes(plan[0], COSTS, SOURCES, DESTS, fmt="json")
+
+def test_streaming_workbook_round_trip(plan, tmp_path):
+    padded, total_cost, basis = plan
+    sensitivity = sensitivity_frames(
+        sensitivity_analysis(COSTS, SUPPLY, DEMAND, basis), COSTS, padded, SOURCES, DESTS
+    )
+    kpis = kpi_frames(kpi_cube(COSTS, SUPPLY, DEMAND, padded), SOURCES, DESTS[:-1])
+    path = tmp_path / "report.xlsx"
+    generate_excel_streaming(
+        COSTS, SUPPLY, DEMAND, padded, total_cost, "EUR", SOURCES, DESTS,
+        path=str(path), sensitivity=sensitivity, kpis=kpis
+    )
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Rapport VAM", "Lanes", "Sensitivity", "KPIs"]
+
+    report = [row for row in workbook["Rapport VAM"].iter_rows(values_only=True) if any(v is not None for v in row)]
+    assert any(row[0] == f"Total Minimum Cost: {total_cost:,.2f} EUR" for row in report)
+    assert ("Paris", 4.0, INF, 8.0, 5.0, 12.0) in report
+
+    header, *lanes = workbook["Lanes"].iter_rows(values_only=True)
+    assert list(header) == ["supplier", "customer", "qty", "unit_cost", "cost"]
+    assert len(lanes) == np.count_nonzero(padded)
+    assert sum(q * u for _, _, q, u, _ in lanes) == pytest.approx(total_cost)
+    assert all(u == 0.0 for _, c, _, u, _ in lanes if c == "Dummy (Demand)")
+    assert sum(q for _, c, q, _, _ in lanes if c == "Dummy (Demand)") == pytest.approx(SUPPLY.sum() - DEMAND.sum())
+
+    # Forbidden lanes are not ranged, and unbounded ranges are written as empty cells.
+    sheet = list(workbook["Sensitivity"].iter_rows(min_row=4, values_only=True))
+    ranging = [row for row in sheet[:[row[0] for row in sheet].index("5. Shadow Prices")] if row[0] in SOURCES]
+    assert len(ranging) == np.count_nonzero(COSTS < INF)
+    assert any(row[7] is None for row in ranging)
+    kpi_titles = [row[0] for row in workbook["KPIs"].iter_rows(values_only=True) if row and row[0]]
+    assert {"6. Plan Summary", "7. Suppliers", "8. Customers"} <= set(kpi_titles)
+    workbook.close()
+
+def test_streaming_bytes_match_file(plan, tmp_path):
+    padded, total_cost, _ = plan
+    data = generate_excel_streaming(COSTS, SUPPLY, DEMAND, padded, total_cost, "EUR", SOURCES, DESTS)
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    assert workbook.sheetnames == ["Rapport VAM", "Lanes"]
+    assert workbook["Lanes"].max_row == np.count_nonzero(padded) + 1
+    workbook.close()
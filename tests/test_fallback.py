@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from vogel import repair_allocation, sample_scenarios, solve_scenarios
+from vogel.service import _solve_many
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+from .reference import assert_plan, lp_optimum, random_instance
+
+# VAM fills the dummy customer from the second supplier first, which leaves its
+# 20 units of real demand only the first supplier's forbidden lane.
+COSTS = np.array([[17.0, INF], [INF, 27.0]])
+SUPPLY = np.array([21.0, 20.0])
+DEMAND = np.array([12.0, 20.0])
+
+# The second customer can only be served over forbidden lanes.
+INFEASIBLE = np.array([[1.0, INF], [2.0, INF]]), np.array([5.0, 5.0]), np.array([4.0, 6.0])
+
+def test_vam_fallback_ships_on_forbidden_lane():
+    stats = {}
+    allocation, total_cost = vogel_approximation_method(COSTS, SUPPLY, DEMAND, stats=stats)
+    assert stats["vam_fallbacks"] > 0
+    assert total_cost >= INF
+    assert allocation[COSTS >= INF].sum() > 0
+
+def test_modi_drives_fallback_flow_off():
+    allocation, _ = vogel_approximation_method(COSTS, SUPPLY, DEMAND)
+    stats = {}
+    plan, total_cost, _ = transportation_simplex(COSTS, SUPPLY, DEMAND, allocation, stats=stats)
+    assert stats["feasibility_pivots"] > 0
+    assert total_cost == pytest.approx(lp_optimum(COSTS, SUPPLY, DEMAND))
+    assert plan[COSTS >= INF].sum() == 0
+    assert_plan(plan, SUPPLY, DEMAND)
+
+def test_repair_allocation():
+    allocation, _ = vogel_approximation_method(COSTS, SUPPLY, DEMAND)
+    plan, total_cost = repair_allocation(COSTS, SUPPLY, DEMAND, allocation)
+    assert plan[COSTS >= INF].sum() == 0
+    assert total_cost == pytest.approx(np.sum(plan * COSTS))
+    assert_plan(plan, SUPPLY, DEMAND)
+
+def test_repair_leaves_feasible_plans_alone():
+    costs = np.array([[4.0, 6.0], [5.0, 3.0]])
+    allocation, total_cost = vogel_approximation_method(costs, SUPPLY, DEMAND)
+    plan, repaired_cost = repair_allocation(costs, SUPPLY, DEMAND, allocation)
+    np.testing.assert_array_equal(plan, allocation)
+    assert repaired_cost == total_cost
+
+def test_repair_random_forbidden_lanes():
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        costs, supply, demand = random_instance(rng, max_rows=6, max_cols=6, forbidden=0.5)
+        allocation, total_cost = vogel_approximation_method(costs, supply, demand)
+        if total_cost < INF:
+            continue
+        if lp_optimum(costs, supply, demand) is None:
+            with pytest.raises(ValueError):
+                repair_allocation(costs, supply, demand, allocation)
+            continue
+        plan, repaired_cost = repair_allocation(costs, supply, demand, allocation)
+        assert repaired_cost < INF
+        assert_plan(plan, supply, demand)
+
+def test_infeasible_instance_raises():
+    costs, supply, demand = INFEASIBLE
+    allocation, _ = vogel_approximation_method(costs, supply, demand)
+    with pytest.raises(ValueError):
+        transportation_simplex(costs, supply, demand, allocation)
+    with pytest.raises(ValueError):
+        repair_allocation(costs, supply, demand, allocation)
+
+def test_scenario_totals_stay_finite():
+    tensor, supplies, demands = sample_scenarios(COSTS, SUPPLY, DEMAND, 20, demand_volatility=0.0, seed=1)
+    allocations, total_costs, stats = solve_scenarios(tensor, supplies, demands)
+    assert np.all(total_costs < INF)
+    assert allocations[:, COSTS >= INF].sum() == 0
+    assert stats["infeasible"] == 0
+    assert stats["max"] < INF
+
+def test_infeasible_scenarios_are_counted():
+    # The second customer's sampled demand exceeds the 20 units that can reach it
+    # in some scenarios.
+    tensor, supplies, demands = sample_scenarios(COSTS, SUPPLY, DEMAND, 50, demand_volatility=0.2, seed=1)
+    _, total_costs, stats = solve_scenarios(tensor, supplies, demands)
+    infeasible = demands[:, 1] > SUPPLY[1]
+    assert infeasible.any() and not infeasible.all()
+    np.testing.assert_array_equal(np.isnan(total_costs), infeasible)
+    assert stats["infeasible"] == infeasible.sum()
+    assert stats["max"] == np.nanmax(total_costs) < INF
+
+def test_service_jobs():
+    results = _solve_many([(COSTS, SUPPLY, DEMAND, False), (COSTS, SUPPLY, DEMAND, True), INFEASIBLE + (False,)])
+    vam_only, optimized, infeasible = results
+    assert vam_only["vam_cost"] >= INF
+    assert vam_only["total_cost"] < INF
+    assert optimized["total_cost"] == pytest.approx(lp_optimum(COSTS, SUPPLY, DEMAND))
+    assert "error" in infeasible
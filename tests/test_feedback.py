@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vogel.feedback import FeedbackQueue, format_feedback
+
+class StubTelegram(ThreadingHTTPServer):
+    # Records every sendMessage text. `statuses` are answered first, in order;
+    # after that, texts containing "REJECT" get a 400 and the rest a 200.
+    def __init__(self, statuses=()):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.statuses = list(statuses)
+        self.texts = []
+        self.delivered = []
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.texts.append(body["text"])
+        if server.statuses:
+            status = server.statuses.pop(0)
+        else:
+            status = 400 if "REJECT" in body["text"] else 200
+        if status == 200:
+            server.delivered.append(body["text"])
+        payload = json.dumps({"ok": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def telegram():
+    servers = []
+
+    def start(statuses=()):
+        server = StubTelegram(statuses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_queue(server, tmp_path, **kwargs):
+    options = dict(spool_dir=tmp_path, batch_wait=0.3, backoff=0.01, retry_wait=0.05)
+    options.update(kwargs)
+    return FeedbackQueue("TOKEN", "42", api_url=f"http://127.0.0.1:{server.server_port}", **options)
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+def test_burst_goes_out_as_one_message(telegram, tmp_path):
+    server = telegram()
+    feedback = make_queue(server, tmp_path).start()
+    for k in range(3):
+        feedback.submit("Ana", f"message {k}")
+    wait_until(lambda: server.delivered and not list(tmp_path.glob("*.json")))
+    feedback.stop()
+    assert len(server.texts) == 1
+    assert all(f"message {k}" in server.texts[0] for k in range(3))
+
+def test_server_error_is_retried(telegram, tmp_path):
+    server = telegram(statuses=[503])
+    feedback = make_queue(server, tmp_path).start()
+    feedback.submit("Ana", "hello")
+    wait_until(lambda: server.delivered and not list(tmp_path.glob("*.json")))
+    feedback.stop()
+    assert len(server.texts) == 2
+
+def test_rejected_batch_is_sent_message_by_message(telegram, tmp_path):
+    server = telegram()
+    feedback = make_queue(server, tmp_path).start()
+    for message in ("first", "REJECT", "last"):
+        feedback.submit("Ana", message)
+    wait_until(lambda: len(server.texts) == 4 and not list(tmp_path.glob("*.json")))
+    feedback.stop()
+    assert len(server.delivered) == 2
+    assert "first" in server.delivered[0] and "last" in server.delivered[1]
+
+def test_failed_messages_are_retried_without_restart(telegram, tmp_path):
+    # Two rounds of 500s use up the retries; the worker tries again on its own.
+    server = telegram(statuses=[500, 500, 500, 500])
+    feedback = make_queue(server, tmp_path, retries=1).start()
+    feedback.submit("Ana", "hello")
+    wait_until(lambda: server.delivered and not list(tmp_path.glob("*.json")))
+    feedback.stop()
+    assert len(server.texts) == 5
+
+def test_spool_is_sent_on_start(telegram, tmp_path):
+    server = telegram()
+    (tmp_path / "1-old.json").write_text(json.dumps({"text": "left over"}), encoding="utf-8")
+    feedback = make_queue(server, tmp_path).start()
+    wait_until(lambda: server.delivered)
+    feedback.stop()
+    assert server.delivered == ["left over"]
+
+def test_markdown_in_user_text_is_escaped():
+    text = format_feedback("ana_b", "*bold* [link](x) `code`")
+    assert "ana\\_b" in text
+    assert "\\*bold\\* \\[link](x) \\`code\\`" in text
+    assert text.startswith("🚀 *New feedback on VAM app*")
@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pytest
+
+from vogel import build_costs, coordinates_key, distance_matrix, read_sites
+from vogel.solver import INF
+
+PARIS, LYON, LILLE, MARSEILLE = (48.8566, 2.3522), (45.7640, 4.8357), (50.6292, 3.0573), (43.2965, 5.3698)
+
+def test_paris_lyon():
+    distances = distance_matrix([PARIS, LILLE], [LYON, PARIS])
+    assert distances[0, 0] == pytest.approx(392, abs=1)
+    assert distances[0, 1] == 0.0
+    # Symmetric, and the triangle inequality holds on the sphere.
+    assert distance_matrix([LYON], [PARIS])[0, 0] == pytest.approx(distances[0, 0])
+    assert distances[1, 0] <= distances[1, 1] + distances[0, 0]
+
+def test_euclidean():
+    distances = distance_matrix([(0, 0), (1, 1)], [(3, 4), (1, 1)], metric="euclidean")
+    np.testing.assert_allclose(distances, [[5.0, np.sqrt(2)], [np.sqrt(13), 0.0]])
+
+def test_unknown_metric():
+    with pytest.raises(ValueError, match="Unknown metric"):
+        distance_matrix([PARIS], [LYON], metric="manhattan")
+
+@pytest.mark.parametrize("metric", ["haversine", "euclidean"])
+def test_blocks_do_not_change_distances(metric):
+    rng = np.random.default_rng(0)
+    sources = np.c_[rng.uniform(-60, 60, 37), rng.uniform(-180, 180, 37)]
+    dests = np.c_[rng.uniform(-60, 60, 23), rng.uniform(-180, 180, 23)]
+    expected = distance_matrix(sources, dests, metric=metric)
+    for block_cells in (1, 23, 50, 10_000):
+        np.testing.assert_array_equal(distance_matrix(sources, dests, metric=metric, block_cells=block_cells), expected)
+    costs = build_costs(expected, rate=0.5, max_distance=np.median(expected))
+    for block_cells in (1, 23, 50):
+        np.testing.assert_array_equal(build_costs(expected, 0.5, max_distance=np.median(expected), block_cells=block_cells), costs)
+
+def test_per_supplier_rates_and_fees():
+    distances = np.array([[100.0, 200.0], [50.0, 400.0], [10.0, 0.0]])
+    costs = build_costs(distances, rate=[1.0, 2.0, 0.5], fixed_fee=[10.0, 0.0, 5.0])
+    np.testing.assert_allclose(costs, [[110.0, 210.0], [100.0, 800.0], [10.0, 5.0]])
+    np.testing.assert_allclose(build_costs(distances, rate=2.0, fixed_fee=1.0), distances * 2.0 + 1.0)
+
+def test_lanes_beyond_max_distance_are_forbidden():
+    distances = distance_matrix([PARIS, LILLE], [LYON, MARSEILLE, PARIS])
+    costs = build_costs(distances, rate=1.5, max_distance=500.0)
+    assert np.all(costs[distances > 500.0] == INF)
+    np.testing.assert_allclose(costs[distances <= 500.0], distances[distances <= 500.0] * 1.5)
+    # Paris-Marseille and Lille-Marseille are both over 600 km; a lane at exactly the limit stays open.
+    assert costs[0, 1] == costs[1, 1] == INF
+    assert build_costs(distances, max_distance=distances[0, 0])[0, 0] == pytest.approx(distances[0, 0])
+
+def test_read_sites():
+    names, coords, quantity = read_sites(io.StringIO("Name,Latitude,Longitude,Quantity\nParis,48.8566,2.3522,10\nLyon,45.764,4.8357,5\n"))
+    assert names == ["Paris", "Lyon"]
+    np.testing.assert_allclose(coords, [PARIS, LYON])
+    np.testing.assert_allclose(quantity, [10.0, 5.0])
+    names, _, quantity = read_sites(io.StringIO("x,y\n0,0\n1,2\n"))
+    assert names == ["Site 1", "Site 2"] and quantity is None
+    with pytest.raises(ValueError, match="customers: expected lat/lon"):
+        read_sites(io.StringIO("a,b\n1,2\n"), name="customers")
+
+def test_coordinates_key():
+    key = coordinates_key([PARIS], [LYON])
+    assert key == coordinates_key(np.array([PARIS]), [LYON])
+    assert key != coordinates_key([LYON], [PARIS])
+    assert key != coordinates_key([PARIS], [LYON], metric="euclidean")
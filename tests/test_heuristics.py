@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from vogel import HEURISTICS, run_portfolio
+from vogel.solver import INF, transportation_simplex
+
+from .reference import assert_plan, lp_optimum, random_instance
+
+def instances(seed, count, **kwargs):
+    rng = np.random.default_rng(seed)
+    for trial in range(count):
+        yield random_instance(rng, integer=trial % 3 == 0, balanced=trial % 4 == 0, **kwargs)
+
+@pytest.mark.parametrize("name", list(HEURISTICS))
+def test_feasible_and_above_optimum(name):
+    for costs, supply, demand in instances(1, 40):
+        allocation, total_cost = HEURISTICS[name](costs, supply, demand)
+        assert_plan(allocation, supply, demand)
+        assert total_cost == pytest.approx(np.sum(allocation * costs))
+        assert total_cost >= lp_optimum(costs, supply, demand) - 1e-6
+
+@pytest.mark.parametrize("name", list(HEURISTICS))
+def test_modi_from_each_start_reaches_optimum(name):
+    # Starts that use forbidden lanes (north-west corner ignores costs) are
+    # repaired by MODI's feasibility pivots first.
+    for costs, supply, demand in instances(2, 40, forbidden=0.3):
+        optimum = lp_optimum(costs, supply, demand)
+        allocation, _ = HEURISTICS[name](costs, supply, demand)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                transportation_simplex(costs, supply, demand, allocation)
+            continue
+        plan, total_cost, _ = transportation_simplex(costs, supply, demand, allocation)
+        assert total_cost == pytest.approx(optimum, rel=1e-9, abs=1e-6)
+        assert plan[costs >= INF].sum() == 0
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_portfolio_returns_the_cheapest(executor):
+    costs, supply, demand = next(instances(3, 1))
+    allocation, total_cost, results = run_portfolio(costs, supply, demand, executor=executor, max_workers=2)
+    assert [r["status"] for r in results] == ["ok"] * len(HEURISTICS)
+    assert total_cost == min(r["total_cost"] for r in results) == results[0]["total_cost"]
+    assert_plan(allocation, supply, demand)
+    expected = {name: heuristic(costs, supply, demand)[1] for name, heuristic in HEURISTICS.items()}
+    assert {r["heuristic"]: r["total_cost"] for r in results} == pytest.approx(expected)
+
+def test_failing_heuristic_is_reported():
+    def broken(costs, supply, demand):
+        raise ValueError("broken")
+
+    costs, supply, demand = next(instances(4, 1))
+    _, total_cost, results = run_portfolio(costs, supply, demand, heuristics={"VAM": HEURISTICS["VAM"], "Broken": broken})
+    assert results[-1]["status"] == "failed: broken"
+    assert total_cost == results[0]["total_cost"]
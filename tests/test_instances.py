@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vogel import instance_frames, load_instance, read_matrix, read_vector, split_instance, validate_instance
+
+COSTS = np.array([[4.0, 6.0, 5.0], [5.0, 3.0, 7.0]])
+SUPPLY = np.array([10.0, 10.0])
+DEMAND = np.array([6.0, 8.0, 6.0])
+
+def test_text_label_column(tmp_path):
+    path = tmp_path / "costs.csv"
+    path.write_text("site,North,South\nParis,4,6\nLyon,5,3\n", encoding="utf-8")
+    values, rows, cols = read_matrix(str(path))
+    np.testing.assert_array_equal(values, [[4, 6], [5, 3]])
+    assert rows == ["Paris", "Lyon"]
+    assert cols == ["North", "South"]
+
+def test_unnamed_label_column(tmp_path):
+    # Numeric labels count as labels when their column has no header.
+    path = tmp_path / "costs.csv"
+    path.write_text(",North,South\n101,4,6\n102,5,3\n", encoding="utf-8")
+    values, rows, _ = read_matrix(str(path))
+    np.testing.assert_array_equal(values, [[4, 6], [5, 3]])
+    assert rows == ["101", "102"]
+
+def test_no_label_column(tmp_path):
+    path = tmp_path / "costs.csv"
+    path.write_text("North,South\n4,6\n5,3\n", encoding="utf-8")
+    values, rows, cols = read_matrix(str(path))
+    np.testing.assert_array_equal(values, [[4, 6], [5, 3]])
+    assert rows is None and cols == ["North", "South"]
+
+def test_parquet_index_labels_and_npy(tmp_path):
+    frame = pd.DataFrame(COSTS, index=["A", "B"], columns=["X", "Y", "Z"])
+    frame.to_parquet(tmp_path / "costs.parquet")
+    values, rows, cols = read_matrix(str(tmp_path / "costs.parquet"))
+    np.testing.assert_array_equal(values, COSTS)
+    assert (rows, cols) == (["A", "B"], ["X", "Y", "Z"])
+    np.save(tmp_path / "supply.npy", SUPPLY)
+    np.testing.assert_array_equal(read_vector(str(tmp_path / "supply.npy")), SUPPLY)
+
+def test_open_file_needs_a_name():
+    values, _, _ = read_matrix(io.BytesIO(b"a,b\n1,2\n"), name="upload.csv")
+    np.testing.assert_array_equal(values, [[1, 2]])
+    with pytest.raises(ValueError, match="Unsupported matrix file: upload.txt"):
+        read_matrix(io.BytesIO(b""), name="upload.txt")
+
+def test_instance_round_trip(tmp_path):
+    input_df, demand_df = instance_frames(COSTS, SUPPLY, DEMAND)
+    table = pd.concat([input_df, demand_df])
+    table.to_csv(tmp_path / "instance.csv")
+    costs, supply, demand = split_instance(*load_instance(str(tmp_path / "instance.csv")))
+    np.testing.assert_array_equal(costs, COSTS)
+    np.testing.assert_array_equal(supply, SUPPLY)
+    np.testing.assert_array_equal(demand, DEMAND)
+
+def test_valid_instance():
+    assert validate_instance(COSTS, SUPPLY, DEMAND) == []
+
+@pytest.mark.parametrize("costs, supply, demand, message", [
+    (COSTS, SUPPLY[:1], DEMAND, "Supply has 1 values for 2 suppliers"),
+    (COSTS, SUPPLY, DEMAND[:2], "Demand has 2 values for 3 customers"),
+    (COSTS[0], SUPPLY, DEMAND, "The cost matrix must be 2-D, got 1-D"),
+    (np.where(COSTS == 3.0, np.nan, COSTS), SUPPLY, DEMAND, "Costs contain missing or non-numeric values"),
+    (COSTS, [10.0, np.nan], DEMAND, "Supply contain missing or non-numeric values"),
+    (-COSTS, SUPPLY, DEMAND, "Costs must be positive"),
+    (COSTS, SUPPLY, [6.0, -8.0, 6.0], "Demand must be positive"),
+    (np.zeros((0, 3)), [], DEMAND, "Costs are empty"),
+])
+def test_invalid_instance(costs, supply, demand, message):
+    assert message in validate_instance(costs, supply, demand)
+
+def test_every_problem_is_reported():
+    errors = validate_instance(-COSTS, SUPPLY[:1], [np.nan, 1.0, 1.0])
+    assert errors == [
+        "Supply has 1 values for 2 suppliers",
+        "Costs must be positive",
+        "Demand contain missing or non-numeric values",
+    ]
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+from .reference import assert_plan, lp_optimum, random_instance
+
+X = INF
+
+# Unbalanced instances with forbidden lanes on which MODI used to pivot forever
+# (the first) or stop at a plan still using a forbidden lane, with its LP optimum.
+REGRESSIONS = [
+    (
+        [[X, 14.29], [29.07, 2.58], [X, 28.69], [19.43, X]],
+        [6, 4, 20, 34],
+        [23, 30],
+        1116.75,
+    ),
+    (
+        [
+            [7.4, X, 28.36, 33.86, X, X, 3.57],
+            [X, 27.66, 23.66, X, X, 38.63, 37.48],
+            [X, 44.54, 3.12, 1.91, 35.02, 15.31, X],
+            [36.34, 10.62, 5.55, 42.72, 59.49, X, 50.35],
+            [25.55, 3.5, 39.02, 34.23, X, 36.25, 29.01],
+            [1.29, X, 11.65, 29.84, X, 35.63, 28.52],
+            [25.23, X, 9.45, 27.79, 43.59, 55.7, 14.73],
+        ],
+        [32, 11, 30, 20, 16, 27, 7],
+        [27, 1, 38, 16, 37, 19, 16],
+        2410.77,
+    ),
+    (
+        [[36.24, 30.79], [14.62, X], [X, 16.63], [34.19, 8.84], [X, 2.03], [25.95, X], [4.32, X], [37.27, X]],
+        [1, 26, 9, 10, 18, 37, 33, 35],
+        [28, 22],
+        192.86,
+    ),
+]
+
+def solve(costs, supply, demand):
+    allocation, _ = vogel_approximation_method(costs, supply, demand)
+    return transportation_simplex(costs, supply, demand, allocation)
+
+@pytest.mark.parametrize("costs, supply, demand, optimum", REGRESSIONS)
+def test_forbidden_lane_regressions(costs, supply, demand, optimum):
+    allocation, total_cost, _ = solve(costs, supply, demand)
+    assert total_cost == pytest.approx(optimum)
+    assert_plan(allocation, supply, demand)
+    assert allocation[np.asarray(costs) >= INF].sum() == 0
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_lp_optimum(seed):
+    rng = np.random.default_rng(seed)
+    for trial in range(60):
+        costs, supply, demand = random_instance(
+            rng, forbidden=0.4 * (trial % 2), balanced=trial % 3 == 0, integer=trial % 4 == 0
+        )
+        optimum = lp_optimum(costs, supply, demand)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                solve(costs, supply, demand)
+            continue
+        allocation, total_cost, _ = solve(costs, supply, demand)
+        assert total_cost == pytest.approx(optimum, rel=1e-9, abs=1e-6)
+        assert_plan(allocation, supply, demand)
+
+def test_degenerate_assignment():
+    # Unit supplies and demands with few cost levels: nearly every pivot is degenerate.
+    rng = np.random.default_rng(3)
+    for trial in range(20):
+        n = int(rng.integers(5, 40))
+        costs = rng.integers(1, 4, (n, n)).astype(float)
+        if trial % 2:
+            costs[rng.random((n, n)) < 0.5] = INF
+        ones = np.ones(n)
+        optimum = lp_optimum(costs, ones, ones)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                solve(costs, ones, ones)
+            continue
+        allocation, total_cost, _ = solve(costs, ones, ones)
+        assert total_cost == pytest.approx(optimum)
+        assert_plan(allocation, ones, ones)
+
+def test_nearly_balanced_float_totals():
+    # Totals that differ only by rounding leave a dust-sized dummy line, whose
+    # cells used to close a cycle and keep a real flow cell out of the basis.
+    rng = np.random.default_rng(11)
+    for _ in range(40):
+        costs, supply, demand = random_instance(rng)
+        demand = demand * (supply.sum() / demand.sum())
+        allocation, total_cost, _ = solve(costs, supply, demand)
+        assert total_cost == pytest.approx(lp_optimum(costs, supply, demand), rel=1e-9)
+        assert_plan(allocation, supply, demand)
+
+def test_no_plan_without_forbidden_lanes():
+    # The second customer can only be served by the first supplier, over a forbidden lane.
+    with pytest.raises(ValueError):
+        solve([[1.0, INF], [2.0, INF]], [5, 5], [4, 6])
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vogel import min_cost_flow, solve_transshipment
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+from .reference import lp_optimum, random_instance
+
+def flow_optimum(n_nodes, tail, head, cost, capacity, balance):
+    # HiGHS on the same arcs: out minus in equals balance at every node.
+    optimize = pytest.importorskip("scipy.optimize")
+    incidence = np.zeros((n_nodes, len(tail)))
+    incidence[tail, np.arange(len(tail))] += 1
+    incidence[head, np.arange(len(tail))] -= 1
+    bounds = [(0, None if np.isinf(c) else c) for c in capacity]
+    result = optimize.linprog(cost, A_eq=incidence, b_eq=balance, bounds=bounds, method="highs")
+    return result.fun if result.status == 0 else None
+
+def random_network(rng, fractional=False):
+    n_nodes = int(rng.integers(4, 15))
+    n_arcs = int(rng.integers(n_nodes, 4 * n_nodes))
+    tail = rng.integers(0, n_nodes, n_arcs)
+    head = (tail + rng.integers(1, n_nodes, n_arcs)) % n_nodes
+    cost = rng.integers(0, 30, n_arcs).astype(float)
+    capacity = np.where(rng.random(n_arcs) < 0.3, np.inf, rng.integers(1, 40, n_arcs).astype(float))
+    balance = rng.integers(-20, 21, n_nodes).astype(float)
+    if fractional:
+        balance += rng.random(n_nodes).round(3)
+        capacity = capacity + 0.5
+    balance[-1] -= balance.sum()
+    return n_nodes, tail, head, cost, capacity, balance
+
+@pytest.mark.parametrize("fractional", [False, True])
+def test_min_cost_flow_matches_lp(fractional):
+    rng = np.random.default_rng(int(fractional))
+    for _ in range(60):
+        n_nodes, tail, head, cost, capacity, balance = random_network(rng, fractional)
+        optimum = flow_optimum(n_nodes, tail, head, cost, capacity, balance)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                min_cost_flow(n_nodes, tail, head, cost, capacity, balance)
+            continue
+        flow = min_cost_flow(n_nodes, tail, head, cost, capacity, balance)
+        assert np.dot(flow, cost) == pytest.approx(optimum, rel=1e-9, abs=1e-6)
+        assert np.all(flow >= -1e-9) and np.all(flow <= capacity + 1e-9)
+        net = np.bincount(tail, flow, n_nodes) - np.bincount(head, flow, n_nodes)
+        np.testing.assert_allclose(net, balance, atol=1e-6)
+
+def test_unbalanced_flow_is_rejected():
+    with pytest.raises(ValueError):
+        min_cost_flow(2, [0], [1], [1.0], [np.inf], [5.0, -4.0])
+
+def test_bipartite_network_matches_transportation():
+    # Without hubs, a transshipment network is a transportation problem.
+    rng = np.random.default_rng(5)
+    for trial in range(30):
+        costs, supply, demand = random_instance(rng, max_rows=8, max_cols=8, forbidden=0.3 * (trial % 2))
+        rows, cols = np.indices(costs.shape).reshape(2, -1)
+        optimum = lp_optimum(costs, supply, demand)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                solve_transshipment(supply, demand, rows, len(supply) + cols, costs.ravel())
+            continue
+        flow, total_cost = solve_transshipment(supply, demand, rows, len(supply) + cols, costs.ravel())
+        assert total_cost == pytest.approx(optimum)
+        allocation, _ = vogel_approximation_method(costs, supply, demand)
+        assert total_cost == pytest.approx(transportation_simplex(costs, supply, demand, allocation)[1])
+        assert flow[costs.ravel() >= INF].sum() == 0
+
+def test_hubs_with_capacities():
+    # Two suppliers, one hub, two customers. The direct lanes are dear, and the
+    # hub's cheap inbound arc from supplier 0 is capped at 8 units.
+    supply, demand = [10.0, 10.0], [9.0, 9.0]
+    tail = [0, 1, 2, 2, 0, 1]
+    head = [2, 2, 3, 4, 3, 4]
+    cost = [1.0, 3.0, 1.0, 1.0, 6.0, 6.0]
+    capacity = [8.0, np.inf, np.inf, np.inf, np.inf, np.inf]
+    stats = {}
+    flow, total_cost = solve_transshipment(supply, demand, tail, head, cost, capacity, n_hubs=1, stats=stats)
+    # 8 units at 1 + 1 through the hub, 10 at 3 + 1, and nothing direct.
+    assert total_cost == pytest.approx(8 * 2 + 10 * 4)
+    np.testing.assert_allclose(flow, [8, 10, 9, 9, 0, 0])
+    assert stats["unused_supply"] == pytest.approx(2.0)
+    assert stats["unmet_demand"] == 0.0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from vogel.plots import plot_sankey
+
+SOURCES = [f"Supplier {i}" for i in range(30)]
+DESTS = [f"Customer {j}" for j in range(40)]
+
+def allocation():
+    values = np.random.default_rng(0).random((30, 40))
+    values[values < 0.5] = 0
+    return values
+
+def throughput(fig):
+    sankey = fig.data[0]
+    source, target, value = (np.asarray(a) for a in (sankey.link.source, sankey.link.target, sankey.link.value))
+    labels = list(sankey.node.label)
+    out = np.bincount(source, weights=value, minlength=len(labels))
+    into = np.bincount(target, weights=value, minlength=len(labels))
+    return labels, out, into
+
+def test_all_lanes_below_top_k():
+    values = allocation()
+    fig = plot_sankey(values, SOURCES, DESTS)
+    assert len(fig.data[0].link.value) == np.count_nonzero(values)
+    assert fig.data[0].link.customdata[0] == "Supplier 0 → Customer 0"
+
+def test_top_k_keeps_every_node_total():
+    values = allocation()
+    fig = plot_sankey(values, SOURCES, DESTS, top_k=20)
+    labels, out, into = throughput(fig)
+    other = labels.index("Other lanes")
+    assert out[other] == pytest.approx(into[other])
+    np.testing.assert_allclose([out[labels.index(name)] for name in SOURCES], values.sum(axis=1))
+    np.testing.assert_allclose([into[labels.index(name)] for name in DESTS], values.sum(axis=0))
+    # 20 lanes, one link into "Other lanes" per supplier and one out per customer.
+    assert len(fig.data[0].link.value) == 20 + 30 + 40
+    assert len(fig.data[0].link.customdata) == len(fig.data[0].link.value)
+
+def test_top_k_on_lane_list():
+    values = allocation()
+    rows, cols = np.nonzero(values)
+    fig = plot_sankey((rows, cols, values[rows, cols]), SOURCES, DESTS, top_k=5)
+    labels, out, _ = throughput(fig)
+    np.testing.assert_allclose([out[labels.index(name)] for name in SOURCES], values.sum(axis=1))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from vogel import sample_scenarios, scenario_statistics, solve_scenarios
+from vogel.solver import INF, batch_vogel_approximation_method, vogel_approximation_method
+
+from .reference import assert_plan, random_instance
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_single_solves(seed):
+    rng = np.random.default_rng(seed)
+    for trial in range(10):
+        costs, supply, demand = random_instance(rng, forbidden=0.3 * (trial % 2), integer=trial % 3 == 0)
+        tensor, supplies, demands = sample_scenarios(costs, supply, demand, 12, seed=trial)
+        if trial % 4 == 0:
+            # Some scenarios balanced, and some with ties between scenarios' costs.
+            demands[::2] *= (supplies[::2].sum(axis=1) / demands[::2].sum(axis=1))[:, None]
+            tensor[1::3] = np.round(tensor[1::3])
+        allocations, totals = batch_vogel_approximation_method(tensor, supplies, demands)
+        for k in range(len(tensor)):
+            expected, expected_cost = vogel_approximation_method(tensor[k], supplies[k], demands[k])
+            np.testing.assert_array_equal(allocations[k], expected)
+            assert totals[k] == pytest.approx(expected_cost)
+
+def test_large_scenarios_use_single_solver():
+    rng = np.random.default_rng(4)
+    costs = rng.integers(1, 60, (60, 60)).astype(float)
+    supply, demand = np.full(60, 10.0), np.full(60, 9.0)
+    tensor, supplies, demands = sample_scenarios(costs, supply, demand, 3)
+    allocations, totals = batch_vogel_approximation_method(tensor, supplies, demands)
+    for k in range(3):
+        np.testing.assert_array_equal(allocations[k], vogel_approximation_method(tensor[k], supplies[k], demands[k])[0])
+
+@pytest.mark.parametrize("size", [12, 60])
+def test_batch_time_budget_completes_the_plans(size):
+    # Small scenarios stop the batched pass, large ones each single solve.
+    rng = np.random.default_rng(size)
+    costs = rng.integers(1, 60, (size, size)).astype(float)
+    tensor, supplies, demands = sample_scenarios(costs, np.full(size, 10.0), np.full(size, 9.0), 3)
+    stats = {}
+    allocations, totals = batch_vogel_approximation_method(tensor, supplies, demands, stats=stats, time_budget=0.0)
+    assert stats["vam_truncated"].all()
+    for k in range(3):
+        assert_plan(allocations[k], supplies[k], demands[k])
+        assert totals[k] == pytest.approx(np.sum(allocations[k] * tensor[k]))
+    batch_vogel_approximation_method(tensor, supplies, demands, stats=stats)
+    assert not stats["vam_truncated"].any()
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError):
+        batch_vogel_approximation_method(np.ones((2, 3, 4)), np.ones((2, 3)), np.ones((2, 5)))
+
+def test_sampling_keeps_forbidden_lanes():
+    costs = np.array([[1.0, INF], [3.0, 4.0]])
+    tensor, supplies, demands = sample_scenarios(costs, [5, 5], [4, 6], 50, seed=3)
+    assert np.all(tensor[:, 0, 1] == INF)
+    assert np.all(tensor[:, costs < INF] > 0)
+    assert np.all(demands >= 0)
+    np.testing.assert_array_equal(supplies, np.tile([5.0, 5.0], (50, 1)))
+
+def test_statistics():
+    tensor, supplies, demands = sample_scenarios([[4.0, 6.0], [5.0, 3.0]], [5, 5], [4, 6], 100, seed=0)
+    _, totals, stats = solve_scenarios(tensor, supplies, demands)
+    assert stats["scenarios"] == 100
+    assert stats["min"] <= stats["p5"] <= stats["p50"] <= stats["p95"] <= stats["max"]
+    assert stats["mean"] == pytest.approx(totals.mean())
+    assert scenario_statistics([1.0, np.nan, 3.0])["infeasible"] == 1
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from vogel import sensitivity_analysis, sensitivity_frames
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+from .reference import lp_optimum, random_instance
+
+def solve(costs, supply, demand):
+    allocation, _ = vogel_approximation_method(costs, supply, demand)
+    return transportation_simplex(costs, supply, demand, allocation, return_basis=True)
+
+def instances(seed, count, **kwargs):
+    # Float supplies and demand below supply, so bases are rarely degenerate.
+    rng = np.random.default_rng(seed)
+    for trial in range(count):
+        costs, supply, demand = random_instance(rng, max_rows=8, max_cols=8, **kwargs)
+        supply = supply + rng.random(len(supply))
+        demand = demand * (0.9 * supply.sum() / demand.sum())
+        yield costs, supply, demand
+
+@pytest.mark.parametrize("forbidden", [0.0, 0.3])
+def test_reduced_costs_at_optimum(forbidden):
+    for costs, supply, demand in instances(1, 30, forbidden=forbidden):
+        if lp_optimum(costs, supply, demand) is None:
+            continue
+        allocation, _, _, basis = solve(costs, supply, demand)
+        result = sensitivity_analysis(costs, supply, demand, basis)
+        allowed = costs < INF
+        assert np.all(result["reduced"][allowed] >= -1e-7)
+        np.testing.assert_allclose(result["reduced"][result["basic"] & allowed], 0.0, atol=1e-7)
+        assert np.all(result["basic"][allocation > 0])
+        assert np.all(np.isnan(result["cost_lower"][~allowed]))
+
+def test_forbidden_lanes_leave_ranges_unbounded():
+    # Every lane that could replace (1, 1) or (2, 1) in the basis is forbidden, so
+    # both ranges are unbounded rather than cut off near INF.
+    costs = np.array([[4.0, INF, 8.0], [INF, 5.0, 3.0], [6.0, 7.0, INF]])
+    supply = demand = np.full(3, 10.0)
+    _, _, _, basis = solve(costs, supply, demand)
+    result = sensitivity_analysis(costs, supply, demand, basis)
+    assert result["cost_lower"][2, 1] == -np.inf
+    assert result["cost_upper"][1, 1] == np.inf
+
+@pytest.mark.parametrize("seed", range(2))
+def test_bounds_with_forbidden_lanes(seed):
+    # Every bound on an allowed lane is either a real cost or unbounded.
+    for costs, supply, demand in instances(seed + 5, 30, forbidden=0.3):
+        if lp_optimum(costs, supply, demand) is None:
+            continue
+        _, _, _, basis = solve(costs, supply, demand)
+        result = sensitivity_analysis(costs, supply, demand, basis)
+        allowed = costs < INF
+        for bound in (result["cost_lower"][allowed], result["cost_upper"][allowed]):
+            assert np.all(np.isinf(bound) | (np.abs(bound) < INF / 2))
+
+def test_cost_change_within_range_keeps_the_plan():
+    checked = 0
+    for costs, supply, demand in instances(2, 20):
+        allocation, total_cost, _, basis = solve(costs, supply, demand)
+        result = sensitivity_analysis(costs, supply, demand, basis)
+        for i, j in zip(*np.nonzero(allocation > 0)):
+            lower, upper = result["cost_lower"][i, j], result["cost_upper"][i, j]
+            for new_cost in (max(lower, 0.0), min(upper, costs[i, j] + 100.0)):
+                changed = costs.copy()
+                changed[i, j] = new_cost
+                expected = total_cost + (new_cost - costs[i, j]) * allocation[i, j]
+                assert lp_optimum(changed, supply, demand) == pytest.approx(expected, rel=1e-9, abs=1e-6)
+                checked += 1
+    assert checked > 50
+
+def test_shadow_prices():
+    for costs, supply, demand in instances(3, 20):
+        _, total_cost, _, basis = solve(costs, supply, demand)
+        result = sensitivity_analysis(costs, supply, demand, basis)
+        for j in range(len(demand)):
+            more = demand.copy()
+            more[j] += 1e-3
+            change = (lp_optimum(costs, supply, more) - total_cost) / 1e-3
+            assert change == pytest.approx(result["demand_price"][j], rel=1e-6, abs=1e-6)
+
+def test_frames():
+    costs, supply, demand = next(instances(4, 1, forbidden=0.3))
+    allocation, _, _, basis = solve(costs, supply, demand)
+    result = sensitivity_analysis(costs, supply, demand, basis)
+    names = [f"S{i}" for i in range(len(supply))], [f"C{j}" for j in range(len(demand))]
+    lanes, prices = sensitivity_frames(result, costs, allocation, *names)
+    assert len(lanes) == np.count_nonzero(costs < INF)
+    assert len(prices) == len(supply) + len(demand)
+    lanes, _ = sensitivity_frames(result, costs, allocation, *names, basic_only=True)
+    assert lanes["Basic"].all()
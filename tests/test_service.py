@@ -0,0 +1,93 @@
+import http.client
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from vogel.service import SolveService, _solve_many, _solve_one, make_server
+from vogel.solver import INF
+
+from .reference import assert_plan, lp_optimum, random_instance
+
+INSTANCE = {"costs": [[4, 6], [5, 3]], "supply": [5, 5], "demand": [4, 6]}
+
+@pytest.fixture(scope="module")
+def server():
+    service = SolveService(workers=1, max_body_bytes=4096).start()
+    httpd = make_server(service, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    service.stop()
+
+def post(server, path, body=b"", headers=None):
+    # Sends `headers` as given, so Content-Length can be missing or wrong.
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=30)
+    conn.putrequest("POST", path)
+    for name, value in (headers or {}).items():
+        conn.putheader(name, value)
+    conn.endheaders(body)
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read())
+    conn.close()
+    return result
+
+def post_json(server, path, payload):
+    body = json.dumps(payload).encode()
+    return post(server, path, body, {"Content-Type": "application/json", "Content-Length": str(len(body))})
+
+def test_solve(server):
+    status, result = post_json(server, "/solve", INSTANCE)
+    assert status == 200
+    assert result["total_cost"] == pytest.approx(lp_optimum(INSTANCE["costs"], INSTANCE["supply"], INSTANCE["demand"]))
+    assert not result["timed_out"]
+
+def test_no_plan_is_422(server):
+    status, result = post_json(server, "/solve", {"costs": [[1, INF], [2, INF]], "supply": [5, 5], "demand": [4, 6]})
+    assert status == 422
+    assert "forbidden" in result["error"]
+
+@pytest.mark.parametrize("optimize", ["false", 0, None, [True]])
+def test_optimize_must_be_a_boolean(server, optimize):
+    status, result = post_json(server, "/solve", {**INSTANCE, "optimize": optimize})
+    assert status == 400
+    assert "optimize" in result["error"]
+    assert post_json(server, "/batch", {"instances": [INSTANCE], "optimize": optimize})[0] == 400
+
+def test_batch_rejects_one_bad_optimize(server):
+    status, result = post_json(server, "/batch", {"instances": [{**INSTANCE, "optimize": "false"}, {**INSTANCE, "optimize": False}]})
+    assert status == 200
+    bad, good = result["results"]
+    assert bad["status"] == 400 and "optimize" in bad["error"]
+    assert good["pivots"] == 0
+
+@pytest.mark.parametrize("length", ["-1", "abc", "+12", "1e3", "\xb2"])
+def test_invalid_content_length_is_400(server, length):
+    status, _ = post(server, "/solve", b"{}", {"Content-Length": length})
+    assert status == 400
+
+def test_missing_content_length_is_411(server):
+    assert post(server, "/solve")[0] == 411
+
+def test_large_body_is_413(server):
+    status, _ = post(server, "/solve", b"", {"Content-Length": "5000"})
+    assert status == 413
+
+def test_solve_stops_at_time_budget():
+    rng = np.random.default_rng(0)
+    costs, supply, demand = random_instance(rng, max_rows=40, max_cols=40)
+    result = _solve_one(costs, supply, demand, True, time_budget=0.0)
+    assert result["timed_out"]
+    assert_plan(result["allocation"], supply, demand)
+    assert not _solve_one(costs, supply, demand, True)["timed_out"]
+
+def test_vam_batch_stops_at_time_budget():
+    rng = np.random.default_rng(1)
+    costs = rng.integers(1, 60, (30, 30)).astype(float)
+    jobs = [(costs, np.full(30, 10.0), np.full(30, 9.0), False)] * 3
+    for result in _solve_many(jobs, time_budget=0.0):
+        assert result["timed_out"]
+        assert_plan(result["allocation"], jobs[0][1], jobs[0][2])
+    assert not any(result["timed_out"] for result in _solve_many(jobs))
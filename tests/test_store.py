@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from vogel import RunStore
+
+COSTS = np.array([[4.0, 6.0, 5.0], [5.0, 3.0, 7.0]])
+SUPPLY = np.array([10.0, 10.0])
+DEMAND = np.array([6.0, 8.0, 6.0])
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(tmp_path / "runs.sqlite")
+    yield store
+    store.close()
+
+def save(store, allocation, **names):
+    total_cost = np.sum(allocation * COSTS)
+    return store.save(COSTS, SUPPLY, DEMAND, allocation, total_cost, total_cost, **names)
+
+def test_round_trip(store):
+    allocation = np.array([[6.0, 0.0, 4.0], [0.0, 8.0, 2.0]])
+    run_id = save(store, allocation)
+    run = store.load(run_id)
+    np.testing.assert_array_equal(run["allocation"], allocation)
+    assert store.find(COSTS, SUPPLY, DEMAND) == run_id
+    assert list(store.lanes(run_id).columns) == ["Supplier", "Customer", "Qty", "Unit Cost"]
+
+def test_diff(store):
+    a = save(store, np.array([[6.0, 0.0, 4.0], [0.0, 8.0, 2.0]]))
+    b = save(store, np.array([[6.0, 0.0, 0.0], [0.0, 8.0, 6.0]]))
+    diff = store.diff(a, b)
+    # Largest cost change first: +4 × 7 before -4 × 5.
+    assert list(zip(diff["Supplier"], diff["Customer"], diff["Δ Qty"])) == [
+        ("Supplier 2", "Customer 3", 4.0),
+        ("Supplier 1", "Customer 3", -4.0),
+    ]
+    assert diff["Δ Cost"].sum() == pytest.approx(4 * (7.0 - 5.0))
+    assert len(store.diff(a, b, changed_only=False)) == 4
+
+def test_diff_with_duplicate_names(store):
+    # Both suppliers named "Depot": each lane must meet its own counterpart only.
+    names = dict(source_names=["Depot", "Depot"], dest_names=["North", "North", "South"])
+    a = save(store, np.array([[6.0, 0.0, 4.0], [0.0, 8.0, 2.0]]), **names)
+    b = save(store, np.array([[6.0, 0.0, 0.0], [0.0, 8.0, 6.0]]), **names)
+    diff = store.diff(a, b, changed_only=False)
+    assert len(diff) == 4
+    assert diff["Qty A"].sum() == 20.0 and diff["Qty B"].sum() == 20.0
+    assert diff["Δ Cost"].sum() == pytest.approx(8.0)
+    assert list(diff.columns[:2]) == ["Supplier", "Customer"]
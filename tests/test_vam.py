@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+
+from vogel.solver import (
+    BLOCK_BYTES_PER_CELL,
+    INF,
+    _LinePool,
+    blocked_vogel_approximation_method,
+    csr_lanes,
+    lean_vogel_approximation_method,
+    sparse_vogel_approximation_method,
+    vogel_approximation_method,
+)
+
+from .reference import assert_plan, baseline_vam, dense, lp_optimum, random_instance
+
+def instances(seed, count, **kwargs):
+    # Alternating forbidden lanes, integer costs (ties) and balanced totals.
+    rng = np.random.default_rng(seed)
+    for trial in range(count):
+        options = dict(forbidden=0.3 * (trial % 2), integer=trial % 3 == 0, balanced=trial % 4 == 0)
+        options.update(kwargs)
+        yield random_instance(rng, **options)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_baseline(seed):
+    for costs, supply, demand in instances(seed, 100):
+        expected, expected_cost = baseline_vam(costs, supply, demand)
+        allocation, total_cost = vogel_approximation_method(costs, supply, demand)
+        np.testing.assert_array_equal(allocation, expected)
+        assert total_cost == expected_cost
+
+def test_large_instance_matches_baseline():
+    rng = np.random.default_rng(9)
+    costs, supply, demand = random_instance(rng, max_rows=80, max_cols=80, forbidden=0.2, integer=True)
+    allocation, _ = vogel_approximation_method(costs, supply, demand)
+    np.testing.assert_array_equal(allocation, baseline_vam(costs, supply, demand)[0])
+
+@pytest.mark.parametrize("tie_break", ["index", "cost"])
+def test_plan_is_feasible_and_above_optimum(tie_break):
+    for costs, supply, demand in instances(4, 60, forbidden=0.0):
+        allocation, total_cost = vogel_approximation_method(costs, supply, demand, tie_break=tie_break)
+        assert_plan(allocation, supply, demand)
+        assert total_cost >= lp_optimum(costs, supply, demand) - 1e-6
+
+def test_stats():
+    costs, supply, demand = next(instances(5, 1))
+    stats = {}
+    vogel_approximation_method(costs, supply, demand, stats=stats)
+    assert stats["vam_steps"] >= max(costs.shape)
+    assert stats["vam_fallbacks"] == 0
+
+def test_time_budget_completes_the_plan():
+    rng = np.random.default_rng(6)
+    costs, supply, demand = random_instance(rng, max_rows=60, max_cols=60)
+    stats = {}
+    allocation, total_cost = vogel_approximation_method(costs, supply, demand, stats=stats, time_budget=0.0)
+    assert stats["vam_truncated"]
+    assert_plan(allocation, supply, demand)
+    assert total_cost < INF
+
+@pytest.mark.parametrize("seed", range(2))
+def test_sparse_matches_dense(seed):
+    # Forbidden lanes are left out of the lane list, in shuffled order.
+    rng = np.random.default_rng(seed)
+    for costs, supply, demand in instances(seed, 60):
+        expected, expected_cost = vogel_approximation_method(costs, supply, demand)
+        rows, cols = np.nonzero(costs < INF)
+        order = rng.permutation(len(rows))
+        rows, cols = rows[order], cols[order]
+        result = sparse_vogel_approximation_method(rows, cols, costs[rows, cols], supply, demand)
+        np.testing.assert_array_equal(dense(result, costs.shape), expected)
+        assert result[1] == pytest.approx(expected_cost)
+
+def test_sparse_from_csr():
+    costs, supply, demand = next(instances(7, 1, forbidden=0.4))
+    rows, cols = np.nonzero(costs < INF)
+    indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=len(supply)))]
+    result = sparse_vogel_approximation_method(*csr_lanes(indptr, cols, costs[rows, cols]), supply, demand)
+    np.testing.assert_array_equal(dense(result, costs.shape), vogel_approximation_method(costs, supply, demand)[0])
+
+@pytest.mark.parametrize("seed", range(2))
+def test_lean_matches_dense(seed):
+    for costs, supply, demand in instances(seed, 60):
+        expected, expected_cost = vogel_approximation_method(costs, supply, demand)
+        result = lean_vogel_approximation_method(costs, supply, demand)
+        np.testing.assert_array_equal(dense(result, costs.shape), expected)
+        assert result[1] == pytest.approx(expected_cost)
+
+@pytest.mark.parametrize("dtype", [np.float32, np.int32, np.int64])
+def test_lean_narrow_dtypes(dtype):
+    # Integer costs are exact in every dtype, so the plan cannot change.
+    for costs, supply, demand in instances(3, 30, integer=True):
+        expected, _ = vogel_approximation_method(costs, supply, demand)
+        narrow = costs.astype(dtype)
+        np.testing.assert_array_equal(dense(lean_vogel_approximation_method(narrow, supply, demand), costs.shape), expected)
+        np.testing.assert_array_equal(
+            dense(lean_vogel_approximation_method(costs, supply, demand, dtype=dtype), costs.shape), expected
+        )
+        # The caller's matrix is read, never written.
+        np.testing.assert_array_equal(narrow, costs.astype(dtype))
+
+@pytest.mark.parametrize("cache_lanes", [1, 3, 16])
+def test_blocked_matches_dense(tmp_path, cache_lanes):
+    # Tiny caches and blocks of a few rows force rescans of rows and columns.
+    path = tmp_path / "costs.npy"
+    for costs, supply, demand in instances(cache_lanes, 30, max_rows=30, max_cols=30):
+        expected, expected_cost = vogel_approximation_method(costs, supply, demand)
+        np.save(path, costs)
+        before = path.read_bytes()
+        memory_mb = 4 * costs.shape[1] * (BLOCK_BYTES_PER_CELL + 8) / 2**20
+        stats = {}
+        result = blocked_vogel_approximation_method(
+            str(path), supply, demand, memory_mb=memory_mb, cache_lanes=cache_lanes, stats=stats
+        )
+        np.testing.assert_array_equal(dense(result, costs.shape), expected)
+        assert result[1] == pytest.approx(expected_cost)
+        assert path.read_bytes() == before
+        assert stats["block_rows"] == 4
+
+def test_blocked_on_memmap(tmp_path):
+    costs, supply, demand = next(instances(8, 1, max_rows=40, max_cols=40, integer=True))
+    mapped = np.lib.format.open_memmap(tmp_path / "costs.npy", mode="w+", dtype=np.float32, shape=costs.shape)
+    mapped[:] = costs
+    mapped.flush()
+    readonly = np.load(tmp_path / "costs.npy", mmap_mode="r")
+    stats = {}
+    result = blocked_vogel_approximation_method(readonly, supply, demand, cache_lanes=2, stats=stats)
+    np.testing.assert_array_equal(dense(result, costs.shape), vogel_approximation_method(costs, supply, demand)[0])
+    assert stats["row_rescans"] + stats["column_scans"] > 0
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 8])
+def test_line_pool_covers_every_line_once(workers):
+    for n_lines in (0, 1, 15, 16, 17, 100, 1000):
+        seen = np.zeros(n_lines, dtype=int)
+
+        def mark(lo, hi):
+            seen[lo:hi] += 1
+
+        with _LinePool(workers) as pool:
+            pool.each(mark, n_lines)
+        assert np.all(seen == 1)
+
+@pytest.mark.parametrize("workers", [2, 3, 8])
+def test_results_do_not_depend_on_workers(workers):
+    # Enough lines for several chunks, with ties from integer costs.
+    rng = np.random.default_rng(workers)
+    for integer in (True, False):
+        costs = rng.integers(1, 60, (150, 120)).astype(float)
+        if not integer:
+            costs += rng.random(costs.shape).round(2)
+        costs[rng.random(costs.shape) < 0.1] = INF
+        supply, demand = rng.integers(1, 40, 150).astype(float), rng.integers(1, 40, 120).astype(float)
+        expected, _ = vogel_approximation_method(costs, supply, demand)
+        np.testing.assert_array_equal(vogel_approximation_method(costs, supply, demand, workers=workers)[0], expected)
+        lean = lean_vogel_approximation_method(costs, supply, demand, workers=workers)
+        np.testing.assert_array_equal(dense(lean, costs.shape), expected)
+        blocked = blocked_vogel_approximation_method(costs, supply, demand, cache_lanes=4, workers=workers)
+        np.testing.assert_array_equal(dense(blocked, costs.shape), expected)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vogel.solver import INF, transportation_simplex, vogel_approximation_method
+
+from .reference import assert_plan, lp_optimum, random_instance
+
+def first_solve(costs, supply, demand):
+    allocation, _ = vogel_approximation_method(costs, supply, demand)
+    return transportation_simplex(costs, supply, demand, allocation, return_basis=True)[3]
+
+def edits(seed, count):
+    # (costs, supply, demand) before and after a small edit: demand, supply or
+    # costs scaled by up to 20 %, or one lane's cost changed.
+    rng = np.random.default_rng(seed)
+    for trial in range(count):
+        costs, supply, demand = random_instance(rng, forbidden=0.3 * (trial % 2), balanced=trial % 3 == 0)
+        new_costs, new_supply, new_demand = costs.copy(), supply.copy(), demand.copy()
+        kind = trial % 4
+        if kind == 0:
+            new_demand *= rng.uniform(0.8, 1.2, len(demand))
+        elif kind == 1:
+            new_supply *= rng.uniform(0.8, 1.2, len(supply))
+        elif kind == 2:
+            allowed = costs < INF
+            new_costs[allowed] *= rng.uniform(0.8, 1.2, allowed.sum())
+        else:
+            i, j = rng.integers(len(supply)), rng.integers(len(demand))
+            if costs[i, j] < INF:
+                new_costs[i, j] = rng.uniform(1, 60)
+        yield (costs, supply, demand), (new_costs, new_supply, new_demand)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_warm_start_reaches_optimum(seed):
+    for (costs, supply, demand), (new_costs, new_supply, new_demand) in edits(seed, 40):
+        if lp_optimum(costs, supply, demand) is None:
+            continue
+        basis = first_solve(costs, supply, demand)
+        optimum = lp_optimum(new_costs, new_supply, new_demand)
+        if optimum is None:
+            with pytest.raises(ValueError):
+                transportation_simplex(new_costs, new_supply, new_demand, basis=basis, basis_costs=costs)
+            continue
+        allocation, total_cost, _ = transportation_simplex(
+            new_costs, new_supply, new_demand, basis=basis, basis_costs=costs
+        )
+        assert total_cost == pytest.approx(optimum, rel=1e-9, abs=1e-6)
+        assert_plan(allocation, new_supply, new_demand)
+
+def test_unchanged_instance_needs_no_pivots():
+    costs, supply, demand = random_instance(np.random.default_rng(1))
+    basis = first_solve(costs, supply, demand)
+    stats = {}
+    _, total_cost, pivots = transportation_simplex(costs, supply, demand, basis=basis, basis_costs=costs, stats=stats)
+    assert stats["warm_start"]
+    assert pivots == 0
+    assert total_cost == pytest.approx(lp_optimum(costs, supply, demand))
+
+def test_demand_change_uses_dual_pivots():
+    # Supply stays ahead of demand, so the dummy customer (and the basis shape) stays.
+    rng = np.random.default_rng(2)
+    costs = rng.integers(1, 60, (8, 6)).astype(float)
+    supply = np.full(8, 30.0)
+    demand = np.full(6, 20.0)
+    basis = first_solve(costs, supply, demand)
+    new_demand = demand.copy()
+    new_demand[np.argmin(costs.min(axis=0))] += 60
+    stats = {}
+    _, total_cost, _ = transportation_simplex(costs, supply, new_demand, basis=basis, basis_costs=costs, stats=stats)
+    assert stats["warm_start"]
+    assert stats["dual_pivots"] > 0
+    assert total_cost == pytest.approx(lp_optimum(costs, supply, new_demand))
+
+def test_basis_of_another_shape_is_ignored():
+    rng = np.random.default_rng(3)
+    costs, supply, demand = random_instance(rng, max_rows=5, max_cols=5)
+    basis = first_solve(costs, supply, demand)
+    bigger = np.pad(costs, ((0, 1), (0, 1)), constant_values=10.0)
+    stats = {}
+    _, total_cost, _ = transportation_simplex(
+        bigger, np.r_[supply, 5.0], np.r_[demand, 5.0], basis=basis, basis_costs=costs, stats=stats
+    )
+    assert not stats["warm_start"]
+    assert total_cost == pytest.approx(lp_optimum(bigger, np.r_[supply, 5.0], np.r_[demand, 5.0]))
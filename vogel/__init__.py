@@ -0,0 +1,41 @@
+from .solver import (
+    BATCH_CELLS,
+    INF,
+    OUT_OF_CORE_LANES,
+    batch_vogel_approximation_method,
+    blocked_vogel_approximation_method,
+    csr_lanes,
+    lean_vogel_approximation_method,
+    repair_allocation,
+    sparse_vogel_approximation_method,
+    transportation_simplex,
+    vogel_approximation_method,
+)
+from .export import STREAMING_CELLS, export_lanes, generate_excel, generate_excel_streaming, iter_lanes
+from .plots import SANKEY_TOP_K, WEBGL_LANES, plot_flow_map, plot_sankey
+from .instances import (
+    instance_frames,
+    load_instance,
+    read_matrix,
+    read_vector,
+    split_instance,
+    validate_instance,
+)
+from .cache import ResultCache, instance_key
+from .feedback import FeedbackQueue
+from .scenarios import sample_scenarios, scenario_statistics, solve_scenarios
+from .sensitivity import sensitivity_analysis, sensitivity_frames
+from .diagnostics import Diagnostics, enable_json_logging
+from .heuristics import (
+    HEURISTICS,
+    least_cost_method,
+    north_west_corner,
+    run_portfolio,
+    russell_approximation_method,
+)
+from .service import SolveService, make_server, serve
+from .loadtest import run_load_test
+from .store import RunStore
+from .analytics import kpi_cube, kpi_frames
+from .network import min_cost_flow, read_network, solve_transshipment
+from .geo import DISTANCE_METRICS, build_costs, coordinates_key, distance_matrix, read_sites
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+def _lanes(allocation):
+    if isinstance(allocation, tuple):
+        rows, cols, qty = (np.asarray(a) for a in allocation)
+        keep = qty > 0
+        return rows[keep], cols[keep], qty[keep].astype(float)
+    allocation = np.asarray(allocation)
+    rows, cols = np.nonzero(allocation > 0)
+    return rows, cols, allocation[rows, cols].astype(float)
+
+def _ratio(num, den):
+    out = np.full(len(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+def kpi_cube(cost_matrix, supply, demand, allocation):
+    # Every plan KPI from one pass over the non-zero lanes, so charts and reports
+    # share it instead of slicing the allocation again. `allocation` may be dense,
+    # with the dummy line the solve added, or the (rows, cols, qty) lane list of the
+    # sparse and lean solvers. The dummy line need not be in it: its flow is the
+    # capacity left unused plus the demand left unmet, and it costs nothing.
+    #   lane_*              non-zero lanes, dummy ones included if present
+    #   supplier_*          cost, units shipped to real customers, utilization of
+    #                       the capacity and what is left on the dummy customer
+    #   customer_*          landed cost, units received from real suppliers, unit
+    #                       landed cost, fill rate and shortfall from the dummy supplier
+    #   dummy_share         share of all allocated units on the dummy line
+    costs = np.asarray(cost_matrix, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    n_rows, n_cols = costs.shape
+    rows, cols, qty = _lanes(allocation)
+    real = (rows < n_rows) & (cols < n_cols)
+    unit_cost = np.zeros(len(qty))
+    unit_cost[real] = costs[rows[real], cols[real]]
+    cost = qty * unit_cost
+
+    real_qty = np.where(real, qty, 0.0)
+    supplier_rows, customer_cols = rows < n_rows, cols < n_cols
+    supplier_cost = np.bincount(rows[supplier_rows], cost[supplier_rows], minlength=n_rows)
+    supplier_shipped = np.bincount(rows[supplier_rows], real_qty[supplier_rows], minlength=n_rows)
+    customer_cost = np.bincount(cols[customer_cols], cost[customer_cols], minlength=n_cols)
+    customer_received = np.bincount(cols[customer_cols], real_qty[customer_cols], minlength=n_cols)
+    supplier_unused = np.maximum(supply - supplier_shipped, 0.0)
+    customer_shortfall = np.maximum(demand - customer_received, 0.0)
+    dummy_qty = supplier_unused.sum() + customer_shortfall.sum()
+    total_qty = real_qty.sum() + dummy_qty
+
+    return {
+        "lane_rows": rows,
+        "lane_cols": cols,
+        "lane_qty": qty,
+        "lane_unit_cost": unit_cost,
+        "lane_cost": cost,
+        "supplier_cost": supplier_cost,
+        "supplier_shipped": supplier_shipped,
+        "supplier_capacity": supply,
+        "supplier_utilization": _ratio(supplier_shipped, supply),
+        "supplier_unused": supplier_unused,
+        "customer_cost": customer_cost,
+        "customer_received": customer_received,
+        "customer_demand": demand,
+        "customer_unit_cost": _ratio(customer_cost, customer_received),
+        "customer_fill_rate": _ratio(customer_received, demand),
+        "customer_shortfall": customer_shortfall,
+        "total_cost": cost.sum(),
+        "total_qty": total_qty,
+        "dummy_qty": dummy_qty,
+        "dummy_share": dummy_qty / total_qty if total_qty > 0 else 0.0,
+    }
+
+def kpi_frames(cube, source_names, dest_names):
+    # (suppliers, customers, summary) tables for display and export.
+    suppliers = pd.DataFrame({
+        "Supplier": list(source_names),
+        "Cost": cube["supplier_cost"],
+        "Shipped": cube["supplier_shipped"],
+        "Capacity": cube["supplier_capacity"],
+        "Utilization": cube["supplier_utilization"],
+        "Unused": cube["supplier_unused"],
+    })
+    customers = pd.DataFrame({
+        "Customer": list(dest_names),
+        "Landed Cost": cube["customer_cost"],
+        "Received": cube["customer_received"],
+        "Demand": cube["customer_demand"],
+        "Unit Landed Cost": cube["customer_unit_cost"],
+        "Fill Rate": cube["customer_fill_rate"],
+        "Shortfall": cube["customer_shortfall"],
+    })
+    summary = pd.DataFrame({
+        "KPI": ["Total cost", "Units allocated", "Units on the dummy line", "Dummy share", "Lanes used"],
+        "Value": [
+            cube["total_cost"], cube["total_qty"], cube["dummy_qty"], cube["dummy_share"],
+            int(np.count_nonzero((cube["lane_rows"] < len(suppliers)) & (cube["lane_cols"] < len(customers)))),
+        ],
+    })
+    return suppliers, customers, summary
@@ -0,0 +1,136 @@
+import csv
+import json
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .export import generate_excel
+from .generators import INSTANCE_KINDS, random_instance
+from .instances import instance_frames
+from .plots import plot_sankey
+from .solver import lean_vogel_approximation_method, transportation_simplex, vogel_approximation_method
+
+DEFAULT_SIZES = (10, 100, 500, 1000, 2000, 5000)
+STAGES = ("vam", "lean", "modi", "sankey", "excel")
+DEFAULT_STAGES = ("vam", "sankey", "excel")
+RESULT_FIELDS = ["kind", "dtype", "rows", "cols", "stage", "seconds", "peak_mb", "total_cost"]
+
+def _measure(fn, repeat=1, memory=True):
+    # Best wall time over `repeat` runs; peak memory from one extra traced run,
+    # since tracemalloc slows Python code down.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, min(times), peak_mb
+
+def run_benchmarks(sizes=DEFAULT_SIZES, kinds=INSTANCE_KINDS, dtypes=("int", "float"), stages=DEFAULT_STAGES,
+                   repeat=1, memory=True, seed=0, progress=None):
+    records = []
+    for size in sizes:
+        for kind in kinds:
+            for dtype in dtypes:
+                costs, supply, demand = random_instance(size, size, kind, integer=dtype == "int", seed=seed)
+                base = {"kind": kind, "dtype": dtype, "rows": size, "cols": size}
+
+                def record(stage, seconds, peak_mb, total_cost=None):
+                    records.append({**base, "stage": stage, "seconds": seconds, "peak_mb": peak_mb,
+                                    "total_cost": None if total_cost is None else float(total_cost)})
+                    if progress:
+                        progress(records[-1])
+
+                solve = lambda: vogel_approximation_method(costs, supply, demand)
+                if "vam" in stages:
+                    (allocation, total_cost), seconds, peak_mb = _measure(solve, repeat, memory)
+                    record("vam", seconds, peak_mb, total_cost)
+                else:
+                    allocation, total_cost = solve()
+
+                if "lean" in stages:
+                    lean = lambda: lean_vogel_approximation_method(costs, supply, demand)
+                    (_, lean_cost), seconds, peak_mb = _measure(lean, repeat, memory)
+                    record("lean", seconds, peak_mb, lean_cost)
+
+                if "modi" in stages:
+                    optimize = lambda: transportation_simplex(costs, supply, demand, allocation)
+                    (_, optimal_cost, _), seconds, peak_mb = _measure(optimize, repeat, memory)
+                    record("modi", seconds, peak_mb, optimal_cost)
+
+                input_df, demand_df = instance_frames(costs, supply, demand)
+                if "sankey" in stages:
+                    sankey = lambda: plot_sankey(allocation, list(input_df.index), list(demand_df.columns))
+                    _, seconds, peak_mb = _measure(sankey, repeat, memory)
+                    record("sankey", seconds, peak_mb)
+
+                if "excel" in stages:
+                    res_df = pd.DataFrame(allocation, index=input_df.index, columns=demand_df.columns)
+                    excel = lambda: generate_excel(input_df, demand_df, res_df, total_cost, "€")
+                    _, seconds, peak_mb = _measure(excel, repeat, memory)
+                    record("excel", seconds, peak_mb)
+    return records
+
+def write_results(records, path):
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        return
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": records,
+    }
+    path.write_text(json.dumps(payload, indent=2))
+
+def load_results(path):
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row["rows"], row["cols"] = int(row["rows"]), int(row["cols"])
+            row["seconds"] = float(row["seconds"])
+            row["peak_mb"] = float(row["peak_mb"]) if row["peak_mb"] else None
+        return rows
+    return json.loads(path.read_text())["results"]
+
+def compare_results(baseline, current, threshold=0.10, min_seconds=0.001):
+    # A stage regresses when it is `threshold` slower (or uses that much more peak
+    # memory) than the baseline, ignoring timings below `min_seconds` as noise.
+    key = lambda r: (r["kind"], r["dtype"], r["rows"], r["cols"], r["stage"])
+    before = {key(r): r for r in baseline}
+    rows = []
+    for r in current:
+        old = before.get(key(r))
+        if old is None:
+            continue
+        time_ratio = r["seconds"] / old["seconds"] if old["seconds"] > 0 else float("inf")
+        slower = time_ratio > 1 + threshold and r["seconds"] - old["seconds"] > min_seconds
+        mem_ratio = None
+        bigger = False
+        if r.get("peak_mb") and old.get("peak_mb"):
+            mem_ratio = r["peak_mb"] / old["peak_mb"]
+            bigger = mem_ratio > 1 + threshold
+        rows.append({
+            "kind": r["kind"], "dtype": r["dtype"], "size": f"{r['rows']}x{r['cols']}", "stage": r["stage"],
+            "base_s": old["seconds"], "new_s": r["seconds"], "time_ratio": time_ratio, "mem_ratio": mem_ratio,
+            "regression": slower or bigger,
+        })
+    return rows
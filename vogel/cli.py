@@ -0,0 +1,354 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import bench, service
+from .export import STREAMING_CELLS, export_lanes, generate_excel, generate_excel_streaming
+from .generators import INSTANCE_KINDS
+from .instances import INSTANCE_SUFFIXES, load_instance, read_vector, split_instance
+from .loadtest import run_load_test
+from .network import read_network, solve_transshipment
+from .plots import plot_sankey
+from .solver import (
+    INF,
+    OUT_OF_CORE_LANES,
+    blocked_vogel_approximation_method,
+    lean_vogel_approximation_method,
+    repair_allocation,
+    transportation_simplex,
+    vogel_approximation_method,
+)
+
+SUMMARY_COLUMNS = ["instance", "suppliers", "customers", "vam_cost", "total_cost", "pivots", "seconds", "status", "error"]
+
+def solve_file(path, output_dir, optimize=True, excel=False, currency="€", lanes=None, low_memory=False, dtype=None,
+               threads=None):
+    path = Path(path)
+    output_dir = Path(output_dir)
+    start = time.perf_counter()
+    record = {"instance": path.name}
+    if low_memory:
+        return _solve_file_lean(path, output_dir, record, start, lanes or "csv", dtype, threads)
+    try:
+        input_df, demand_df = load_instance(path)
+        costs, supply, demand = split_instance(input_df, demand_df)
+        record.update(suppliers=costs.shape[0], customers=costs.shape[1])
+        if np.any(costs < 0) or np.any(supply < 0) or np.any(demand < 0):
+            raise ValueError("Values must be positive.")
+
+        allocation, total_cost = vogel_approximation_method(costs, supply, demand, workers=threads)
+        record["vam_cost"] = total_cost
+        pivots = 0
+        if optimize:
+            allocation, total_cost, pivots = transportation_simplex(costs, supply, demand, allocation)
+        elif total_cost >= INF:
+            allocation, total_cost = repair_allocation(costs, supply, demand, allocation)
+        record.update(total_cost=total_cost, pivots=pivots)
+
+        res_df = pd.DataFrame(allocation, index=input_df.index, columns=demand_df.columns)
+        res_df.to_csv(output_dir / f"{path.stem}_allocation.csv")
+        if lanes:
+            export_lanes(
+                allocation, costs, list(map(str, input_df.index)), list(map(str, demand_df.columns)),
+                fmt=lanes, path=str(output_dir / f"{path.stem}_lanes.{lanes}")
+            )
+        if excel and costs.size > STREAMING_CELLS:
+            generate_excel_streaming(
+                costs, supply, demand, allocation, total_cost, currency,
+                list(map(str, input_df.index)), list(map(str, demand_df.columns)),
+                path=str(output_dir / f"{path.stem}.xlsx")
+            )
+        elif excel:
+            excel_data = generate_excel(input_df, demand_df, res_df, total_cost, currency)
+            (output_dir / f"{path.stem}.xlsx").write_bytes(excel_data)
+        record["status"] = "ok"
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+def _solve_file_lean(path, output_dir, record, start, lanes, dtype, threads=None):
+    # VAM only, on the arrays as stored (NPZ) or as loaded, with the result written
+    # as a lane list instead of a dense allocation matrix.
+    try:
+        if path.suffix.lower() == ".npz":
+            with np.load(path) as data:
+                costs, supply, demand = data["costs"], data["supply"], data["demand"]
+            source_names = [f"Supplier {i+1}" for i in range(costs.shape[0])]
+            dest_names = [f"Customer {j+1}" for j in range(costs.shape[1])]
+        else:
+            input_df, demand_df = load_instance(path)
+            costs, supply, demand = split_instance(input_df, demand_df)
+            source_names, dest_names = list(map(str, input_df.index)), list(map(str, demand_df.columns))
+        record.update(suppliers=costs.shape[0], customers=costs.shape[1])
+        if np.any(costs < 0) or np.any(supply < 0) or np.any(demand < 0):
+            raise ValueError("Values must be positive.")
+
+        allocation, total_cost = lean_vogel_approximation_method(costs, supply, demand, dtype=dtype, workers=threads)
+        record.update(vam_cost=total_cost, total_cost=total_cost, pivots=0)
+        export_lanes(
+            allocation, costs, source_names, dest_names,
+            fmt=lanes, path=str(output_dir / f"{path.stem}_lanes.{lanes}")
+        )
+        record["status"] = "ok"
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+def run_batch(input_dir, output_dir, workers=None, optimize=True, excel=False, currency="€", chunksize=1, lanes=None,
+              low_memory=False, dtype=None, threads=None):
+    paths = sorted(p for p in Path(input_dir).iterdir() if p.suffix.lower() in INSTANCE_SUFFIXES)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    worker = partial(
+        solve_file, output_dir=output_dir, optimize=optimize, excel=excel, currency=currency, lanes=lanes,
+        low_memory=low_memory, dtype=dtype, threads=threads
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        records = list(executor.map(worker, paths, chunksize=chunksize))
+
+    summary = pd.DataFrame(records, columns=SUMMARY_COLUMNS)
+    summary.to_csv(output_dir / "summary.csv", index=False)
+    return summary
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vogel", description="Headless Vogel transport solver")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Solve every instance file in a directory")
+    batch.add_argument("input_dir", help="Directory of CSV/Parquet/NPZ instances")
+    batch.add_argument("-o", "--output-dir", default="vogel_results")
+    batch.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    batch.add_argument("--chunksize", type=int, default=1, help="Instances handed to a worker at a time")
+    batch.add_argument("--no-optimize", action="store_true", help="Stop at the VAM initial solution")
+    batch.add_argument("--excel", action="store_true", help="Also write an Excel report per instance")
+    batch.add_argument("--currency", default="€")
+    batch.add_argument("--lanes", choices=["parquet", "csv"], help="Also write the non-zero lanes in long format")
+    batch.add_argument("--low-memory", action="store_true",
+                       help="Lean VAM only: no matrix copies, lanes instead of the allocation matrix, no MODI or Excel")
+    batch.add_argument("--dtype", choices=["float32", "float64", "int32", "int64"], help="Cost dtype for --low-memory")
+    batch.add_argument("--threads", type=int, default=1, help="Threads sorting each instance's rows and columns")
+
+    run = commands.add_parser("bench", help="Time and profile each stage on generated instances")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(bench.DEFAULT_SIZES))
+    run.add_argument("--kinds", nargs="+", choices=INSTANCE_KINDS, default=list(INSTANCE_KINDS))
+    run.add_argument("--dtypes", nargs="+", choices=["int", "float"], default=["int", "float"])
+    run.add_argument("--stages", nargs="+", choices=bench.STAGES, default=list(bench.DEFAULT_STAGES))
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory pass")
+    run.add_argument("--json", default="bench_results.json")
+    run.add_argument("--csv", help="Also write the results as CSV")
+
+    compare = commands.add_parser("bench-compare", help="Flag regressions between two benchmark runs")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown, 0.10 = 10%%")
+    compare.add_argument("--min-seconds", type=float, default=0.001)
+
+    serve = commands.add_parser("serve", help="JSON HTTP solve service (/solve, /batch, /export, /health, /metrics)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8750)
+    _add_service_options(serve)
+
+    load = commands.add_parser("loadtest", help="Load-test a solve service and report throughput and latency")
+    load.add_argument("--url", default="http://127.0.0.1:8750", help="Service to test")
+    load.add_argument("--local", action="store_true", help="Start a service on a free local port and test that")
+    load.add_argument("-n", "--requests", type=int, default=500)
+    load.add_argument("-c", "--concurrency", type=int, default=16)
+    load.add_argument("--size", type=int, default=10, help="Suppliers and customers per instance")
+    load.add_argument("--kind", choices=INSTANCE_KINDS, default="dense")
+    load.add_argument("--distinct", type=int, help="Distinct instances to cycle through (default: all different)")
+    load.add_argument("--endpoint", choices=["/solve", "/export"], default="/solve")
+    load.add_argument("--no-optimize", action="store_true", help="VAM only")
+    load.add_argument("--seed", type=int, default=0)
+    _add_service_options(load)
+
+    network = commands.add_parser("network", help="Min-cost flow through hubs from node and arc CSV files")
+    network.add_argument("nodes", help="CSV with name, kind (supplier, hub, customer) and quantity columns")
+    network.add_argument("arcs", help="CSV with from, to, cost and an optional capacity column")
+    network.add_argument("-o", "--output-dir", default="vogel_results")
+    network.add_argument("--sankey", action="store_true", help="Also write the multi-layer flow as a Sankey HTML page")
+
+    mmap = commands.add_parser("mmap", help="VAM on a memory-mapped .npy cost matrix within a memory budget")
+    mmap.add_argument("costs", help=".npy cost matrix, read in blocks of rows and never written to")
+    mmap.add_argument("supply", help=".npy, or a one-column CSV/Parquet/Excel table")
+    mmap.add_argument("demand", help=".npy, or a one-column CSV/Parquet/Excel table")
+    mmap.add_argument("-o", "--output-dir", default="vogel_results")
+    mmap.add_argument("--memory-mb", type=float, default=256, help="Budget for a block of costs and its temporaries")
+    mmap.add_argument("--cache-lanes", type=int, default=OUT_OF_CORE_LANES,
+                      help="Cheapest lanes kept per line between rescans")
+    mmap.add_argument("--lanes", choices=["parquet", "csv"], default="parquet")
+    mmap.add_argument("--threads", type=int, default=os.cpu_count(), help="Threads selecting the cheapest lanes in a block")
+    return parser
+
+def _add_service_options(parser):
+    group = parser.add_argument_group("service (serve, or loadtest --local)")
+    group.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    group.add_argument("--max-pending", type=int, default=256, help="Solves queued or running before 503s")
+    group.add_argument("--max-batch", type=int, default=32, help="Small requests per pool task")
+    group.add_argument("--batch-wait-ms", type=float, default=5.0, help="How long a small request waits for company")
+    group.add_argument("--max-cells", type=int, default=service.MAX_CELLS, help="Largest cost matrix accepted")
+    group.add_argument("--max-body-mb", type=float, default=service.MAX_BODY_BYTES / 2**20)
+    group.add_argument("--solve-timeout", type=float, default=60.0,
+                       help="Seconds after which a solve returns its best plan so far")
+
+def _service_options(args):
+    return dict(
+        workers=args.workers,
+        max_pending=args.max_pending,
+        max_batch=args.max_batch,
+        batch_wait=args.batch_wait_ms / 1000,
+        max_cells=args.max_cells,
+        max_body_bytes=int(args.max_body_mb * 2**20),
+        solve_timeout=args.solve_timeout,
+    )
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        summary = run_batch(
+            args.input_dir,
+            args.output_dir,
+            workers=args.workers,
+            optimize=not args.no_optimize,
+            excel=args.excel,
+            currency=args.currency,
+            chunksize=args.chunksize,
+            lanes=args.lanes,
+            low_memory=args.low_memory,
+            dtype=args.dtype,
+            threads=args.threads,
+        )
+        failed = int((summary["status"] != "ok").sum()) if len(summary) else 0
+        print(f"Solved {len(summary) - failed}/{len(summary)} instances -> {Path(args.output_dir) / 'summary.csv'}")
+        return 1 if failed else 0
+
+    if args.command == "bench":
+        def progress(r):
+            peak = "" if r["peak_mb"] is None else f" {r['peak_mb']:.1f} MB"
+            print(f"{r['kind']:>10} {r['dtype']:>5} {r['rows']}x{r['cols']:<6} {r['stage']:>6} {r['seconds']:.4f}s{peak}")
+
+        records = bench.run_benchmarks(
+            sizes=args.sizes,
+            kinds=args.kinds,
+            dtypes=args.dtypes,
+            stages=args.stages,
+            repeat=args.repeat,
+            memory=not args.no_memory,
+            seed=args.seed,
+            progress=progress,
+        )
+        bench.write_results(records, args.json)
+        if args.csv:
+            bench.write_results(records, args.csv)
+        return 0
+
+    if args.command == "bench-compare":
+        rows = bench.compare_results(
+            bench.load_results(args.baseline),
+            bench.load_results(args.current),
+            threshold=args.threshold,
+            min_seconds=args.min_seconds,
+        )
+        print(pd.DataFrame(rows).to_string(index=False) if rows else "No matching benchmark entries.")
+        regressions = sum(r["regression"] for r in rows)
+        print(f"{regressions} regression(s) over {len(rows)} comparable entries")
+        return 1 if regressions else 0
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        service.serve(args.host, args.port, **_service_options(args))
+        return 0
+
+    if args.command == "loadtest":
+        url, server, solver = args.url, None, None
+        if args.local:
+            solver = service.SolveService(**_service_options(args)).start()
+            server = service.make_server(solver, "127.0.0.1", 0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            result = run_load_test(
+                url,
+                n_requests=args.requests,
+                concurrency=args.concurrency,
+                size=args.size,
+                kind=args.kind,
+                optimize=not args.no_optimize,
+                distinct=args.distinct,
+                endpoint=args.endpoint,
+                seed=args.seed,
+            )
+            if solver is not None:
+                result["service"] = solver.metrics()
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                solver.stop()
+        latency = " ".join(f"{k}={result[k]:.1f}" for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms") if k in result)
+        print(f"{result['ok']}/{result['requests']} ok in {result['seconds']:.2f}s, "
+              f"{result['throughput']:.1f} req/s, {latency}")
+        print(json.dumps(result, indent=2, default=float))
+        return 1 if result["errors"] else 0
+
+    if args.command == "network":
+        names, supply, demand, n_hubs, tail, head, cost, capacity = read_network(args.nodes, args.arcs)
+        stats = {}
+        start = time.perf_counter()
+        flow, total_cost = solve_transshipment(supply, demand, tail, head, cost, capacity, n_hubs=n_hubs, stats=stats)
+        seconds = time.perf_counter() - start
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        used = flow > 0
+        names = np.asarray(names, dtype=object)
+        pd.DataFrame({
+            "from": names[tail[used]],
+            "to": names[head[used]],
+            "flow": flow[used],
+            "cost": cost[used],
+        }).to_csv(output_dir / "flows.csv", index=False)
+        if args.sankey:
+            plot_sankey((tail, head, flow), names.tolist()).write_html(output_dir / "sankey.html", include_plotlyjs="cdn")
+        print(f"Total cost {total_cost:,.2f} over {int(used.sum())} arcs in {seconds:.3f}s "
+              f"(unused supply {stats['unused_supply']:,.2f}, unmet demand {stats['unmet_demand']:,.2f}) "
+              f"-> {output_dir / 'flows.csv'}")
+        return 0
+
+    if args.command == "mmap":
+        costs = np.load(args.costs, mmap_mode="r")
+        supply, demand = read_vector(args.supply), read_vector(args.demand)
+        if costs.shape != (len(supply), len(demand)):
+            print(f"Cost matrix is {costs.shape[0]}x{costs.shape[1]} for {len(supply)} supplies and {len(demand)} demands")
+            return 1
+        stats = {}
+        start = time.perf_counter()
+        allocation, total_cost = blocked_vogel_approximation_method(
+            costs, supply, demand, memory_mb=args.memory_mb, cache_lanes=args.cache_lanes, workers=args.threads,
+            stats=stats
+        )
+        seconds = time.perf_counter() - start
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"{Path(args.costs).stem}_lanes.{args.lanes}"
+        export_lanes(
+            allocation, costs, [f"Supplier {i+1}" for i in range(len(supply))],
+            [f"Customer {j+1}" for j in range(len(demand))], fmt=args.lanes, path=str(path)
+        )
+        print(f"VAM cost {total_cost:,.2f} over {len(allocation[0])} lanes in {seconds:.3f}s "
+              f"({stats['blocks_read']} blocks of {stats['block_rows']} rows read, "
+              f"{stats['column_scans']} column passes, {stats['row_rescans']} row rescans) -> {path}")
+        return 0
+    return 0
@@ -0,0 +1,109 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+def _json_default(value):
+    # NumPy scalars and anything else json cannot encode.
+    return value.item() if hasattr(value, "item") else str(value)
+
+def enable_json_logging(stream=None, level=logging.INFO):
+    # One JSON object per line on `stream` (stderr by default), ready for a log shipper.
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+class Diagnostics:
+    # Wall time per stage, with optional tracemalloc peaks and a cProfile capture
+    # of everything run inside the outermost stages. Stages may nest; a nested
+    # stage is recorded under "outer/inner".
+    def __init__(self, profile=False, memory=False, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.profile = profile
+        self.memory = memory
+        self.stages = []
+        self.counters = {}
+        self._stack = []
+        self._profiler = cProfile.Profile() if profile else None
+        self._own_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        outermost = not self._stack
+        if outermost and self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        if self.memory and tracemalloc.is_tracing():
+            if self._stack:
+                parent = self._stack[-1]
+                parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = {"name": f"{self._stack[-1]['name']}/{name}" if self._stack else name, "peak": 0}
+        self._stack.append(frame)
+        profiling = False
+        if outermost and self._profiler is not None:
+            try:
+                self._profiler.enable()
+                profiling = True
+            except ValueError:
+                # Another profiler (say, a concurrent session) holds the hook.
+                logger.warning("Profiler busy, stage %s not profiled", name)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - start
+            if profiling:
+                self._profiler.disable()
+            self._stack.pop()
+            peak_mb = None
+            if self.memory and tracemalloc.is_tracing():
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak_mb = peak / 2**20
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+                tracemalloc.reset_peak()
+            if outermost and self._own_tracing:
+                tracemalloc.stop()
+                self._own_tracing = False
+            self.stages.append({"stage": frame["name"], "seconds": seconds, "peak_mb": peak_mb})
+
+    def count(self, counters=None, **more):
+        self.counters.update(counters or {}, **more)
+
+    def total_seconds(self):
+        return sum(s["seconds"] for s in self.stages if "/" not in s["stage"])
+
+    def profile_text(self, limit=25, sort="cumulative"):
+        if self._profiler is None:
+            return ""
+        out = io.StringIO()
+        try:
+            stats = pstats.Stats(self._profiler, stream=out)
+        except TypeError:
+            # Nothing was captured.
+            return ""
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def log(self, **context):
+        # One line per stage plus a summary line with the counters.
+        base = {"run_id": self.run_id, **context}
+        for record in self.stages:
+            logger.info(json.dumps({"event": "stage", **base, **record}, default=_json_default))
+        logger.info(json.dumps(
+            {"event": "run", **base, "seconds": self.total_seconds(), "counters": self.counters},
+            default=_json_default,
+        ))
@@ -0,0 +1,222 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import xlsxwriter
+
+from .instances import DEMAND_ROW, SUPPLY_COLUMN
+
+def _kpi_sections(kpis):
+    suppliers, customers, summary = kpis
+    return (("6. Plan Summary", summary), ("7. Suppliers", suppliers), ("8. Customers", customers))
+
+def generate_excel(input_df, demand_df, res_df, total_cost, currency, sensitivity=None, kpis=None):
+    # `sensitivity` is the (lanes, prices) pair from sensitivity_frames and `kpis`
+    # the (suppliers, customers, summary) tables from kpi_frames, each written to
+    # its own sheet when given.
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        workbook = writer.book
+        worksheet = workbook.add_worksheet('Rapport VAM')
+        writer.sheets['Rapport VAM'] = worksheet
+        
+        bold_fmt = workbook.add_format({'bold': True, 'font_size': 12})
+        title_fmt = workbook.add_format({'bold': True, 'font_size': 14, 'color': '#2c3e50'})
+        
+        row = 0
+        worksheet.write(row, 0, "1. Input Data", title_fmt)
+        row += 2
+        input_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
+        row += len(input_df) + 3
+        
+        worksheet.write(row, 0, "2. Customer Demand", title_fmt)
+        row += 2
+        demand_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
+        row += len(demand_df) + 4
+        
+        worksheet.write(row, 0, "3. Optimal Solution", title_fmt)
+        row += 2
+        res_df.to_excel(writer, sheet_name='Rapport VAM', startrow=row, startcol=0)
+        row += len(res_df) + 3
+        
+        worksheet.write(row, 0, f"Total Minimum Cost: {total_cost:,.2f} {currency}", title_fmt)
+        
+        if sensitivity is not None:
+            lanes_df, prices_df = sensitivity
+            sens_sheet = workbook.add_worksheet('Sensitivity')
+            writer.sheets['Sensitivity'] = sens_sheet
+            sens_sheet.write(0, 0, "4. Cost Ranging", title_fmt)
+            lanes_df.to_excel(writer, sheet_name='Sensitivity', startrow=2, startcol=0, index=False)
+            row = len(lanes_df) + 5
+            sens_sheet.write(row, 0, "5. Shadow Prices", title_fmt)
+            prices_df.to_excel(writer, sheet_name='Sensitivity', startrow=row + 2, startcol=0, index=False)
+        
+        if kpis is not None:
+            kpi_sheet = workbook.add_worksheet('KPIs')
+            writer.sheets['KPIs'] = kpi_sheet
+            row = 0
+            for title, frame in _kpi_sections(kpis):
+                kpi_sheet.write(row, 0, title, title_fmt)
+                frame.to_excel(writer, sheet_name='KPIs', startrow=row + 2, startcol=0, index=False)
+                row += len(frame) + 5
+        
+    return output.getvalue()
+
+# Above STREAMING_CELLS the report is written row by row in xlsxwriter's
+# constant_memory mode, with the solution as a lane list instead of a matrix.
+STREAMING_CELLS = 10_000
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_COLS = 16_384
+LANE_COLUMNS = ["supplier", "customer", "qty", "unit_cost", "cost"]
+LANE_SCHEMA = pa.schema([
+    ("supplier", pa.string()),
+    ("customer", pa.string()),
+    ("qty", pa.float64()),
+    ("unit_cost", pa.float64()),
+    ("cost", pa.float64()),
+])
+
+def iter_lanes(allocation, costs, block_rows=1024):
+    # Non-zero cells of the allocation, one block of rows at a time. Cells outside
+    # `costs` (dummy row or column) have a unit cost of 0. `allocation` may also be
+    # the (rows, cols, qty) lane list of the sparse and lean solvers.
+    costs = np.asarray(costs)
+    n_rows, n_cols = costs.shape
+    if isinstance(allocation, tuple):
+        rows, cols, qty = (np.asarray(a) for a in allocation)
+        keep = qty > 0
+        rows, cols, qty = rows[keep], cols[keep], qty[keep].astype(float)
+        for lo in range(0, len(qty), block_rows * 64):
+            r, c = rows[lo:lo + block_rows * 64], cols[lo:lo + block_rows * 64]
+            real = (r < n_rows) & (c < n_cols)
+            unit_cost = np.zeros(len(r))
+            unit_cost[real] = costs[r[real], c[real]]
+            yield r, c, qty[lo:lo + block_rows * 64], unit_cost
+        return
+    allocation = np.asarray(allocation)
+    for lo in range(0, allocation.shape[0], block_rows):
+        block = allocation[lo:lo + block_rows]
+        rows, cols = np.nonzero(block > 0)
+        qty = block[rows, cols].astype(float)
+        rows = rows + lo
+        real = (rows < n_rows) & (cols < n_cols)
+        unit_cost = np.zeros(len(qty))
+        unit_cost[real] = costs[rows[real], cols[real]]
+        yield rows, cols, qty, unit_cost
+
+def _lane_table(lanes, source_names, dest_names):
+    rows, cols, qty, unit_cost = lanes
+    return pa.table([
+        pa.array(np.asarray(source_names, dtype=object)[rows].astype(str)),
+        pa.array(np.asarray(dest_names, dtype=object)[cols].astype(str)),
+        pa.array(qty),
+        pa.array(unit_cost),
+        pa.array(qty * unit_cost),
+    ], schema=LANE_SCHEMA)
+
+def export_lanes(allocation, costs, source_names, dest_names, fmt="parquet", path=None):
+    # Long-format lane list for pipelines. Returns the file bytes when no path is given.
+    target = io.BytesIO() if path is None else path
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(target, LANE_SCHEMA)
+    elif fmt == "csv":
+        writer = pa_csv.CSVWriter(target, LANE_SCHEMA)
+    else:
+        raise ValueError(f"Unknown lane format {fmt!r}, expected 'parquet' or 'csv'.")
+    with writer:
+        for lanes in iter_lanes(allocation, costs):
+            writer.write_table(_lane_table(lanes, source_names, dest_names))
+    return target.getvalue() if path is None else None
+
+def _cell_value(value):
+    # Excel has no inf/NaN: unbounded ranges are written as empty cells.
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+def generate_excel_streaming(costs, supply, demand, allocation, total_cost, currency, source_names, dest_names, path=None, sensitivity=None, kpis=None):
+    # Same report as generate_excel, written straight from the arrays with rows
+    # flushed to disk as they are completed. Returns the file bytes when no path is given.
+    costs = np.asarray(costs)
+    n_rows, n_cols = costs.shape
+    if n_cols + 2 > EXCEL_MAX_COLS or n_rows + 10 > EXCEL_MAX_ROWS:
+        raise ValueError("Instance too large for an Excel sheet, export the lanes as Parquet or CSV instead.")
+
+    target = io.BytesIO() if path is None else path
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    worksheet = workbook.add_worksheet('Rapport VAM')
+    lane_sheet = workbook.add_worksheet('Lanes')
+
+    bold_fmt = workbook.add_format({'bold': True, 'font_size': 12})
+    title_fmt = workbook.add_format({'bold': True, 'font_size': 14, 'color': '#2c3e50'})
+
+    row = 0
+    worksheet.write(row, 0, "1. Input Data", title_fmt)
+    row += 2
+    worksheet.write_row(row, 1, list(dest_names[:n_cols]) + [SUPPLY_COLUMN], bold_fmt)
+    row += 1
+    for r in range(n_rows):
+        worksheet.write(row, 0, source_names[r], bold_fmt)
+        worksheet.write_row(row, 1, costs[r].tolist())
+        worksheet.write_number(row, n_cols + 1, float(supply[r]))
+        row += 1
+    row += 2
+
+    worksheet.write(row, 0, "2. Customer Demand", title_fmt)
+    row += 2
+    worksheet.write_row(row, 1, list(dest_names[:n_cols]), bold_fmt)
+    row += 1
+    worksheet.write(row, 0, DEMAND_ROW, bold_fmt)
+    worksheet.write_row(row, 1, np.asarray(demand, dtype=float).tolist())
+    row += 4
+
+    worksheet.write(row, 0, "3. Optimal Solution", title_fmt)
+    row += 2
+    worksheet.write(row, 0, "Non-zero lanes are listed on the 'Lanes' sheet.")
+    row += 2
+    worksheet.write(row, 0, f"Total Minimum Cost: {total_cost:,.2f} {currency}", title_fmt)
+
+    lane_row = 0
+    lane_sheet.write_row(lane_row, 0, LANE_COLUMNS, bold_fmt)
+    for rows, cols, qty, unit_cost in iter_lanes(allocation, costs):
+        if lane_row + len(qty) >= EXCEL_MAX_ROWS:
+            workbook.close()
+            raise ValueError("Too many lanes for an Excel sheet, export them as Parquet or CSV instead.")
+        for r, c, q, u in zip(rows.tolist(), cols.tolist(), qty.tolist(), unit_cost.tolist()):
+            lane_row += 1
+            lane_sheet.write_row(lane_row, 0, (source_names[r], dest_names[c], q, u, q * u))
+
+    if sensitivity is not None:
+        lanes_df, prices_df = sensitivity
+        sens_sheet = workbook.add_worksheet('Sensitivity')
+        sens_sheet.write(0, 0, "4. Cost Ranging", title_fmt)
+        sens_sheet.write_row(2, 0, list(lanes_df.columns), bold_fmt)
+        row = 3
+        for values in lanes_df.itertuples(index=False):
+            sens_sheet.write_row(row, 0, [_cell_value(x) for x in values])
+            row += 1
+        row += 2
+        sens_sheet.write(row, 0, "5. Shadow Prices", title_fmt)
+        sens_sheet.write_row(row + 2, 0, list(prices_df.columns), bold_fmt)
+        row += 3
+        for values in prices_df.itertuples(index=False):
+            sens_sheet.write_row(row, 0, [_cell_value(x) for x in values])
+            row += 1
+
+    if kpis is not None:
+        kpi_sheet = workbook.add_worksheet('KPIs')
+        row = 0
+        for title, frame in _kpi_sections(kpis):
+            kpi_sheet.write(row, 0, title, title_fmt)
+            kpi_sheet.write_row(row + 2, 0, list(frame.columns), bold_fmt)
+            row += 3
+            for values in frame.itertuples(index=False):
+                kpi_sheet.write_row(row, 0, [_cell_value(x) for x in values])
+                row += 1
+            row += 2
+
+    workbook.close()
+    return target.getvalue() if path is None else None
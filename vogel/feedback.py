@@ -0,0 +1,189 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API = "https://api.telegram.org"
+TELEGRAM_MAX_CHARS = 4096
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def escape_markdown(text):
+    # Telegram's legacy Markdown only gives _ * ` [ a meaning; a backslash makes
+    # them literal, so user text can no longer get the whole message rejected.
+    return re.sub(r"([_*`\[])", r"\\\1", text)
+
+def format_feedback(name, message):
+    return f"🚀 *New feedback on VAM app*\n\n*Name:* {escape_markdown(name)}\n*Message:* {escape_markdown(message)}"
+
+class FeedbackQueue:
+    # Delivers feedback to Telegram from a background thread. Messages are written
+    # to `spool_dir` before they are queued and removed once delivered, so anything
+    # still pending at shutdown (or dropped by a full queue) is sent on next start.
+    # Messages that still fail after `retries` are tried again by the thread
+    # itself, `retry_wait` seconds later, doubling up to `max_retry_wait`.
+    def __init__(
+        self,
+        token,
+        chat_id,
+        spool_dir=None,
+        maxsize=100,
+        batch_size=10,
+        batch_wait=1.0,
+        timeout=(3.05, 10),
+        retries=4,
+        backoff=1.0,
+        retry_wait=30.0,
+        max_retry_wait=600.0,
+        api_url=TELEGRAM_API,
+    ):
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.spool_dir = Path(spool_dir) if spool_dir is not None else None
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_wait = retry_wait
+        self.max_retry_wait = max_retry_wait
+        self._failed = []
+        self._failed_wait = retry_wait
+        self._retry_at = 0.0
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            if self.spool_dir is not None:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                for path in sorted(self.spool_dir.glob("*.json")):
+                    try:
+                        self.queue.put_nowait((path, json.loads(path.read_text(encoding="utf-8"))["text"]))
+                    except queue.Full:
+                        break
+                    except (OSError, ValueError, KeyError):
+                        logger.warning("Skipping unreadable feedback spool file %s", path)
+            self._thread = threading.Thread(target=self._run, name="feedback-delivery", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.session.close()
+
+    def submit(self, name, message):
+        # Returns at once. False means the queue is full; the message is still
+        # spooled (when a spool is configured) and goes out after a restart.
+        text = format_feedback(name, message)
+        path = None
+        if self.spool_dir is not None:
+            path = self.spool_dir / f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+            path.write_text(json.dumps({"text": text}), encoding="utf-8")
+        try:
+            self.queue.put_nowait((path, text))
+        except queue.Full:
+            logger.warning("Feedback queue full, message left in the spool")
+            return False
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        # Messages arriving in a burst go out together as one Telegram message.
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if self._failed and time.monotonic() >= self._retry_at:
+                batch = self._failed + batch
+                self._failed = []
+            if not batch:
+                continue
+            chunks, current = [], []
+            for path, text in batch:
+                text = text[:TELEGRAM_MAX_CHARS]
+                if current and len("\n\n".join(t for _, t in current + [(path, text)])) > TELEGRAM_MAX_CHARS:
+                    chunks.append(current)
+                    current = []
+                current.append((path, text))
+            chunks.append(current)
+            failed = []
+            for chunk in chunks:
+                failed += self._deliver(chunk)
+            if failed:
+                self._failed += failed
+                self._retry_at = time.monotonic() + self._failed_wait
+                self._failed_wait = min(self._failed_wait * 2, self.max_retry_wait)
+            elif not self._failed:
+                self._failed_wait = self.retry_wait
+
+    def _deliver(self, chunk):
+        # Sends a chunk as one message and returns the entries left to retry.
+        status = self._send("\n\n".join(text for _, text in chunk))
+        if status == "rejected" and len(chunk) > 1:
+            # One message Telegram cannot parse must not take the rest down with it.
+            return [entry for item in chunk for entry in self._deliver([item])]
+        if status == "failed":
+            return chunk
+        for path, _ in chunk:
+            if path is not None:
+                path.unlink(missing_ok=True)
+        return []
+
+    def _send(self, text):
+        # "sent", "rejected" (a 400: sending it again cannot help) or "failed".
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.post(
+                    self.url,
+                    json={"chat_id": self.chat_id, "text": text, "parse_mode": "Markdown"},
+                    timeout=self.timeout,
+                )
+                if response.ok:
+                    return "sent"
+                if response.status_code == 400:
+                    logger.error("Telegram rejected feedback: %s", response.text[:200])
+                    return "rejected"
+                if response.status_code not in RETRY_STATUSES:
+                    logger.error("Feedback delivery failed: %s %s", response.status_code, response.text[:200])
+                    return "failed"
+                if response.status_code == 429:
+                    try:
+                        delay = max(delay, response.json()["parameters"]["retry_after"])
+                    except (ValueError, KeyError, TypeError):
+                        pass
+            except requests.RequestException as e:
+                logger.warning("Feedback delivery failed (attempt %d): %s", attempt + 1, e)
+            if attempt < self.retries and self._stop.wait(delay):
+                break
+        logger.error("Feedback delivery failed after %d attempts, retrying later", self.retries + 1)
+        return "failed"
@@ -0,0 +1,35 @@
+import numpy as np
+
+from .solver import INF
+
+INSTANCE_KINDS = ("dense", "sparse", "balanced", "unbalanced", "degenerate")
+
+def random_instance(n_rows, n_cols, kind="dense", integer=True, seed=0, density=0.05):
+    # Seeded (costs, supply, demand) for benchmarks. "sparse" marks lanes outside a
+    # `density` fraction as INF while keeping at least one lane per line.
+    if kind not in INSTANCE_KINDS:
+        raise ValueError(f"Unknown instance kind: {kind}")
+    rng = np.random.default_rng(seed)
+    if integer:
+        costs = rng.integers(1, 1000, (n_rows, n_cols)).astype(float)
+    else:
+        costs = rng.uniform(1.0, 1000.0, (n_rows, n_cols))
+    supply = rng.integers(10, 100, n_rows).astype(float)
+
+    if kind == "sparse":
+        allowed = rng.random((n_rows, n_cols)) < density
+        allowed[np.arange(n_rows), rng.integers(0, n_cols, n_rows)] = True
+        allowed[rng.integers(0, n_rows, n_cols), np.arange(n_cols)] = True
+        costs[~allowed] = INF
+
+    if kind == "balanced":
+        demand = rng.multinomial(int(supply.sum()), np.full(n_cols, 1.0 / n_cols)).astype(float)
+    elif kind == "unbalanced":
+        demand = rng.multinomial(int(supply.sum() * 0.8), np.full(n_cols, 1.0 / n_cols)).astype(float)
+    elif kind == "degenerate":
+        # Equal lots make partial sums meet, so rows and columns close together.
+        supply = np.full(n_rows, float(n_cols * 10))
+        demand = np.full(n_cols, float(n_rows * 10))
+    else:
+        demand = rng.integers(10, 100, n_cols).astype(float)
+    return costs, supply, demand
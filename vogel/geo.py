@@ -0,0 +1,90 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .solver import INF
+
+EARTH_RADIUS_KM = 6371.0088
+DISTANCE_METRICS = ("haversine", "euclidean")
+# Cells per broadcast block: temporaries stay at a few of these whatever the size.
+DISTANCE_BLOCK_CELLS = 1 << 20
+COORDINATE_COLUMNS = (("lat", "lon"), ("latitude", "longitude"), ("x", "y"))
+
+def read_sites(source, name=None):
+    # CSV of sites: an optional name column, lat/lon (or latitude/longitude, or x/y)
+    # and an optional quantity column (supply or demand). Column names are matched
+    # case-insensitively. Returns (names, coords, quantity or None), coords (n, 2).
+    table = pd.read_csv(source)
+    columns = {str(c).strip().lower(): c for c in table.columns}
+    pair = next((p for p in COORDINATE_COLUMNS if all(c in columns for c in p)), None)
+    label = name or "sites"
+    if pair is None:
+        raise ValueError(f"{label}: expected lat/lon, latitude/longitude or x/y columns")
+    coords = table[[columns[c] for c in pair]].to_numpy(dtype=float)
+    if np.isnan(coords).any():
+        raise ValueError(f"{label}: missing coordinates")
+    if "name" in columns:
+        names = table[columns["name"]].astype(str).tolist()
+    else:
+        names = [f"Site {i+1}" for i in range(len(table))]
+    quantity = table[columns["quantity"]].to_numpy(dtype=float) if "quantity" in columns else None
+    return names, coords, quantity
+
+def coordinates_key(source_xy, dest_xy, metric="haversine"):
+    # Content hash of both site lists, so a distance matrix is only rebuilt when
+    # the geometry changes.
+    digest = hashlib.sha256(metric.encode())
+    for coords in (source_xy, dest_xy):
+        coords = np.ascontiguousarray(coords, dtype=float)
+        digest.update(repr(coords.shape).encode())
+        digest.update(coords.tobytes())
+    return digest.hexdigest()
+
+def distance_matrix(source_xy, dest_xy, metric="haversine", dtype=np.float64, block_cells=DISTANCE_BLOCK_CELLS):
+    # Supplier × customer distances, broadcast a block of rows at a time.
+    # "haversine" takes (lat, lon) in degrees and returns great-circle kilometres;
+    # "euclidean" takes (x, y) and returns distances in the same unit.
+    source_xy = np.asarray(source_xy, dtype=float)
+    dest_xy = np.asarray(dest_xy, dtype=float)
+    if metric not in DISTANCE_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {DISTANCE_METRICS}.")
+    n_rows, n_cols = len(source_xy), len(dest_xy)
+    out = np.empty((n_rows, n_cols), dtype=dtype)
+    block = max(1, block_cells // max(n_cols, 1))
+
+    if metric == "haversine":
+        lat1, lon1 = np.radians(source_xy).T
+        lat2, lon2 = np.radians(dest_xy).T
+        cos_lat1, cos_lat2 = np.cos(lat1), np.cos(lat2)
+        for lo in range(0, n_rows, block):
+            hi = min(lo + block, n_rows)
+            a = np.sin((lat2 - lat1[lo:hi, None]) / 2) ** 2
+            a += cos_lat1[lo:hi, None] * cos_lat2 * np.sin((lon2 - lon1[lo:hi, None]) / 2) ** 2
+            np.clip(a, 0.0, 1.0, out=a)
+            out[lo:hi] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a, out=a), out=a)
+    else:
+        x1, y1 = source_xy.T
+        x2, y2 = dest_xy.T
+        for lo in range(0, n_rows, block):
+            hi = min(lo + block, n_rows)
+            out[lo:hi] = np.hypot(x2 - x1[lo:hi, None], y2 - y1[lo:hi, None])
+    return out
+
+def build_costs(distances, rate=1.0, fixed_fee=0.0, max_distance=None, block_cells=DISTANCE_BLOCK_CELLS):
+    # Unit cost of each lane: distance × rate + fixed fee. rate and fixed_fee are
+    # scalars or per-supplier arrays (one carrier per origin, say). Lanes longer
+    # than max_distance are forbidden, at the solvers' INF cost.
+    distances = np.asarray(distances)
+    n_rows, n_cols = distances.shape
+    rate = np.broadcast_to(np.asarray(rate, dtype=float).reshape(-1, 1), (n_rows, 1))
+    fixed_fee = np.broadcast_to(np.asarray(fixed_fee, dtype=float).reshape(-1, 1), (n_rows, 1))
+    costs = np.empty((n_rows, n_cols))
+    block = max(1, block_cells // max(n_cols, 1))
+    for lo in range(0, n_rows, block):
+        hi = min(lo + block, n_rows)
+        np.multiply(distances[lo:hi], rate[lo:hi], out=costs[lo:hi])
+        costs[lo:hi] += fixed_fee[lo:hi]
+        if max_distance is not None:
+            costs[lo:hi][distances[lo:hi] > max_distance] = INF
+    return costs
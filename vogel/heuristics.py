@@ -0,0 +1,180 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import partial
+
+import numpy as np
+
+from .solver import INF, _balance_problem, _north_west_fill, vogel_approximation_method
+
+# Up to PROCESS_CELLS cells the portfolio races in threads; the start-up cost of
+# worker processes only pays off on larger instances.
+PROCESS_CELLS = 250_000
+LEAST_COST_CHUNK = 4096
+
+def _finish(allocation, costs, original_rows, original_cols):
+    allocation = allocation[:original_rows, :original_cols]
+    return allocation, np.sum(allocation * costs[:original_rows, :original_cols])
+
+def north_west_corner(cost_matrix, supply, demand):
+    # Ignores costs entirely; the cheapest start to compute and usually the worst.
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    allocation = np.zeros(costs.shape)
+    _north_west_fill(allocation, supply, demand)
+    return _finish(allocation, costs, original_rows, original_cols)
+
+def least_cost_method(cost_matrix, supply, demand):
+    # Fills lanes cheapest first. Sorted cells are screened a chunk at a time so
+    # lanes of exhausted suppliers and customers are skipped without a Python step.
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    n_rows, n_cols = costs.shape
+    allocation = np.zeros((n_rows, n_cols))
+    order = np.argsort(costs, axis=None, kind="stable")
+    order = order[:np.count_nonzero(costs < INF)]
+    supply_left = np.count_nonzero(supply > 0)
+
+    for start in range(0, len(order), LEAST_COST_CHUNK):
+        if supply_left == 0:
+            break
+        chunk = order[start:start + LEAST_COST_CHUNK]
+        rows, cols = np.divmod(chunk, n_cols)
+        live = (supply[rows] > 0) & (demand[cols] > 0)
+        for r, c in zip(rows[live].tolist(), cols[live].tolist()):
+            if supply[r] > 0 and demand[c] > 0:
+                qty = min(supply[r], demand[c])
+                allocation[r, c] = qty
+                supply[r] -= qty
+                demand[c] -= qty
+                supply_left -= supply[r] == 0
+
+    # Whatever the allowed lanes could not take goes over forbidden ones, as in VAM.
+    while supply_left and (demand > 0).any():
+        r, c = int(np.argmax(supply > 0)), int(np.argmax(demand > 0))
+        qty = min(supply[r], demand[c])
+        allocation[r, c] += qty
+        supply[r] -= qty
+        demand[c] -= qty
+        supply_left -= supply[r] == 0
+    return _finish(allocation, costs, original_rows, original_cols)
+
+def russell_approximation_method(cost_matrix, supply, demand):
+    # Russell's method: u[i] and v[j] are the largest live costs of each row and
+    # column, and the next lane is the one with the most negative c - u - v.
+    # Closing a line only lowers u and v, so delta only grows; each row keeps its
+    # minimum delta and is rescanned only when that minimum or its u may have moved.
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    n_rows, n_cols = costs.shape
+    allocation = np.zeros((n_rows, n_cols))
+    allowed = costs < INF
+    row_open = supply > 0
+    col_open = demand > 0
+
+    live = allowed & row_open[:, None] & col_open[None, :]
+    masked = np.where(live, costs, -np.inf)
+    u, row_max = masked.max(axis=1), masked.argmax(axis=1)
+    v, col_max = masked.max(axis=0), masked.argmax(axis=0)
+    delta = np.where(live, costs - np.where(live, u[:, None] + v[None, :], 0.0), np.inf)
+    row_min, row_arg = delta.min(axis=1), delta.argmin(axis=1)
+    del masked, delta
+
+    def rescan_row(i):
+        lanes = np.flatnonzero(allowed[i] & col_open)
+        if not row_open[i] or len(lanes) == 0:
+            row_min[i] = np.inf
+            return
+        k = np.argmax(costs[i, lanes])
+        u[i], row_max[i] = costs[i, lanes[k]], lanes[k]
+        delta = costs[i, lanes] - u[i] - v[lanes]
+        k = np.argmin(delta)
+        row_min[i], row_arg[i] = delta[k], lanes[k]
+
+    def rescan_col(j):
+        lanes = np.flatnonzero(allowed[:, j] & row_open)
+        if len(lanes):
+            k = np.argmax(costs[lanes, j])
+            v[j], col_max[j] = costs[lanes[k], j], lanes[k]
+
+    supply_left = np.count_nonzero(row_open)
+    while supply_left and col_open.any():
+        i = int(np.argmin(row_min))
+        if row_min[i] == np.inf:
+            # No allowed lane left for the remaining supply.
+            i, j = int(np.argmax(row_open)), int(np.argmax(col_open))
+        else:
+            j = int(row_arg[i])
+        qty = min(supply[i], demand[j])
+        allocation[i, j] += qty
+        supply[i] -= qty
+        demand[j] -= qty
+
+        stale = np.zeros(n_rows, dtype=bool)
+        if supply[i] == 0:
+            row_open[i] = False
+            row_min[i] = np.inf
+            supply_left -= 1
+            for jj in np.flatnonzero(col_open & (col_max == i)).tolist():
+                rescan_col(jj)
+                stale |= row_arg == jj
+        if demand[j] == 0:
+            col_open[j] = False
+            stale |= (row_arg == j) | (row_max == j)
+        for ii in np.flatnonzero(stale & row_open).tolist():
+            rescan_row(ii)
+    return _finish(allocation, costs, original_rows, original_cols)
+
+HEURISTICS = {
+    "VAM": vogel_approximation_method,
+    "VAM (cost ties)": partial(vogel_approximation_method, tie_break="cost"),
+    "Russell": russell_approximation_method,
+    "Least cost": least_cost_method,
+    "North-west corner": north_west_corner,
+}
+
+def _timed(heuristic, costs, supply, demand):
+    start = time.perf_counter()
+    allocation, total_cost = heuristic(costs, supply, demand)
+    return allocation, total_cost, time.perf_counter() - start
+
+def run_portfolio(cost_matrix, supply, demand, heuristics=None, time_budget=None, executor=None, max_workers=None):
+    # Races the heuristics and returns (allocation, total_cost, results) for the
+    # cheapest plan finished within `time_budget` seconds. `results` has one dict per
+    # heuristic (heuristic, total_cost, seconds, status), cheapest first. If nothing
+    # finishes in time the first to finish is awaited. Late runs are abandoned, not
+    # killed: a worker process finishes its heuristic in the background.
+    # `executor` is "thread" or "process"; by default it depends on the size.
+    heuristics = HEURISTICS if heuristics is None else heuristics
+    costs = np.asarray(cost_matrix, dtype=float)
+    if executor is None:
+        executor = "process" if costs.size > PROCESS_CELLS else "thread"
+    pool_type = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    pool = pool_type(max_workers=max_workers or len(heuristics))
+    try:
+        futures = {
+            pool.submit(_timed, heuristic, costs, supply, demand): name
+            for name, heuristic in heuristics.items()
+        }
+        done, _ = wait(futures, timeout=time_budget)
+        if not done:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results, best = [], None
+    for future, name in futures.items():
+        record = {"heuristic": name, "total_cost": np.nan, "seconds": np.nan, "status": "timed out"}
+        if future in done:
+            try:
+                allocation, total_cost, seconds = future.result()
+            except Exception as e:
+                record["status"] = f"failed: {e}"
+            else:
+                record.update(total_cost=float(total_cost), seconds=seconds, status="ok")
+                if best is None or total_cost < best[1]:
+                    best = (allocation, total_cost)
+        results.append(record)
+    if best is None:
+        raise RuntimeError("No heuristic produced a solution.")
+    results.sort(key=lambda r: (np.isnan(r["total_cost"]), r["total_cost"]))
+    return best[0], best[1], results
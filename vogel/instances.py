@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SUPPLY_COLUMN = "SUPPLY CAPACITY"
+DEMAND_ROW = "DEMAND"
+INSTANCE_SUFFIXES = (".csv", ".parquet", ".npz")
+MATRIX_SUFFIXES = (".csv", ".xlsx", ".parquet", ".npy")
+
+def instance_frames(costs, supply, demand, source_names=None, dest_names=None):
+    # Same layout as the app editors: costs + SUPPLY CAPACITY, and a one-row DEMAND frame.
+    costs = np.asarray(costs, dtype=float)
+    if source_names is None:
+        source_names = [f"Supplier {i+1}" for i in range(costs.shape[0])]
+    if dest_names is None:
+        dest_names = [f"Customer {i+1}" for i in range(costs.shape[1])]
+    input_df = pd.DataFrame(costs, index=source_names, columns=dest_names)
+    input_df[SUPPLY_COLUMN] = np.asarray(supply, dtype=float)
+    demand_df = pd.DataFrame([np.asarray(demand, dtype=float)], index=[DEMAND_ROW], columns=dest_names)
+    return input_df, demand_df
+
+def split_instance(input_df, demand_df):
+    costs = input_df.iloc[:, :-1].values.astype(float)
+    supply = input_df.iloc[:, -1].values.astype(float)
+    demand = demand_df.iloc[0, :].values.astype(float)
+    return costs, supply, demand
+
+def load_instance(source, name=None):
+    # NPZ files hold `costs`, `supply` and `demand` arrays; CSV/Parquet files hold the
+    # cost table with a SUPPLY CAPACITY column and a DEMAND row. `source` may be a
+    # path or an open file, in which case `name` gives the format.
+    path = Path(name if name is not None else source)
+    suffix = path.suffix.lower()
+    if suffix == ".npz":
+        with np.load(source) as data:
+            return instance_frames(data["costs"], data["supply"], data["demand"])
+    if suffix == ".csv":
+        table = pd.read_csv(source, index_col=0)
+    elif suffix == ".parquet":
+        table = pd.read_parquet(source)
+    else:
+        raise ValueError(f"Unsupported instance file: {path.name}")
+
+    table.index = table.index.astype(str)
+    if DEMAND_ROW not in table.index or SUPPLY_COLUMN not in table.columns:
+        raise ValueError(f"{path.name}: expected a '{SUPPLY_COLUMN}' column and a '{DEMAND_ROW}' row")
+    demand_df = table.loc[[DEMAND_ROW]].drop(columns=SUPPLY_COLUMN)
+    input_df = table.drop(index=DEMAND_ROW)
+    return input_df.astype(float), demand_df.astype(float)
+
+def read_matrix(source, name=None):
+    # Returns (values, row_labels, col_labels). Tables need a header row; a leading
+    # text or unnamed column is taken as row labels. NPY paths are memory-mapped, not read.
+    path = Path(name if name is not None else source)
+    suffix = path.suffix.lower()
+    if suffix == ".npy":
+        mmap_mode = "r" if isinstance(source, (str, Path)) else None
+        return np.asarray(np.load(source, mmap_mode=mmap_mode), dtype=float), None, None
+    if suffix == ".csv":
+        table = pd.read_csv(source, engine="pyarrow")
+    elif suffix == ".xlsx":
+        table = pd.read_excel(source)
+    elif suffix == ".parquet":
+        table = pd.read_parquet(source)
+    else:
+        raise ValueError(f"Unsupported matrix file: {path.name}")
+
+    # A written index has no header: pyarrow reads it as "", pandas as "Unnamed: 0".
+    row_labels = None
+    first = str(table.columns[0]).strip() if len(table.columns) > 0 else None
+    if not isinstance(table.index, pd.RangeIndex):
+        row_labels = table.index.astype(str).tolist()
+    elif first is not None and (
+        not pd.api.types.is_numeric_dtype(table.dtypes.iloc[0]) or first == "" or first.startswith("Unnamed")
+    ):
+        row_labels = table.iloc[:, 0].astype(str).tolist()
+        table = table.iloc[:, 1:]
+    return table.to_numpy(dtype=float), row_labels, [str(c) for c in table.columns]
+
+def read_vector(source, name=None):
+    values, _, _ = read_matrix(source, name)
+    return values.ravel()
+
+def validate_instance(costs, supply, demand):
+    # Shape and sign checks, one reduction per array; returns a list of messages.
+    errors = []
+    if np.ndim(costs) != 2:
+        errors.append(f"The cost matrix must be 2-D, got {np.ndim(costs)}-D")
+    else:
+        if len(supply) != costs.shape[0]:
+            errors.append(f"Supply has {len(supply)} values for {costs.shape[0]} suppliers")
+        if len(demand) != costs.shape[1]:
+            errors.append(f"Demand has {len(demand)} values for {costs.shape[1]} customers")
+    for label, values in (("Costs", costs), ("Supply", supply), ("Demand", demand)):
+        if np.size(values) == 0:
+            errors.append(f"{label} are empty")
+            continue
+        lowest = np.min(values)
+        if np.isnan(lowest):
+            errors.append(f"{label} contain missing or non-numeric values")
+        elif lowest < 0:
+            errors.append(f"{label} must be positive")
+    return errors
@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from .generators import random_instance
+
+def instance_payload(size, kind="dense", seed=0, optimize=True):
+    costs, supply, demand = random_instance(size, size, kind=kind, seed=seed)
+    return {
+        "costs": np.asarray(costs).tolist(),
+        "supply": np.asarray(supply).tolist(),
+        "demand": np.asarray(demand).tolist(),
+        "optimize": optimize,
+    }
+
+def run_load_test(url, n_requests=500, concurrency=16, size=10, kind="dense", optimize=True, distinct=None,
+                  endpoint="/solve", timeout=60.0, seed=0):
+    # Fires n_requests POSTs from `concurrency` threads, each on its own keep-alive
+    # connection, cycling through `distinct` different instances (all different
+    # by default, so the service cache does not flatter the numbers).
+    # Returns throughput and latency percentiles over the successful requests.
+    target = urlsplit(url)
+    distinct = distinct or n_requests
+    bodies = [
+        json.dumps(instance_payload(size, kind, seed + k, optimize)).encode()
+        for k in range(min(distinct, n_requests))
+    ]
+    latencies = np.zeros(n_requests)
+    statuses = Counter()
+    lock = threading.Lock()
+    local = threading.local()
+
+    def connection():
+        if getattr(local, "conn", None) is None:
+            local.conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=timeout)
+        return local.conn
+
+    def send(k):
+        start = time.perf_counter()
+        try:
+            conn = connection()
+            conn.request("POST", endpoint, body=bodies[k % len(bodies)], headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.will_close:
+                conn.close()
+                local.conn = None
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = None
+        latencies[k] = time.perf_counter() - start
+        with lock:
+            statuses[status] += 1
+        return status == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        ok = np.fromiter(pool.map(send, range(n_requests)), dtype=bool, count=n_requests)
+    seconds = time.perf_counter() - start
+
+    result = {
+        "requests": n_requests,
+        "ok": int(ok.sum()),
+        "errors": int((~ok).sum()),
+        "seconds": seconds,
+        "throughput": ok.sum() / seconds,
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+    if ok.any():
+        for p, value in zip((50, 90, 99), np.percentile(latencies[ok], (50, 90, 99))):
+            result[f"p{p}_ms"] = value * 1000
+        result["max_ms"] = latencies[ok].max() * 1000
+    return result
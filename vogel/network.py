@@ -0,0 +1,208 @@
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from .solver import INF, _balance_vectors
+
+NODE_KINDS = ("supplier", "hub", "customer")
+
+def _residual_network(n_nodes, tail, head, cost, capacity):
+    # Arc k becomes residual arcs 2k (forward) and 2k + 1 (backward), so a
+    # residual arc's partner is a ^ 1. Out-arcs of each node are grouped by tail.
+    n_arcs = len(tail)
+    r_tail = np.empty(2 * n_arcs, dtype=np.int64)
+    r_head = np.empty(2 * n_arcs, dtype=np.int64)
+    r_cost = np.empty(2 * n_arcs)
+    residual = np.zeros(2 * n_arcs)
+    r_tail[0::2], r_tail[1::2] = tail, head
+    r_head[0::2], r_head[1::2] = head, tail
+    r_cost[0::2], r_cost[1::2] = cost, -cost
+    residual[0::2] = capacity
+    order = np.argsort(r_tail, kind="stable")
+    bounds = np.searchsorted(r_tail[order], np.arange(n_nodes + 1))
+    out = [order[bounds[v]:bounds[v + 1]].tolist() for v in range(n_nodes)]
+    return r_tail, r_head, r_cost, residual, out
+
+def min_cost_flow(n_nodes, tail, head, cost, capacity, balance, stats=None):
+    # Capacity scaling over arc arrays: in the phase for delta only residual arcs
+    # with at least delta left are used, and nodes with an excess of delta or more
+    # send flow to deficits of delta or more along shortest paths (Dijkstra on
+    # reduced costs, the node potentials keeping them non-negative). Phases halve
+    # delta down to 1, then a last exact phase settles fractional quantities.
+    # balance[v] > 0 is supply, < 0 demand; it must sum to zero. Capacities may be
+    # inf. Returns the flow on each arc; raises ValueError if no flow is feasible.
+    tail = np.asarray(tail, dtype=np.int64)
+    head = np.asarray(head, dtype=np.int64)
+    cost = np.asarray(cost, dtype=float)
+    balance = np.asarray(balance, dtype=float)
+    total = balance[balance > 0].sum()
+    eps = 1e-9 * max(total, 1.0)
+    if abs(balance.sum()) > eps:
+        raise ValueError("Supplies and demands must balance.")
+    # No arc ever carries more than the total supply.
+    capacity = np.minimum(np.asarray(capacity, dtype=float), total)
+
+    r_tail, r_head, r_cost, residual, out = _residual_network(n_nodes, tail, head, cost, capacity)
+    excess = balance.copy()
+    pi = np.zeros(n_nodes)
+    largest = max(total, capacity.max(initial=0.0))
+    deltas = [2.0 ** k for k in range(int(math.log2(largest)), -1, -1)] if largest >= 1 else []
+    phases = augmentations = scans = 0
+    r_head_list, r_tail_list, r_cost_list = r_head.tolist(), r_tail.tolist(), r_cost.tolist()
+
+    for delta in deltas + [eps]:
+        phases += 1
+        # Arcs of this phase's network with a negative reduced cost are saturated,
+        # which restores optimality for the smaller delta.
+        reduced = r_cost - pi[r_tail] + pi[r_head]
+        push = np.flatnonzero((residual >= delta) & (reduced < -eps))
+        if len(push):
+            amount = residual[push]
+            residual[push] = 0.0
+            np.add.at(residual, push ^ 1, amount)
+            np.add.at(excess, r_tail[push], -amount)
+            np.add.at(excess, r_head[push], amount)
+
+        res, exc, pot = residual.tolist(), excess.tolist(), pi.tolist()
+        stuck = set()
+        while True:
+            sources = [v for v in range(n_nodes) if exc[v] >= delta and v not in stuck]
+            if not sources or not any(x <= -delta for x in exc):
+                break
+            s = max(sources, key=exc.__getitem__)
+            dist = {s: 0.0}
+            pred = {}
+            done = {}
+            heap = [(0.0, s)]
+            t = None
+            while heap:
+                d, v = heapq.heappop(heap)
+                if v in done:
+                    continue
+                done[v] = d
+                scans += 1
+                if exc[v] <= -delta:
+                    t = v
+                    break
+                pv = pot[v]
+                for a in out[v]:
+                    if res[a] >= delta:
+                        w = r_head_list[a]
+                        if w in done:
+                            continue
+                        nd = d + r_cost_list[a] - pv + pot[w]
+                        if nd < dist.get(w, INF):
+                            dist[w] = nd
+                            pred[w] = a
+                            heapq.heappush(heap, (nd, w))
+            if t is None:
+                if delta == eps:
+                    raise ValueError("No feasible flow: some supply cannot reach any remaining demand.")
+                # Left for a later phase, where thinner arcs count too.
+                stuck.add(s)
+                continue
+
+            # Nodes not settled moved at least as far as t did.
+            dt = done[t]
+            for v in range(n_nodes):
+                pot[v] -= done.get(v, dt)
+            path = []
+            v = t
+            while v != s:
+                a = pred[v]
+                path.append(a)
+                v = r_tail_list[a]
+            amount = min(exc[s], -exc[t], min(res[a] for a in path))
+            for a in path:
+                res[a] -= amount
+                res[a ^ 1] += amount
+            exc[s] -= amount
+            exc[t] += amount
+            augmentations += 1
+        residual, excess, pi = np.array(res), np.array(exc), np.array(pot)
+
+    if stats is not None:
+        stats.update(phases=phases, augmentations=augmentations, node_scans=scans)
+    flow = residual[1::2].copy()
+    flow[flow < eps] = 0.0
+    return flow
+
+def solve_transshipment(supply, demand, tail, head, cost, capacity=None, n_hubs=0, stats=None):
+    # Suppliers, then hubs, then customers are numbered in one node range:
+    # supplier i is node i, hub h node len(supply) + h, customer j node
+    # len(supply) + n_hubs + j. Arcs go tail -> head between any of them; arcs at
+    # INF cost are left out. As in the transportation solvers, a dummy customer
+    # (or supplier) takes up unequal totals, reached from every supplier (or
+    # reaching every customer) at zero cost and without a capacity limit.
+    # Returns (flow per arc, total cost); `stats` also receives the unused supply
+    # and the unmet demand.
+    n_sources, n_dests = len(supply), len(demand)
+    tail = np.asarray(tail, dtype=np.int64)
+    head = np.asarray(head, dtype=np.int64)
+    cost = np.asarray(cost, dtype=float)
+    capacity = np.full(len(tail), np.inf) if capacity is None else np.asarray(capacity, dtype=float)
+    n_nodes = n_sources + n_hubs + n_dests
+    if len(tail) and (min(tail.min(), head.min()) < 0 or max(tail.max(), head.max()) >= n_nodes):
+        raise ValueError(f"Arc endpoints must be node numbers below {n_nodes}.")
+
+    balanced_supply, balanced_demand = _balance_vectors(supply, demand)
+    allowed = np.flatnonzero(cost < INF)
+    net_tail, net_head = tail[allowed], head[allowed]
+    net_cost, net_capacity = cost[allowed], capacity[allowed]
+    balance = np.r_[balanced_supply[:n_sources], np.zeros(n_hubs), -balanced_demand[:n_dests]]
+    if len(balanced_demand) > n_dests:
+        dummy = np.arange(n_sources)
+        net_tail, net_head = np.r_[net_tail, dummy], np.r_[net_head, np.full(n_sources, n_nodes)]
+        balance = np.r_[balance, -balanced_demand[-1]]
+    elif len(balanced_supply) > n_sources:
+        dummy = n_sources + n_hubs + np.arange(n_dests)
+        net_tail, net_head = np.r_[net_tail, np.full(n_dests, n_nodes)], np.r_[net_head, dummy]
+        balance = np.r_[balance, balanced_supply[-1]]
+    extra = len(net_tail) - len(allowed)
+    net_cost = np.r_[net_cost, np.zeros(extra)]
+    net_capacity = np.r_[net_capacity, np.full(extra, np.inf)]
+
+    net_flow = min_cost_flow(len(balance), net_tail, net_head, net_cost, net_capacity, balance, stats=stats)
+    flow = np.zeros(len(tail))
+    flow[allowed] = net_flow[:len(allowed)]
+    if stats is not None:
+        dummy_flow = net_flow[len(allowed):].sum()
+        stats.update(
+            unused_supply=float(dummy_flow) if len(balanced_demand) > n_dests else 0.0,
+            unmet_demand=float(dummy_flow) if len(balanced_supply) > n_sources else 0.0,
+        )
+    return flow, float(np.dot(flow[allowed], cost[allowed]))
+
+def read_network(nodes, arcs):
+    # nodes: name, kind (supplier, hub or customer), quantity (supply or demand).
+    # arcs: from, to, cost and an optional capacity, by node name.
+    # Returns (node_names, supply, demand, n_hubs, tail, head, cost, capacity).
+    nodes = nodes if isinstance(nodes, pd.DataFrame) else pd.read_csv(nodes)
+    arcs = arcs if isinstance(arcs, pd.DataFrame) else pd.read_csv(arcs)
+    kinds = nodes["kind"].str.strip().str.lower()
+    unknown = sorted(set(kinds) - set(NODE_KINDS))
+    if unknown:
+        raise ValueError(f"Unknown node kinds {unknown}, expected one of {list(NODE_KINDS)}.")
+    ordered = pd.concat([nodes[kinds == kind] for kind in NODE_KINDS])
+    names = ordered["name"].astype(str).tolist()
+    if len(set(names)) != len(names):
+        raise ValueError("Node names must be unique.")
+    index = pd.Series(np.arange(len(names)), index=names)
+    quantity = ordered.get("quantity", pd.Series(0.0, index=ordered.index)).fillna(0.0).to_numpy(dtype=float)
+    kinds = kinds[ordered.index].to_numpy()
+    missing = sorted(set(arcs["from"].astype(str)).union(arcs["to"].astype(str)) - set(names))
+    if missing:
+        raise ValueError(f"Arcs refer to unknown nodes {missing[:5]}.")
+    capacity = arcs["capacity"].fillna(np.inf).to_numpy(dtype=float) if "capacity" in arcs else None
+    return (
+        names,
+        quantity[kinds == "supplier"],
+        quantity[kinds == "customer"],
+        int((kinds == "hub").sum()),
+        index[arcs["from"].astype(str)].to_numpy(),
+        index[arcs["to"].astype(str)].to_numpy(),
+        arcs["cost"].to_numpy(dtype=float),
+        capacity,
+    )
@@ -0,0 +1,135 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Above WEBGL_LANES positive lanes the Sankey is replaced by a WebGL lane map,
+# which itself draws at most MAX_POINTS of the largest lanes.
+SANKEY_TOP_K = 200
+WEBGL_LANES = 5000
+MAX_POINTS = 50_000
+
+def _flow_lanes(allocation_matrix):
+    if isinstance(allocation_matrix, tuple):
+        rows, cols, values = (np.asarray(a) for a in allocation_matrix)
+        keep = values > 0
+        return rows[keep], cols[keep], values[keep]
+    allocation_matrix = np.asarray(allocation_matrix)
+    rows, cols = np.nonzero(allocation_matrix > 0)
+    return rows, cols, allocation_matrix[rows, cols]
+
+def _largest(values, k):
+    # Indices of the k largest values, largest first.
+    if k >= len(values):
+        return np.argsort(-values, kind="stable")
+    keep = np.argpartition(-values, k - 1)[:k]
+    return keep[np.argsort(-values[keep], kind="stable")]
+
+def plot_sankey(allocation_matrix, source_names, dest_names=None, top_k=None, webgl_threshold=None):
+    # `allocation_matrix` may also be a (rows, cols, qty) lane list. Without
+    # dest_names the lanes run node to node within source_names, so a hub is one
+    # node that flow enters and leaves (the multi-layer flow of solve_transshipment).
+    rows, cols, values = _flow_lanes(allocation_matrix)
+    network = dest_names is None
+    if network:
+        dest_names = source_names
+    if webgl_threshold is not None and len(values) > webgl_threshold:
+        return plot_flow_map((rows, cols, values), source_names, dest_names)
+
+    n_sources = 0 if network else len(source_names)
+    labels = list(source_names) if network else list(source_names) + list(dest_names)
+    title = "Supply Chain Flow"
+    other_links = ([], [], [], [])
+
+    if top_k is not None and len(values) > top_k:
+        # Keep the top-k lanes and route the rest through one "Other lanes" node:
+        # one link in per supplier and one out per customer, so every node keeps
+        # its full throughput.
+        keep = _largest(values, top_k)
+        rest = np.ones(len(values), dtype=bool)
+        rest[keep] = False
+        other_node = len(labels)
+        labels.append("Other lanes")
+        other_sources, source_index = np.unique(rows[rest], return_inverse=True)
+        other_targets, target_index = np.unique(cols[rest], return_inverse=True)
+        other_links = (
+            np.r_[other_sources, np.full(len(other_targets), other_node)],
+            np.r_[np.full(len(other_sources), other_node), n_sources + other_targets],
+            np.r_[np.bincount(source_index, weights=values[rest]), np.bincount(target_index, weights=values[rest])],
+            [f"{source_names[r]} → {n} other lanes" for r, n in zip(other_sources, np.bincount(source_index))]
+            + [f"{n} other lanes → {dest_names[c]}" for c, n in zip(other_targets, np.bincount(target_index))],
+        )
+        title = f"Supply Chain Flow (top {top_k} of {len(rest)} lanes)"
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+
+    # Hover labels are built for the drawn lanes only.
+    custom_data = [f"{source_names[r]} → {dest_names[c]}" for r, c in zip(rows.tolist(), cols.tolist())]
+    source_indices = np.r_[rows, other_links[0]].astype(np.int64)
+    target_indices = np.r_[n_sources + cols, other_links[1]].astype(np.int64)
+    values = np.r_[values, other_links[2]]
+    custom_data += other_links[3]
+
+    # Only nodes that carry flow are sent to the browser.
+    used, remapped = np.unique(np.r_[source_indices, target_indices], return_inverse=True)
+    source_indices = remapped[:len(source_indices)]
+    target_indices = remapped[len(source_indices):]
+    labels = [labels[k] for k in used]
+
+    fig = go.Figure(data=[go.Sankey(
+        node = dict(
+            pad = 15,
+            thickness = 20,
+            line = dict(color = "white", width = 0.5),
+            label = labels,
+            color = "#3B82F6"
+        ),
+        link = dict(
+            source = source_indices,
+            target = target_indices,
+            value = values,
+            color = "rgba(59, 130, 246, 0.4)",
+            customdata = custom_data,
+            hovertemplate='%{customdata}<br />Quantity: %{value}<extra></extra>'
+        ))])
+    fig.update_layout(
+        title_text=title,
+        font_size=14,
+        height=500,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+def plot_flow_map(allocation_matrix, source_names, dest_names, max_points=MAX_POINTS):
+    # Supplier × customer lane map drawn with WebGL, coloured by quantity.
+    rows, cols, values = _flow_lanes(allocation_matrix)
+    n_lanes = len(values)
+    keep = _largest(values, max_points)
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+    title = "Supply Chain Flow"
+    if n_lanes > len(keep):
+        title = f"Supply Chain Flow (largest {len(keep)} of {n_lanes} lanes)"
+
+    fig = go.Figure(data=[go.Scattergl(
+        x = cols,
+        y = rows,
+        mode = "markers",
+        marker = dict(
+            symbol = "square",
+            size = 4,
+            color = values,
+            colorscale = "Blues",
+            showscale = True,
+            colorbar = dict(title = "Quantity")
+        ),
+        customdata = [f"{source_names[r]} → {dest_names[c]}" for r, c in zip(rows, cols)],
+        hovertemplate='%{customdata}<br />Quantity: %{marker.color}<extra></extra>'
+    )])
+    fig.update_layout(
+        title_text=title,
+        font_size=14,
+        height=500,
+        xaxis=dict(title="Customer", range=[-0.5, len(dest_names) - 0.5]),
+        yaxis=dict(title="Supplier", range=[len(source_names) - 0.5, -0.5]),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
@@ -0,0 +1,51 @@
+import numpy as np
+
+from .solver import INF, batch_vogel_approximation_method, repair_allocation
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+def sample_scenarios(costs, supply, demand, n_scenarios, cost_volatility=0.1, demand_volatility=0.1, seed=0):
+    # Monte Carlo scenarios around one instance: a lognormal fuel-price shock shared
+    # by every lane of a scenario, lognormal lane noise at half that volatility, and
+    # normal demand noise clipped at zero. Forbidden (INF) lanes stay forbidden.
+    rng = np.random.default_rng(seed)
+    costs = np.asarray(costs, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    shock = rng.normal(0.0, cost_volatility, size=(n_scenarios, 1, 1))
+    noise = rng.normal(0.0, cost_volatility / 2, size=(n_scenarios,) + costs.shape)
+    cost_tensor = np.where(costs < INF, costs * np.exp(shock + noise), costs)
+    demands = np.maximum(demand * (1 + rng.normal(0.0, demand_volatility, size=(n_scenarios, len(demand)))), 0)
+    supplies = np.broadcast_to(supply, (n_scenarios, len(supply))).copy()
+    return cost_tensor, supplies, demands
+
+def scenario_statistics(total_costs, percentiles=DEFAULT_PERCENTILES):
+    # Infeasible scenarios (NaN totals) are counted but left out of the figures.
+    total_costs = np.asarray(total_costs, dtype=float)
+    feasible = total_costs[~np.isnan(total_costs)]
+    stats = {"scenarios": len(total_costs), "infeasible": len(total_costs) - len(feasible)}
+    if len(feasible) == 0:
+        feasible = np.array([np.nan])
+    stats.update(
+        mean=feasible.mean(),
+        std=feasible.std(),
+        min=feasible.min(),
+        max=feasible.max(),
+    )
+    for p, value in zip(percentiles, np.percentile(feasible, percentiles)):
+        stats[f"p{p}"] = value
+    return stats
+
+def solve_scenarios(cost_tensor, supplies, demands, percentiles=DEFAULT_PERCENTILES):
+    allocations, total_costs = batch_vogel_approximation_method(cost_tensor, supplies, demands)
+    # A scenario whose VAM plan had to ship on a forbidden lane would put an INF
+    # total into the statistics: its plan is made feasible, or its total set to
+    # NaN when the sampled demand cannot be met without forbidden lanes.
+    for k in np.flatnonzero(total_costs >= INF):
+        try:
+            allocations[k], total_costs[k] = repair_allocation(
+                np.asarray(cost_tensor)[k], np.asarray(supplies)[k], np.asarray(demands)[k], allocations[k]
+            )
+        except ValueError:
+            total_costs[k] = np.nan
+    return allocations, total_costs, scenario_statistics(total_costs, percentiles)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from .solver import INF, _balance_problem, _BasisTree
+
+def sensitivity_analysis(cost_matrix, supply, demand, basis):
+    # Post-optimal analysis from the final basis of transportation_simplex
+    # (return_basis=True), with no further solves:
+    #   u, v          dual potentials, c[i, j] = u[i] + v[j] on basic cells
+    #   reduced       c[i, j] - u[i] - v[j], >= 0 at the optimum
+    #   cost_lower/   range each unit cost can move over while the basis (and so
+    #   cost_upper    the plan) stays optimal; NaN on forbidden lanes
+    #   supply_price/ change in total cost per extra unit of supply or demand,
+    #   demand_price  the dummy line absorbing it when the problem is unbalanced
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    n_rows, n_cols = costs.shape
+    tree = _BasisTree(np.asarray(basis), costs)
+    if not tree.spanning:
+        raise ValueError("The basis does not span every supplier and customer.")
+    u, v = tree.pi[:n_rows], tree.pi[n_rows:]
+    reduced = costs - u[:, None] - v[None, :]
+
+    cells = tree.cells()
+    basic = np.zeros((n_rows, n_cols), dtype=bool)
+    basic[cells[:, 0], cells[:, 1]] = True
+    # Forbidden lanes never enter the basis, whatever their reduced cost.
+    entering = np.where(basic | (costs >= INF), np.inf, np.maximum(reduced, 0.0))
+
+    # Non-basic cells only matter once their cost drops below u + v.
+    cost_lower = costs - np.where(basic, 0.0, entering)
+    cost_upper = np.where(basic, costs, np.inf)
+
+    # A basic cell's cost shifts the potentials of the subtree it hangs, and with
+    # them the reduced costs of every cell crossing the cut, one way or the other.
+    n_nodes = n_rows + n_cols
+    tin = np.zeros(n_nodes, dtype=np.int64)
+    size = np.ones(n_nodes, dtype=np.int64)
+    preorder = []
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        tin[node] = len(preorder)
+        preorder.append(node)
+        stack.extend(tree.children[node])
+    for node in reversed(preorder[1:]):
+        size[tree.parent[node]] += size[node]
+    row_tin, col_tin = tin[:n_rows], tin[n_rows:]
+
+    for child in preorder[1:]:
+        lo, hi = tin[child], tin[child] + size[child]
+        rows_in = (row_tin >= lo) & (row_tin < hi)
+        cols_in = (col_tin >= lo) & (col_tin < hi)
+        leaving = entering[np.ix_(rows_in, ~cols_in)]
+        joining = entering[np.ix_(~rows_in, cols_in)]
+        leaving = leaving.min() if leaving.size else np.inf
+        joining = joining.min() if joining.size else np.inf
+        r, c = tree.cell(child)
+        if child < n_rows:
+            cost_upper[r, c] = costs[r, c] + leaving
+            cost_lower[r, c] = costs[r, c] - joining
+        else:
+            cost_upper[r, c] = costs[r, c] + joining
+            cost_lower[r, c] = costs[r, c] - leaving
+
+    if n_cols > original_cols:
+        supply_price = u[:original_rows] + v[-1]
+        demand_price = v[:original_cols] - v[-1]
+    elif n_rows > original_rows:
+        supply_price = u[:original_rows] - u[-1]
+        demand_price = v[:original_cols] + u[-1]
+    else:
+        # Balanced: only a matched pair of changes keeps it feasible, and the pair
+        # (i, j) costs u[i] + v[j]. Potentials are reported with u[0] = 0.
+        supply_price = u.copy()
+        demand_price = v.copy()
+
+    forbidden = costs[:original_rows, :original_cols] >= INF
+    cost_lower = cost_lower[:original_rows, :original_cols]
+    cost_upper = cost_upper[:original_rows, :original_cols]
+    cost_lower[forbidden] = np.nan
+    cost_upper[forbidden] = np.nan
+    return {
+        "u": u[:original_rows],
+        "v": v[:original_cols],
+        "reduced": reduced[:original_rows, :original_cols],
+        "basic": basic[:original_rows, :original_cols],
+        "cost_lower": cost_lower,
+        "cost_upper": cost_upper,
+        "supply_price": supply_price,
+        "demand_price": demand_price,
+    }
+
+def sensitivity_frames(sensitivity, costs, allocation, source_names, dest_names, basic_only=False):
+    # (lanes, prices) tables for display and export. Lanes are every allowed cell,
+    # or only the basic ones with basic_only=True for large instances.
+    costs = np.asarray(costs, dtype=float)
+    allocation = np.asarray(allocation)[:costs.shape[0], :costs.shape[1]]
+    mask = sensitivity["basic"] if basic_only else costs < INF
+    rows, cols = np.nonzero(mask & (costs < INF))
+    lanes = pd.DataFrame({
+        "Supplier": np.asarray(source_names, dtype=object)[rows],
+        "Customer": np.asarray(dest_names, dtype=object)[cols],
+        "Qty": allocation[rows, cols],
+        "Basic": sensitivity["basic"][rows, cols],
+        "Unit Cost": costs[rows, cols],
+        "Reduced Cost": sensitivity["reduced"][rows, cols],
+        "Cost Lower": sensitivity["cost_lower"][rows, cols],
+        "Cost Upper": sensitivity["cost_upper"][rows, cols],
+    })
+    prices = pd.DataFrame({
+        "Entity": list(source_names[:len(sensitivity["u"])]) + list(dest_names[:len(sensitivity["v"])]),
+        "Role": ["Supplier"] * len(sensitivity["u"]) + ["Customer"] * len(sensitivity["v"]),
+        "Potential": np.r_[sensitivity["u"], sensitivity["v"]],
+        "Shadow Price": np.r_[sensitivity["supply_price"], sensitivity["demand_price"]],
+    })
+    return lanes, prices
@@ -0,0 +1,462 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .cache import ResultCache, instance_key
+from .export import STREAMING_CELLS, generate_excel, generate_excel_streaming
+from .instances import instance_frames, validate_instance
+from .solver import (
+    BATCH_CELLS,
+    INF,
+    batch_vogel_approximation_method,
+    repair_allocation,
+    transportation_simplex,
+    vogel_approximation_method,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 32 * 2**20
+MAX_CELLS = 1_000_000
+MAX_BATCH_INSTANCES = 256
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class RequestError(Exception):
+    # A request the service refuses, with the HTTP status to answer.
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_instance(payload, max_cells=MAX_CELLS):
+    # {"costs": [[...]], "supply": [...], "demand": [...]}; lanes at INF or above are forbidden.
+    if not isinstance(payload, dict):
+        raise RequestError(400, "An instance must be a JSON object")
+    try:
+        costs = np.asarray(payload["costs"], dtype=float)
+        supply = np.asarray(payload["supply"], dtype=float)
+        demand = np.asarray(payload["demand"], dtype=float)
+    except KeyError as e:
+        raise RequestError(400, f"Missing field {e}") from None
+    except (TypeError, ValueError) as e:
+        raise RequestError(400, f"Invalid numbers: {e}") from None
+    if costs.size > max_cells:
+        raise RequestError(413, f"{costs.size} cost cells, the limit is {max_cells}")
+    errors = validate_instance(costs, supply, demand)
+    if errors:
+        raise RequestError(400, "; ".join(errors))
+    return costs, supply, demand
+
+def parse_optimize(payload, default=True):
+    # Only a JSON boolean: bool("false") would quietly turn optimization on.
+    optimize = payload.get("optimize", default)
+    if not isinstance(optimize, bool):
+        raise RequestError(400, "optimize must be true or false")
+    return optimize
+
+def _solve_one(costs, supply, demand, optimize, time_budget=None):
+    # Past `time_budget` seconds the solve returns its best plan so far, with
+    # "timed_out" set, so no instance keeps a pool worker for long.
+    start = time.perf_counter()
+    stats = {}
+    allocation, vam_cost = vogel_approximation_method(costs, supply, demand, stats=stats, time_budget=time_budget)
+    total_cost, pivots = vam_cost, 0
+    if optimize:
+        remaining = None if time_budget is None else max(time_budget - (time.perf_counter() - start), 0.0)
+        allocation, total_cost, pivots = transportation_simplex(
+            costs, supply, demand, allocation, stats=stats, time_budget=remaining
+        )
+    elif vam_cost >= INF:
+        allocation, total_cost = repair_allocation(costs, supply, demand, allocation)
+    return {
+        "allocation": allocation,
+        "vam_cost": float(vam_cost),
+        "total_cost": float(total_cost),
+        "pivots": pivots,
+        "timed_out": stats.get("vam_truncated", False) or not stats.get("optimal", True),
+        "solve_seconds": time.perf_counter() - start,
+    }
+
+def _solve_many(jobs, time_budget=None):
+    # One pool task per micro-batch of (costs, supply, demand, optimize) jobs.
+    # VAM-only jobs of the same shape share one batched VAM pass; the rest are
+    # solved in turn. Every solve and every batched pass stops within `time_budget`
+    # seconds. A failing job yields {"error": ...} without failing the others.
+    results = [None] * len(jobs)
+    same_shape = {}
+    for k, (costs, supply, demand, optimize) in enumerate(jobs):
+        if optimize:
+            try:
+                results[k] = _solve_one(costs, supply, demand, optimize, time_budget)
+            except Exception as e:
+                results[k] = {"error": str(e)}
+        else:
+            same_shape.setdefault(costs.shape, []).append(k)
+    for ks in same_shape.values():
+        start = time.perf_counter()
+        stats = {}
+        try:
+            allocations, total_costs = batch_vogel_approximation_method(
+                np.stack([jobs[k][0] for k in ks]),
+                np.stack([jobs[k][1] for k in ks]),
+                np.stack([jobs[k][2] for k in ks]),
+                stats=stats,
+                time_budget=time_budget,
+            )
+        except Exception as e:
+            for k in ks:
+                results[k] = {"error": str(e)}
+            continue
+        seconds = (time.perf_counter() - start) / len(ks)
+        for k, allocation, vam_cost, timed_out in zip(ks, allocations, total_costs, stats["vam_truncated"]):
+            total_cost = vam_cost
+            if vam_cost >= INF:
+                try:
+                    allocation, total_cost = repair_allocation(*jobs[k][:3], allocation)
+                except ValueError as e:
+                    results[k] = {"error": str(e)}
+                    continue
+            results[k] = {
+                "allocation": allocation,
+                "vam_cost": float(vam_cost),
+                "total_cost": float(total_cost),
+                "pivots": 0,
+                "timed_out": bool(timed_out),
+                "solve_seconds": seconds,
+            }
+    return results
+
+def _excel_report(costs, supply, demand, allocation, total_cost, currency, source_names, dest_names):
+    if costs.size > STREAMING_CELLS:
+        return generate_excel_streaming(costs, supply, demand, allocation, total_cost, currency, source_names, dest_names)
+    input_df, demand_df = instance_frames(costs, supply, demand, source_names, dest_names)
+    res_df = pd.DataFrame(allocation, index=input_df.index, columns=demand_df.columns)
+    return generate_excel(input_df, demand_df, res_df, total_cost, currency)
+
+class SolveService:
+    # Solver behind the HTTP handler. At most `max_pending` solves are queued or
+    # running at once (more are refused with 503), on a pool of `workers`
+    # processes. Requests up to `batch_cells` cost cells wait up to `batch_wait`
+    # seconds for others to share one pool task of at most `max_batch` jobs;
+    # larger ones go to the pool alone. Repeated instances are answered from cache.
+    # A solve stops after `solve_timeout` seconds with its best plan so far, well
+    # before the `timeout` the handler waits for it.
+    def __init__(
+        self,
+        workers=None,
+        max_pending=256,
+        max_batch=32,
+        batch_wait=0.005,
+        batch_cells=BATCH_CELLS,
+        max_cells=MAX_CELLS,
+        max_body_bytes=MAX_BODY_BYTES,
+        max_batch_instances=MAX_BATCH_INSTANCES,
+        timeout=120.0,
+        solve_timeout=60.0,
+        cache_entries=1024,
+    ):
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.batch_cells = batch_cells
+        self.max_cells = max_cells
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_instances = max_batch_instances
+        self.timeout = timeout
+        self.solve_timeout = solve_timeout
+        self.cache = ResultCache(max_entries=cache_entries)
+        self.pool = None
+        self.small = queue.Queue()
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._statuses = Counter()
+        self._latencies = deque(maxlen=10_000)
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._batcher = None
+
+    def start(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._batcher = threading.Thread(target=self._run_batcher, name="solve-batcher", daemon=True)
+            self._batcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._batcher is not None:
+            self._batcher.join()
+            self._batcher = None
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def count(self, in_flight=0, **counters):
+        with self._lock:
+            self._counters.update(counters)
+            self._in_flight += in_flight
+
+    def submit(self, costs, supply, demand, optimize=True):
+        # Future of the result dict; raises RequestError(503) when the service is full.
+        key = instance_key(costs, supply, demand, optimize=optimize)
+        cached = self.cache.get(key)
+        future = Future()
+        if cached is not None:
+            self.count(cache_hits=1)
+            future.set_result({**cached, "cached": True})
+            return future
+        if not self.slots.acquire(blocking=False):
+            self.count(rejected=1)
+            raise RequestError(503, "Solver queue full, retry later")
+        self.count(in_flight=1)
+        job = (costs, supply, demand, optimize)
+        if costs.size <= self.batch_cells:
+            self.small.put((job, key, future))
+        else:
+            self._dispatch([(job, key, future)])
+        return future
+
+    def _dispatch(self, entries):
+        self.count(pool_tasks=1, pool_jobs=len(entries))
+        try:
+            task = self.pool.submit(_solve_many, [job for job, _, _ in entries], self.solve_timeout)
+        except RuntimeError as e:
+            # Pool shut down or broken.
+            for _, _, future in entries:
+                future.set_exception(RequestError(503, str(e)))
+                self.slots.release()
+                self.count(in_flight=-1)
+            return
+        task.add_done_callback(lambda task: self._settle(entries, task))
+
+    def _settle(self, entries, task):
+        try:
+            results = task.result()
+        except Exception as e:
+            results = [{"error": str(e)}] * len(entries)
+        for (_, key, future), result in zip(entries, results):
+            self.slots.release()
+            self.count(in_flight=-1)
+            if "error" in result:
+                self.count(solve_errors=1)
+            elif not result["timed_out"]:
+                # A plan cut short by the time budget may improve on a later request.
+                self.cache.put(key, result)
+            future.set_result({**result, "cached": False})
+
+    def _run_batcher(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self.small.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.small.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _result(self, future):
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise RequestError(504, f"No result within {self.timeout:g} s") from None
+        if "error" in result:
+            raise RequestError(422, result["error"])
+        return result
+
+    def solve(self, payload):
+        costs, supply, demand = parse_instance(payload, self.max_cells)
+        result = self._result(self.submit(costs, supply, demand, parse_optimize(payload)))
+        return {**result, "allocation": result["allocation"].tolist()}
+
+    def solve_batch(self, payload):
+        instances = payload.get("instances") if isinstance(payload, dict) else None
+        if not isinstance(instances, list):
+            raise RequestError(400, "Expected {\"instances\": [...]}")
+        if len(instances) > self.max_batch_instances:
+            raise RequestError(413, f"{len(instances)} instances, the limit is {self.max_batch_instances}")
+        default = parse_optimize(payload)
+        futures = []
+        for instance in instances:
+            # Every instance is answered on its own: one bad or refused instance
+            # does not fail the batch.
+            try:
+                costs, supply, demand = parse_instance(instance, self.max_cells)
+                futures.append(self.submit(costs, supply, demand, parse_optimize(instance, default)))
+            except RequestError as e:
+                futures.append(e)
+        results = []
+        for future in futures:
+            try:
+                if isinstance(future, RequestError):
+                    raise future
+                result = self._result(future)
+                results.append({**result, "allocation": result["allocation"].tolist()})
+            except RequestError as e:
+                results.append({"error": str(e), "status": e.status})
+        return {"results": results}
+
+    def export(self, payload):
+        costs, supply, demand = parse_instance(payload, self.max_cells)
+        result = self._result(self.submit(costs, supply, demand, parse_optimize(payload)))
+        source_names = payload.get("sources") or [f"Supplier {i+1}" for i in range(costs.shape[0])]
+        dest_names = payload.get("destinations") or [f"Customer {j+1}" for j in range(costs.shape[1])]
+        if len(source_names) != costs.shape[0] or len(dest_names) != costs.shape[1]:
+            raise RequestError(400, "sources and destinations must match the cost matrix")
+        if not self.slots.acquire(blocking=False):
+            self.count(rejected=1)
+            raise RequestError(503, "Solver queue full, retry later")
+        try:
+            task = self.pool.submit(
+                _excel_report, costs, supply, demand, result["allocation"], result["total_cost"],
+                payload.get("currency", "€"), list(map(str, source_names)), list(map(str, dest_names)),
+            )
+            return task.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise RequestError(504, f"No report within {self.timeout:g} s") from None
+        except ValueError as e:
+            raise RequestError(422, str(e)) from None
+        finally:
+            self.slots.release()
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self._counters[f"requests {endpoint}"] += 1
+            self._statuses[status] += 1
+            if status < 400:
+                self._latencies.append(seconds)
+
+    def metrics(self):
+        with self._lock:
+            in_flight = self._in_flight
+            counters = dict(self._counters)
+            statuses = {str(k): v for k, v in sorted(self._statuses.items())}
+            latencies = np.array(self._latencies)
+        latency = {}
+        if len(latencies):
+            for p, value in zip((50, 90, 99), np.percentile(latencies, (50, 90, 99))):
+                latency[f"p{p}_ms"] = value * 1000
+        tasks = counters.get("pool_tasks", 0)
+        return {
+            "uptime_seconds": time.monotonic() - self.started,
+            "workers": self.workers,
+            "in_flight": in_flight,
+            "max_pending": self.max_pending,
+            "waiting_for_batch": self.small.qsize(),
+            "mean_batch_size": counters.get("pool_jobs", 0) / tasks if tasks else 0.0,
+            "counters": counters,
+            "statuses": statuses,
+            "latency": latency,
+        }
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients
+    # stall on delayed ACKs.
+    disable_nagle_algorithm = True
+    service = None
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            raise RequestError(411, "Content-Length required")
+        if not (length.isascii() and length.isdigit()):
+            # Negative, signed or garbled: the body length is unknown, so is the
+            # start of the next request on this connection.
+            self.close_connection = True
+            raise RequestError(400, f"Invalid Content-Length {length[:32]!r}")
+        length = int(length)
+        if length > self.service.max_body_bytes:
+            # The body is left unread, so this connection cannot be reused.
+            self.close_connection = True
+            raise RequestError(413, f"Body of {length} bytes, the limit is {self.service.max_body_bytes}")
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON: {e}") from None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/health":
+            healthy = self.service.pool is not None
+            self._send(200 if healthy else 503, {"status": "ok" if healthy else "stopped"})
+        elif path == "/metrics":
+            self._send(200, self.service.metrics())
+        else:
+            self._send(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        start = time.perf_counter()
+        status = 200
+        routes = {"/solve": self.service.solve, "/batch": self.service.solve_batch, "/export": self.service.export}
+        try:
+            if path not in routes:
+                raise RequestError(404, f"Unknown path {path}")
+            body = routes[path](self._read_json())
+            if path == "/export":
+                self._send(status, body, XLSX_TYPE)
+            else:
+                self._send(status, body)
+        except RequestError as e:
+            status = e.status
+            self._send(status, {"error": str(e)})
+        except Exception as e:
+            status = 500
+            logger.exception("Request to %s failed", path)
+            self._send(status, {"error": str(e)})
+        finally:
+            self.service.record(path if path in routes else "other", status, time.perf_counter() - start)
+
+class _Server(ThreadingHTTPServer):
+    # The socketserver default backlog of 5 drops connection bursts into 1 s SYN retries.
+    request_queue_size = 1024
+    daemon_threads = True
+
+def make_server(service, host="127.0.0.1", port=8750):
+    handler = type("Handler", (_Handler,), {"service": service})
+    return _Server((host, port), handler)
+
+def serve(host="127.0.0.1", port=8750, **options):
+    service = SolveService(**options).start()
+    server = make_server(service, host, port)
+    logger.info("Serving on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
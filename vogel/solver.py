@@ -0,0 +1,1265 @@
+import heapq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+INF = 10**9
+PROGRESS_SECONDS = 0.25
+# Per-line sorts and partitions go to the thread pool in chunks of at most
+# CHUNK_LINES lines, and no smaller than MIN_CHUNK_LINES.
+CHUNK_LINES = 256
+MIN_CHUNK_LINES = 16
+
+class _LinePool:
+    # Runs work that is independent per line (NumPy's sorts and partitions release
+    # the GIL) over chunks of lines on `workers` threads, or inline for one. Each
+    # line comes out as it would serially, so results do not depend on `workers`.
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def each(self, fn, n_lines):
+        chunk = max(MIN_CHUNK_LINES, min(CHUNK_LINES, -(-n_lines // self.workers)))
+        bounds = [(lo, min(lo + chunk, n_lines)) for lo in range(0, n_lines, chunk)]
+        if self.pool is None or len(bounds) < 2:
+            for lo, hi in bounds:
+                fn(lo, hi)
+        else:
+            list(self.pool.map(lambda b: fn(*b), bounds))
+
+class _LinePenalties:
+    # Two cheapest live lanes per line (row or column). Each line owns a
+    # segment start[i]:end[i] of `other`/`cost`, sorted by cost then index,
+    # and pointers into it so only invalidated lines are rescanned.
+    def __init__(self, start, end, other, cost, amount, line_open, other_open):
+        self.start = start
+        self.end = end
+        self.other = other
+        self.cost = cost
+        self.amount = amount
+        self.open = line_open
+        self.other_open = other_open
+
+        self.first_pos = start.copy()
+        self.second_pos = np.minimum(start + 1, end)
+        self.first_idx = np.full(len(start), -1)
+        self.second_idx = np.full(len(start), -1)
+        has_first = self.first_pos < end
+        has_second = self.second_pos < end
+        self.first_idx[has_first] = other[self.first_pos[has_first]]
+        self.second_idx[has_second] = other[self.second_pos[has_second]]
+
+        self.penalty = np.full(len(start), -1.0)
+        single = has_first & ~has_second
+        self.penalty[single] = cost[self.first_pos[single]]
+        self.penalty[has_second] = cost[self.second_pos[has_second]] - cost[self.first_pos[has_second]]
+        self.penalty[amount == 0] = -1.0
+        self.refreshes = 0
+        self.heap = [(-p, i) for i, p in enumerate(self.penalty.tolist())]
+        heapq.heapify(self.heap)
+
+    def _next_live(self, i, start):
+        end = self.end[i]
+        while start < end:
+            stop = min(start + 64, end)
+            live = self.other_open[self.other[start:stop]]
+            k = live.argmax()
+            if live[k]:
+                return start + k
+            start = stop
+        return end
+
+    def _penalty(self, i):
+        if self.amount[i] == 0 or self.first_idx[i] < 0:
+            return -1.0
+        first = self.cost[self.first_pos[i]]
+        if self.second_idx[i] < 0:
+            return first
+        return self.cost[self.second_pos[i]] - first
+
+    def _update(self, i, penalty):
+        if penalty != self.penalty[i]:
+            self.penalty[i] = penalty
+            heapq.heappush(self.heap, (-penalty, i))
+
+    def refresh(self, i):
+        self.refreshes += 1
+        end = self.end[i]
+        first = self._next_live(i, self.first_pos[i])
+        second = self._next_live(i, max(self.second_pos[i], first + 1))
+        self.first_pos[i] = first
+        self.second_pos[i] = second
+        self.first_idx[i] = self.other[first] if first < end else -1
+        self.second_idx[i] = self.other[second] if second < end else -1
+        self._update(i, self._penalty(i))
+
+    def close(self, i):
+        self.open[i] = False
+        self._update(i, -1.0)
+
+    def lanes(self, i):
+        return self.other[self.start[i]:self.end[i]]
+
+    def using(self, j, candidates):
+        # Open lines among `candidates` whose two cheapest live lanes include j.
+        hit = self.open[candidates] & ((self.first_idx[candidates] == j) | (self.second_idx[candidates] == j))
+        return candidates[hit]
+
+    def cheapest(self, i):
+        return self.first_idx[i] if self.open[i] else -1
+
+    def best(self):
+        while True:
+            neg_penalty, i = self.heap[0]
+            if -neg_penalty == self.penalty[i]:
+                return -neg_penalty, i
+            heapq.heappop(self.heap)
+
+class _CostTiePenalties(_LinePenalties):
+    # Same penalties, but among lines with equal penalty the one with the cheapest
+    # live lane wins, and only then the lowest index.
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.tie = np.array([self._first_cost(i) for i in range(len(self.start))])
+        self.heap = [(-p, t, i) for i, (p, t) in enumerate(zip(self.penalty.tolist(), self.tie.tolist()))]
+        heapq.heapify(self.heap)
+
+    def _first_cost(self, i):
+        return float(self.cost[self.first_pos[i]]) if self.first_idx[i] >= 0 else float("inf")
+
+    def _update(self, i, penalty):
+        tie = self._first_cost(i)
+        if penalty != self.penalty[i] or tie != self.tie[i]:
+            self.penalty[i] = penalty
+            self.tie[i] = tie
+            heapq.heappush(self.heap, (-penalty, tie, i))
+
+    def best(self):
+        while True:
+            neg_penalty, tie, i = self.heap[0]
+            if -neg_penalty == self.penalty[i] and tie == self.tie[i]:
+                return -neg_penalty, i
+            heapq.heappop(self.heap)
+
+def _dense_lines(costs, pool=None):
+    n_lines, width = costs.shape
+    order = np.empty((n_lines, width), dtype=np.intp)
+    sorted_costs = np.empty((n_lines, width), dtype=costs.dtype)
+    counts = np.empty(n_lines, dtype=np.int64)
+
+    def sort(lo, hi):
+        order[lo:hi] = np.argsort(costs[lo:hi], axis=1, kind="stable")
+        sorted_costs[lo:hi] = np.take_along_axis(costs[lo:hi], order[lo:hi], axis=1)
+        counts[lo:hi] = (costs[lo:hi] < INF).sum(axis=1)
+
+    (pool or _LinePool()).each(sort, n_lines)
+    start = np.arange(n_lines) * width
+    return start, start + counts, order.ravel(), sorted_costs.ravel()
+
+def _sparse_lines(line, other, cost, n_lines):
+    order = np.lexsort((other, cost, line))
+    counts = np.bincount(line, minlength=n_lines)
+    end = np.cumsum(counts)
+    return end - counts, end, other[order], cost[order]
+
+def _balance_vectors(supply, demand):
+    # A dummy customer (or supplier) takes up the difference between the totals.
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+
+    if supply.sum() > demand.sum():
+        diff = supply.sum() - demand.sum()
+        demand = np.append(demand, diff)
+    elif demand.sum() > supply.sum():
+        diff = demand.sum() - supply.sum()
+        supply = np.append(supply, diff)
+    return supply, demand
+
+def _balance_problem(cost_matrix, supply, demand):
+    costs = np.array(cost_matrix, dtype=float)
+    n_rows, n_cols = costs.shape
+    supply, demand = _balance_vectors(supply, demand)
+
+    if len(demand) > n_cols:
+        costs = np.c_[costs, np.zeros(n_rows)]
+    elif len(supply) > n_rows:
+        costs = np.r_[costs, [np.zeros(n_cols)]]
+    return costs, supply, demand
+
+def _vogel_steps(rows, cols, supply_temp, demand_temp, stats=None, tie_break="index", stop=None):
+    # Yields (row, col, qty) allocations. Quantities are non-negative, so counting
+    # the positive entries stands in for checking supply_temp.sum() > 0 each step.
+    # `stats`, when given, receives the step, tie, fallback and refresh counts.
+    # With tie_break="cost", a row/column penalty tie goes to the cheaper lane.
+    # `stop`, when given, is called before each step; True ends the loop early.
+    supply_left = np.count_nonzero(supply_temp > 0)
+    demand_left = np.count_nonzero(demand_temp > 0)
+    steps = ties = fallbacks = 0
+    while supply_left and demand_left:
+        if stop is not None and stop():
+            break
+        max_row_p, row_idx = rows.best()
+        max_col_p, col_idx = cols.best()
+        steps += 1
+        tied = max_row_p == max_col_p
+        ties += tied
+        if tied and tie_break == "cost" and rows.tie[row_idx] > cols.tie[col_idx]:
+            max_row_p = -np.inf
+        
+        if max_row_p >= max_col_p:
+            col_idx = rows.cheapest(row_idx)
+        else:
+            row_idx = cols.cheapest(col_idx)
+        if row_idx < 0 or col_idx < 0:
+            # No allowed lane joins the remaining supply and demand: ship the rest
+            # on a forbidden lane, which the total cost then shows at INF.
+            # transportation_simplex and repair_allocation move such flow off
+            # forbidden lanes, or raise ValueError when no plan avoids them.
+            row_idx = np.argmax(supply_temp > 0)
+            col_idx = np.argmax(demand_temp > 0)
+            fallbacks += 1
+
+        qty = min(supply_temp[row_idx], demand_temp[col_idx])
+        yield row_idx, col_idx, qty
+        supply_temp[row_idx] -= qty
+        demand_temp[col_idx] -= qty
+        
+        if supply_temp[row_idx] == 0:
+            supply_left -= 1 if qty > 0 else 0
+            rows.close(row_idx)
+            for c in cols.using(row_idx, rows.lanes(row_idx)):
+                cols.refresh(c)
+        if demand_temp[col_idx] == 0:
+            demand_left -= 1 if qty > 0 else 0
+            cols.close(col_idx)
+            for r in rows.using(col_idx, cols.lanes(col_idx)):
+                rows.refresh(r)
+    if stats is not None:
+        stats.update(
+            vam_steps=steps,
+            vam_ties=int(ties),
+            vam_fallbacks=fallbacks,
+            penalty_refreshes=rows.refreshes + cols.refreshes,
+        )
+
+class _Anytime:
+    # Wall-clock budget and progress reporting shared by the VAM and MODI loops.
+    # check() is cheap enough to call every step: `progress` is sent at most one
+    # state dict per PROGRESS_SECONDS, built by `state()` only then, and may
+    # return True to stop the solve.
+    def __init__(self, time_budget=None, progress=None):
+        self.started = time.perf_counter()
+        self.deadline = None if time_budget is None else self.started + time_budget
+        self.progress = progress
+        self.last_report = -np.inf
+        self.bound = -np.inf
+        self.stopped = False
+
+    def check(self, stage, state):
+        now = time.perf_counter()
+        if self.progress is not None and now - self.last_report >= PROGRESS_SECONDS:
+            self.last_report = now
+            if self.progress({"stage": stage, "elapsed": now - self.started, **state()}):
+                self.stopped = True
+        if self.deadline is not None and now >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def report(self, state):
+        if self.progress is not None:
+            self.progress({"stage": "done", "elapsed": time.perf_counter() - self.started, **state})
+
+def _north_west_fill(allocation, supply, demand):
+    # Ships the remaining supply to the remaining demand in north-west corner
+    # order, ignoring costs.
+    rows = np.flatnonzero(supply > 0)
+    cols = np.flatnonzero(demand > 0)
+    i = j = 0
+    while i < len(rows) and j < len(cols):
+        r, c = rows[i], cols[j]
+        qty = min(supply[r], demand[c])
+        allocation[r, c] += qty
+        supply[r] -= qty
+        demand[c] -= qty
+        if supply[r] == 0:
+            i += 1
+        else:
+            j += 1
+
+def _vogel_allocation(costs, supply, demand, stats=None, tie_break="index", anytime=None, workers=None):
+    # Out of time, VAM stops and the rest goes out in north-west corner order, so
+    # the plan is always complete. `workers` threads sort the lines.
+    n_rows, n_cols = costs.shape
+    allocation = np.zeros((n_rows, n_cols))
+    supply_temp = supply.copy()
+    demand_temp = demand.copy()
+    row_open = np.ones(n_rows, dtype=bool)
+    col_open = np.ones(n_cols, dtype=bool)
+    lines = _CostTiePenalties if tie_break == "cost" else _LinePenalties
+    with _LinePool(workers) as pool:
+        rows = lines(*_dense_lines(costs, pool), supply_temp, row_open, col_open)
+        cols = lines(*_dense_lines(costs.T, pool), demand_temp, col_open, row_open)
+
+    stop = None
+    if anytime is not None:
+        total = supply.sum()
+
+        def stop():
+            return anytime.check("vam", lambda: {"allocated": 1 - supply_temp.sum() / total if total else 1.0})
+
+    for r, c, qty in _vogel_steps(rows, cols, supply_temp, demand_temp, stats, tie_break, stop):
+        allocation[r, c] = qty
+    if anytime is not None and anytime.stopped:
+        _north_west_fill(allocation, supply_temp, demand_temp)
+        if stats is not None:
+            stats["vam_truncated"] = True
+    return allocation
+
+def vogel_approximation_method(cost_matrix, supply, demand, stats=None, tie_break="index", time_budget=None,
+                               progress=None, workers=None):
+    # tie_break="cost" settles equal penalties on the cheapest lane instead of the
+    # lowest index; the default keeps the original method's choices. With a
+    # time_budget (seconds) or a progress callback, see transportation_simplex.
+    # workers > 1 sorts the rows and columns on that many threads, with the same result.
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    anytime = None
+    if time_budget is not None or progress is not None:
+        anytime = _Anytime(time_budget, progress)
+    allocation = _vogel_allocation(costs, supply, demand, stats, tie_break, anytime, workers)
+
+    total_cost = np.sum(allocation[:original_rows, :original_cols] * costs[:original_rows, :original_cols])
+    return allocation[:original_rows, :original_cols], total_cost
+
+def csr_lanes(indptr, indices, costs):
+    # CSR adjacency (one segment of customer indices per supplier) to COO lanes.
+    indptr = np.asarray(indptr)
+    lane_rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return lane_rows, np.asarray(indices), np.asarray(costs, dtype=float)
+
+def sparse_vogel_approximation_method(lane_rows, lane_cols, lane_costs, supply, demand, stats=None):
+    # Lanes absent from (lane_rows, lane_cols, lane_costs) are forbidden, so memory
+    # and time follow the number of lanes rather than suppliers x customers.
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    lane_rows = np.asarray(lane_rows, dtype=np.int64)
+    lane_cols = np.asarray(lane_cols, dtype=np.int64)
+    lane_costs = np.asarray(lane_costs, dtype=float)
+    n_rows, n_cols = len(supply), len(demand)
+
+    allowed = lane_costs < INF
+    lane_rows, lane_cols, lane_costs = lane_rows[allowed], lane_cols[allowed], lane_costs[allowed]
+
+    # The dummy line is a set of zero-cost lanes, not an extra dense row/column.
+    if supply.sum() > demand.sum():
+        demand = np.append(demand, supply.sum() - demand.sum())
+        lane_rows = np.r_[lane_rows, np.arange(n_rows)]
+        lane_cols = np.r_[lane_cols, np.full(n_rows, n_cols)]
+        lane_costs = np.r_[lane_costs, np.zeros(n_rows)]
+    elif demand.sum() > supply.sum():
+        supply = np.append(supply, demand.sum() - supply.sum())
+        lane_rows = np.r_[lane_rows, np.full(n_cols, n_rows)]
+        lane_cols = np.r_[lane_cols, np.arange(n_cols)]
+        lane_costs = np.r_[lane_costs, np.zeros(n_cols)]
+
+    supply_temp = supply.copy()
+    demand_temp = demand.copy()
+    row_open = np.ones(len(supply), dtype=bool)
+    col_open = np.ones(len(demand), dtype=bool)
+    rows = _LinePenalties(*_sparse_lines(lane_rows, lane_cols, lane_costs, len(supply)), supply_temp, row_open, col_open)
+    cols = _LinePenalties(*_sparse_lines(lane_cols, lane_rows, lane_costs, len(demand)), demand_temp, col_open, row_open)
+
+    steps = [
+        (r, c, qty) for r, c, qty in _vogel_steps(rows, cols, supply_temp, demand_temp, stats)
+        if r < n_rows and c < n_cols and qty > 0
+    ]
+    alloc_rows = np.array([r for r, _, _ in steps], dtype=np.int64)
+    alloc_cols = np.array([c for _, c, _ in steps], dtype=np.int64)
+    alloc_qty = np.array([qty for _, _, qty in steps], dtype=float)
+
+    # Cost of each allocated lane (the cheapest one if a lane is listed twice,
+    # INF for a forbidden lane used because nothing else was left).
+    keys = lane_rows * len(demand) + lane_cols
+    order = np.lexsort((lane_costs, keys))
+    keys, lane_costs = keys[order], lane_costs[order]
+    alloc_keys = alloc_rows * len(demand) + alloc_cols
+    pos = np.searchsorted(keys, alloc_keys)
+    found = pos < len(keys)
+    found[found] = keys[pos[found]] == alloc_keys[found]
+    alloc_costs = np.full(len(alloc_keys), float(INF))
+    alloc_costs[found] = lane_costs[pos[found]]
+    total_cost = np.sum(alloc_qty * alloc_costs)
+    return (alloc_rows, alloc_cols, alloc_qty), total_cost
+
+class _LaneCosts:
+    # Cost of the lane at each position of a lean line structure, read from the
+    # caller's matrix rather than stored sorted. Lanes to the virtual dummy line
+    # (index >= the real count on either side) cost 0.
+    def __init__(self, costs, order, transposed):
+        self.costs = costs
+        self.order = order
+        self.width = order.shape[1]
+        self.transposed = transposed
+        self.n_lines, self.n_other = costs.shape[::-1] if transposed else costs.shape
+
+    def __getitem__(self, pos):
+        line, k = np.divmod(pos, self.width)
+        other = self.order[line, k]
+        if np.ndim(pos) == 0:
+            if line >= self.n_lines or other >= self.n_other:
+                return 0
+            return self.costs[other, line] if self.transposed else self.costs[line, other]
+        real = (line < self.n_lines) & (other < self.n_other)
+        values = np.zeros(len(line), dtype=self.costs.dtype)
+        line, other = line[real], other[real].astype(np.intp)
+        values[real] = self.costs[other, line] if self.transposed else self.costs[line, other]
+        return values
+
+def _lean_lines(costs, dummy_line, dummy_other, transposed=False, pool=None):
+    # Same segments as _dense_lines, but only the per-line sort order is stored,
+    # as uint16 when it fits, and it is built a chunk of lines at a time.
+    n_lines, width = costs.shape[::-1] if transposed else costs.shape
+    total_lines = n_lines + dummy_line
+    total_width = width + dummy_other
+    order = np.empty((total_lines, total_width), dtype=np.uint16 if total_width <= 2**16 else np.int32)
+    counts = np.full(total_lines, total_width, dtype=np.int64)
+
+    def sort(lo, hi):
+        values = costs[:, lo:hi].T if transposed else costs[lo:hi]
+        if dummy_other:
+            values = np.c_[values, np.zeros(hi - lo, dtype=values.dtype)]
+        order[lo:hi] = np.argsort(values, axis=1, kind="stable")
+        counts[lo:hi] = (values < INF).sum(axis=1)
+
+    (pool or _LinePool()).each(sort, n_lines)
+    if dummy_line:
+        order[n_lines] = np.arange(total_width)
+    start = np.arange(total_lines, dtype=np.int64) * total_width
+    return start, start + counts, order.ravel(), _LaneCosts(costs, order, transposed)
+
+def lean_vogel_approximation_method(cost_matrix, supply, demand, dtype=None, stats=None, workers=None):
+    # Memory-lean VAM: the cost matrix is used as given (float32 and integer dtypes
+    # included, or cast once to `dtype`), the dummy line is virtual, closed lines are
+    # masks, and the result is the list of allocated cells ((rows, cols, qty), total
+    # cost) as in sparse_vogel_approximation_method. The extra memory is about one
+    # uint16 (int32 past 65,536 lines) sort order per direction, sorted on `workers` threads.
+    costs = np.asarray(cost_matrix)
+    if dtype is not None:
+        costs = costs.astype(dtype, copy=False)
+    elif not (np.issubdtype(costs.dtype, np.floating) or np.issubdtype(costs.dtype, np.integer)):
+        costs = costs.astype(float)
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    n_rows, n_cols = costs.shape
+
+    dummy_row = dummy_col = 0
+    if supply.sum() > demand.sum():
+        demand = np.append(demand, supply.sum() - demand.sum())
+        dummy_col = 1
+    elif demand.sum() > supply.sum():
+        supply = np.append(supply, demand.sum() - supply.sum())
+        dummy_row = 1
+
+    supply_temp = supply.copy()
+    demand_temp = demand.copy()
+    row_open = np.ones(len(supply), dtype=bool)
+    col_open = np.ones(len(demand), dtype=bool)
+    with _LinePool(workers) as pool:
+        rows = _LinePenalties(*_lean_lines(costs, dummy_row, dummy_col, pool=pool), supply_temp, row_open, col_open)
+        cols = _LinePenalties(
+            *_lean_lines(costs, dummy_col, dummy_row, transposed=True, pool=pool), demand_temp, col_open, row_open
+        )
+
+    steps = [
+        (r, c, qty) for r, c, qty in _vogel_steps(rows, cols, supply_temp, demand_temp, stats)
+        if r < n_rows and c < n_cols and qty > 0
+    ]
+    alloc_rows = np.array([r for r, _, _ in steps], dtype=np.int64)
+    alloc_cols = np.array([c for _, c, _ in steps], dtype=np.int64)
+    alloc_qty = np.array([qty for _, _, qty in steps], dtype=float)
+    total_cost = np.sum(alloc_qty * costs[alloc_rows, alloc_cols].astype(float))
+    return (alloc_rows, alloc_cols, alloc_qty), total_cost
+
+# Out-of-core VAM keeps the OUT_OF_CORE_LANES cheapest lanes of each line; a cost
+# block costs about BLOCK_BYTES_PER_CELL bytes per cell in selection temporaries
+# on top of the cells themselves.
+OUT_OF_CORE_LANES = 16
+BLOCK_BYTES_PER_CELL = 32
+
+def _smallest(values, k):
+    # (positions, values) of the k smallest entries of each row, ordered by value
+    # with the leftmost first among equals; short rows are padded with inf.
+    n, width = values.shape
+    if width < k:
+        values = np.c_[values, np.full((n, k - width), np.inf)]
+    elif width > k:
+        kth = np.partition(values, k - 1, axis=1)[:, k - 1:k]
+        less = values < kth
+        equal = values == kth
+        equal &= np.cumsum(equal, axis=1, dtype=np.int32) <= k - less.sum(axis=1, keepdims=True)
+        _, pos = np.nonzero(less | equal)
+        pos = pos.reshape(n, k)
+        order = np.argsort(np.take_along_axis(values, pos, axis=1), axis=1, kind="stable")
+        pos = np.take_along_axis(pos, order, axis=1)
+        return pos, np.take_along_axis(values, pos, axis=1)
+    pos = np.argsort(values, axis=1, kind="stable")
+    return pos, np.take_along_axis(values, pos, axis=1)
+
+def _smallest_lines(values, k, pool):
+    # _smallest over chunks of rows on the pool.
+    pos = np.empty((len(values), k), dtype=np.intp)
+    cost = np.empty((len(values), k))
+
+    def select(lo, hi):
+        pos[lo:hi], cost[lo:hi] = _smallest(values[lo:hi], k)
+
+    pool.each(select, len(values))
+    return pos, cost
+
+class _CachedLines:
+    # The k cheapest lanes of each line as of its last scan, by cost then index.
+    # The two cheapest live lanes come from the cache; a line whose cache is down
+    # to fewer than two live lanes, with lanes left outside it, needs a rescan.
+    def __init__(self, n_lines, k, amount, line_open, other_open):
+        self.idx = np.full((n_lines, k), -1, dtype=np.int64)
+        self.cost = np.full((n_lines, k), np.inf)
+        self.complete = np.zeros(n_lines, dtype=bool)
+        self.first = np.full(n_lines, -1, dtype=np.int64)
+        self.second = np.full(n_lines, -1, dtype=np.int64)
+        self.penalty = np.full(n_lines, -1.0)
+        self.amount = amount
+        self.open = line_open
+        self.other_open = other_open
+
+    def store(self, lines, idx, cost):
+        idx = np.where(np.isfinite(cost), idx, -1)
+        self.idx[lines] = idx
+        self.cost[lines] = cost
+        self.complete[lines] = idx[:, -1] < 0
+
+    def update(self, lines):
+        # Recomputes the penalties of `lines`; returns the open ones to rescan.
+        idx, cost = self.idx[lines], self.cost[lines]
+        live = (idx >= 0) & self.other_open[np.maximum(idx, 0)]
+        rank = np.cumsum(live, axis=1, dtype=np.int32)
+        has_first, has_second = rank[:, -1] >= 1, rank[:, -1] >= 2
+        at = np.arange(len(lines))
+        first_pos, second_pos = np.argmax(rank >= 1, axis=1), np.argmax(rank >= 2, axis=1)
+        first_cost, second_cost = cost[at, first_pos], cost[at, second_pos]
+        self.first[lines] = np.where(has_first, idx[at, first_pos], -1)
+        self.second[lines] = np.where(has_second, idx[at, second_pos], -1)
+        gap = np.subtract(second_cost, first_cost, out=np.zeros(len(lines)), where=has_second)
+        penalty = np.where(has_second, gap, np.where(has_first, first_cost, -1.0))
+        penalty[(self.amount[lines] == 0) | ~self.open[lines]] = -1.0
+        self.penalty[lines] = penalty
+        return lines[~has_second & ~self.complete[lines] & self.open[lines]]
+
+    def close(self, i):
+        self.open[i] = False
+        self.penalty[i] = -1.0
+
+    def using(self, j):
+        return np.flatnonzero(self.open & ((self.first == j) | (self.second == j)))
+
+    def cheapest(self, i):
+        return self.first[i] if self.open[i] else -1
+
+def _with_dummy(idx, cost, dummy):
+    # Adds the zero-cost lane to the dummy line, which has the highest index.
+    pos, cost = _smallest(np.c_[cost, np.zeros(len(cost))], idx.shape[1])
+    return np.take_along_axis(np.c_[idx, np.full(len(idx), dummy)], pos, axis=1), cost
+
+def blocked_vogel_approximation_method(cost_matrix, supply, demand, memory_mb=256, cache_lanes=OUT_OF_CORE_LANES,
+                                       stats=None, workers=None):
+    # VAM on a cost matrix too large for memory: an .npy path (memory-mapped
+    # read-only) or any array-like indexable by rows, np.memmap included. Costs are
+    # read a block of rows at a time, with blocks sized so a block and its
+    # temporaries fit in about `memory_mb`, and are never written to. One pass
+    # collects the `cache_lanes` cheapest lanes of every row and column; rows are
+    # then rescanned one at a time as their cache runs out, and columns all
+    # together, in a pass skipping blocks whose rows are all closed. The allocation
+    # is the same as vogel_approximation_method's, returned as the lean solver's
+    # ((rows, cols, qty), total cost). The caches take about 16 bytes × cache_lanes
+    # per supplier and customer on top of the budget. `workers` threads share the
+    # selections in each block.
+    costs = np.load(cost_matrix, mmap_mode="r") if isinstance(cost_matrix, (str, os.PathLike)) else cost_matrix
+    n_rows, n_cols = costs.shape
+    # A penalty needs the two cheapest live lanes, so a cache holds at least two.
+    k = max(2, cache_lanes)
+    supply_temp, demand_temp = _balance_vectors(supply, demand)
+    row_open = np.ones(len(supply_temp), dtype=bool)
+    col_open = np.ones(len(demand_temp), dtype=bool)
+    rows = _CachedLines(len(supply_temp), k, supply_temp, row_open, col_open)
+    cols = _CachedLines(len(demand_temp), k, demand_temp, col_open, row_open)
+    block = max(1, int(memory_mb * 2**20) // (n_cols * (BLOCK_BYTES_PER_CELL + costs.dtype.itemsize)))
+    counts = {"blocks_read": 0, "column_scans": 0, "row_rescans": 0}
+    pool = _LinePool(workers)
+
+    def read(lines):
+        counts["blocks_read"] += 1
+        values = np.array(costs[lines], dtype=float)
+        values[values >= INF] = np.inf
+        return values
+
+    def scan_rows(lines, values):
+        values[:, ~col_open[:n_cols]] = np.inf
+        idx, cost = _smallest_lines(values, k, pool)
+        if len(demand_temp) > n_cols and col_open[n_cols]:
+            idx, cost = _with_dummy(idx, cost, n_cols)
+        rows.store(lines, idx, cost)
+
+    def scan_columns(with_rows=False):
+        counts["column_scans"] += 1
+        idx = np.full((n_cols, k), -1, dtype=np.int64)
+        cost = np.full((n_cols, k), np.inf)
+        for lo in range(0, n_rows, block):
+            hi = min(lo + block, n_rows)
+            if not row_open[lo:hi].any():
+                continue
+            values = read(slice(lo, hi))
+            if with_rows:
+                scan_rows(np.arange(lo, hi), values.copy())
+            values[~row_open[lo:hi]] = np.inf
+            pos, cost = _smallest_lines(np.concatenate([cost, values.T], axis=1), k, pool)
+            idx = np.where(pos < k, np.take_along_axis(idx, np.minimum(pos, k - 1), axis=1), lo + pos - k)
+        if len(supply_temp) > n_rows and row_open[n_rows]:
+            idx, cost = _with_dummy(idx, cost, n_rows)
+        cols.store(np.arange(n_cols), idx, cost)
+
+    def scan_dummy(lines, dummy, other_open):
+        # Every lane of a dummy line costs 0: its cheapest are the first open ones.
+        idx = np.flatnonzero(other_open)[:k]
+        pad = k - len(idx)
+        lines.store([dummy], np.r_[idx, np.full(pad, -1)][None, :], np.r_[np.zeros(len(idx)), np.full(pad, np.inf)][None, :])
+
+    def refresh(lines, which):
+        stale = lines.update(which)
+        if not len(stale):
+            return
+        if lines is rows:
+            real = stale[stale < n_rows]
+            if len(real):
+                counts["row_rescans"] += len(real)
+                scan_rows(real, read(real))
+            if len(real) < len(stale):
+                scan_dummy(rows, n_rows, col_open)
+        else:
+            if (stale < n_cols).any():
+                scan_columns()
+                stale = np.flatnonzero(col_open[:n_cols])
+            if len(demand_temp) > n_cols and col_open[n_cols]:
+                scan_dummy(cols, n_cols, row_open)
+                stale = np.r_[stale, n_cols]
+        lines.update(stale)
+
+    with pool:
+        scan_columns(with_rows=True)
+        if len(supply_temp) > n_rows:
+            scan_dummy(rows, n_rows, col_open)
+        if len(demand_temp) > n_cols:
+            scan_dummy(cols, n_cols, row_open)
+        rows.update(np.arange(len(supply_temp)))
+        cols.update(np.arange(len(demand_temp)))
+
+        supply_left = np.count_nonzero(supply_temp > 0)
+        demand_left = np.count_nonzero(demand_temp > 0)
+        steps = ties = fallbacks = 0
+        lanes = []
+        while supply_left and demand_left:
+            row_idx, col_idx = int(np.argmax(rows.penalty)), int(np.argmax(cols.penalty))
+            max_row_p, max_col_p = rows.penalty[row_idx], cols.penalty[col_idx]
+            steps += 1
+            ties += max_row_p == max_col_p
+            if max_row_p >= max_col_p:
+                col_idx = rows.cheapest(row_idx)
+            else:
+                row_idx = cols.cheapest(col_idx)
+            if row_idx < 0 or col_idx < 0:
+                row_idx = int(np.argmax(supply_temp > 0))
+                col_idx = int(np.argmax(demand_temp > 0))
+                fallbacks += 1
+
+            qty = min(supply_temp[row_idx], demand_temp[col_idx])
+            if row_idx < n_rows and col_idx < n_cols and qty > 0:
+                lanes.append((row_idx, col_idx, qty))
+            supply_temp[row_idx] -= qty
+            demand_temp[col_idx] -= qty
+            if supply_temp[row_idx] == 0:
+                supply_left -= 1 if qty > 0 else 0
+                rows.close(row_idx)
+                refresh(cols, cols.using(row_idx))
+            if demand_temp[col_idx] == 0:
+                demand_left -= 1 if qty > 0 else 0
+                cols.close(col_idx)
+                refresh(rows, rows.using(col_idx))
+
+    if stats is not None:
+        stats.update(vam_steps=steps, vam_ties=int(ties), vam_fallbacks=fallbacks, block_rows=block, **counts)
+    alloc_rows = np.array([r for r, _, _ in lanes], dtype=np.int64)
+    alloc_cols = np.array([c for _, c, _ in lanes], dtype=np.int64)
+    alloc_qty = np.array([qty for _, _, qty in lanes], dtype=float)
+    order = np.argsort(alloc_rows, kind="stable")
+    lane_costs = np.array(costs[alloc_rows[order], alloc_cols[order]], dtype=float)
+    total_cost = np.sum(alloc_qty[order] * lane_costs)
+    return (alloc_rows, alloc_cols, alloc_qty), total_cost
+
+# Above BATCH_CELLS cells per scenario, batch_vogel_approximation_method solves
+# the scenarios one at a time instead of in lockstep.
+BATCH_CELLS = 2_500
+
+def _batch_penalties(costs_temp, amount, axis):
+    # Vogel penalty of every line in every scenario: gap between the two cheapest
+    # allowed cells, the single allowed cost, or -1 (closed or no allowed cell).
+    if costs_temp.shape[axis] >= 2:
+        two = np.partition(costs_temp, 1, axis=axis)
+        first = two.take(0, axis=axis)
+        second = two.take(1, axis=axis)
+    else:
+        first = costs_temp.min(axis=axis)
+        second = np.full_like(first, float(INF))
+    penalties = np.where(second < INF, second - first, first)
+    penalties[(first >= INF) | (amount == 0)] = -1
+    return penalties
+
+def batch_vogel_approximation_method(cost_tensor, supplies, demands, stats=None, time_budget=None):
+    # VAM on k scenarios of the same shape at once: (k, m, n) costs, (k, m) supplies
+    # and (k, n) demands. Every step picks a cell in each unfinished scenario with
+    # array operations over the whole batch, using the same penalties and ties as
+    # vogel_approximation_method. Returns the (k, m, n) allocations and k costs.
+    # Past `time_budget` seconds for the whole batch, the unfinished scenarios are
+    # completed in north-west corner order; stats["vam_truncated"] flags them.
+    costs = np.array(cost_tensor, dtype=float)
+    supplies = np.array(supplies, dtype=float)
+    demands = np.array(demands, dtype=float)
+    k, n_rows, n_cols = costs.shape
+    if supplies.shape != (k, n_rows) or demands.shape != (k, n_cols):
+        raise ValueError(f"Expected supplies of shape {(k, n_rows)} and demands of shape {(k, n_cols)}.")
+    anytime = None if time_budget is None else _Anytime(time_budget)
+    truncated = np.zeros(k, dtype=bool)
+    if stats is not None:
+        stats["vam_truncated"] = truncated
+
+    if n_rows * n_cols > BATCH_CELLS:
+        # Large matrices: the incremental single solver beats recomputing every
+        # penalty of every scenario at each step.
+        allocation = np.zeros_like(costs)
+        totals = np.zeros(k)
+        for s in range(k):
+            remaining = None if anytime is None else max(anytime.deadline - time.perf_counter(), 0.0)
+            solve_stats = {}
+            allocation[s], totals[s] = vogel_approximation_method(
+                costs[s], supplies[s], demands[s], stats=solve_stats, time_budget=remaining
+            )
+            truncated[s] = solve_stats.get("vam_truncated", False)
+        return allocation, totals
+
+    # Every scenario gets a dummy row and a dummy column. The one its balance does
+    # not need stays closed (zero amount, INF costs), which leaves VAM unchanged.
+    gap = supplies.sum(axis=1) - demands.sum(axis=1)
+    supply_temp = np.c_[supplies, np.maximum(-gap, 0)]
+    demand_temp = np.c_[demands, np.maximum(gap, 0)]
+    costs_temp = np.zeros((k, n_rows + 1, n_cols + 1))
+    costs_temp[:, :n_rows, :n_cols] = costs
+    costs_temp[gap <= 0, :, n_cols] = INF
+    costs_temp[gap >= 0, n_rows, :] = INF
+
+    # Working arrays hold only the unfinished scenarios and shrink as they finish.
+    result = np.zeros_like(costs_temp)
+    ids = np.arange(k)
+    alloc_temp = np.zeros_like(costs_temp)
+    while True:
+        done = (supply_temp.sum(axis=1) <= 0) | (demand_temp.sum(axis=1) <= 0)
+        if done.any():
+            result[ids[done]] = alloc_temp[done]
+            keep = ~done
+            ids, costs_temp, alloc_temp = ids[keep], costs_temp[keep], alloc_temp[keep]
+            supply_temp, demand_temp = supply_temp[keep], demand_temp[keep]
+        if len(ids) == 0:
+            break
+        if anytime is not None and anytime.check("vam", dict):
+            for s in range(len(ids)):
+                _north_west_fill(alloc_temp[s], supply_temp[s], demand_temp[s])
+            result[ids] = alloc_temp
+            truncated[ids] = True
+            break
+
+        row_p = _batch_penalties(costs_temp, supply_temp, axis=2)
+        col_p = _batch_penalties(costs_temp, demand_temp, axis=1)
+        by_row = row_p.max(axis=1) >= col_p.max(axis=1)
+        row_idx = np.where(by_row, row_p.argmax(axis=1), 0)
+        col_idx = np.where(by_row, 0, col_p.argmax(axis=1))
+        span = np.arange(len(ids))
+        row_cells = costs_temp[span, row_idx, :]
+        col_cells = costs_temp[span, :, col_idx]
+        col_idx = np.where(by_row, row_cells.argmin(axis=1), col_idx)
+        row_idx = np.where(by_row, row_idx, col_cells.argmin(axis=1))
+        # Same fallback as the single solver when no allowed lane is left.
+        stuck = np.where(by_row, row_cells.min(axis=1), col_cells.min(axis=1)) >= INF
+        row_idx[stuck] = (supply_temp[stuck] > 0).argmax(axis=1)
+        col_idx[stuck] = (demand_temp[stuck] > 0).argmax(axis=1)
+
+        qty = np.minimum(supply_temp[span, row_idx], demand_temp[span, col_idx])
+        alloc_temp[span, row_idx, col_idx] = qty
+        supply_temp[span, row_idx] -= qty
+        demand_temp[span, col_idx] -= qty
+        row_done = supply_temp[span, row_idx] == 0
+        col_done = demand_temp[span, col_idx] == 0
+        costs_temp[span[row_done], row_idx[row_done], :] = INF
+        costs_temp[span[col_done], :, col_idx[col_done]] = INF
+
+    allocation = result[:, :n_rows, :n_cols]
+    return allocation, np.einsum("kij,kij->k", allocation, costs)
+
+def _lower_bound(costs, supply, demand, u, v):
+    # Lagrangian bound from potentials u, v. Pricing only the customer side at v,
+    # each supplier ships at its cheapest c - v, so no plan costs less than
+    # v.d + sum(s * min_j(c - v)); likewise from the supplier side. With optimal
+    # potentials both equal the optimal cost, with zeros it is the cheapest-lane bound.
+    n_rows, n_cols = costs.shape
+    row_min = np.empty(n_rows)
+    col_min = np.full(n_cols, np.inf)
+    block = max(1, min(n_rows, 65536 // n_cols))
+    for lo in range(0, n_rows, block):
+        rows = costs[lo:lo + block]
+        row_min[lo:lo + block] = (rows - v[None, :]).min(axis=1)
+        np.minimum(col_min, (rows - u[lo:lo + block, None]).min(axis=0), out=col_min)
+    return float(max(v @ demand + supply @ row_min, u @ supply + demand @ col_min))
+
+def _spanning_basis(allocation, costs):
+    # Allocated cells plus zero-flow (epsilon) cells that join the forest
+    # into a spanning tree of the m + n row/column nodes.
+    n_rows, n_cols = costs.shape
+    group = list(range(n_rows + n_cols))
+
+    def find(node):
+        while group[node] != node:
+            group[node] = group[group[node]]
+            node = group[node]
+        return node
+
+    # Largest flows first: when the plan has cycles (rounding dust on a dummy
+    # line, say), the cells left out are the smallest.
+    cells = []
+    rows, cols = np.nonzero(allocation > 0)
+    order = np.argsort(-allocation[rows, cols], kind="stable")
+    for r, c in zip(rows[order], cols[order]):
+        a, b = find(r), find(n_rows + c)
+        if a != b:
+            group[a] = b
+            cells.append((r, c))
+
+    # Each other tree joins the main one on the cheapest cell between them, so a
+    # forbidden cell only becomes basic when no allowed one connects them.
+    roots = np.array([find(node) for node in range(n_rows + n_cols)])
+    main = roots[0]
+    for root in np.unique(roots):
+        members = np.flatnonzero(roots == root)
+        member_rows, member_cols = members[members < n_rows], members[members >= n_rows] - n_rows
+        if root == main or len(member_cols) == 0:
+            continue
+        main_rows = np.flatnonzero(roots[:n_rows] == main)
+        main_cols = np.flatnonzero(roots[n_rows:] == main)
+        r = main_rows[np.argmin(costs[np.ix_(main_rows, member_cols)].min(axis=1))]
+        c = member_cols[np.argmin(costs[r, member_cols])]
+        if len(member_rows) and len(main_cols):
+            r2 = member_rows[np.argmin(costs[np.ix_(member_rows, main_cols)].min(axis=1))]
+            c2 = main_cols[np.argmin(costs[r2, main_cols])]
+            if costs[r2, c2] < costs[r, c]:
+                r, c = r2, c2
+        cells.append((r, c))
+        roots[members] = main
+    # Only isolated rows are left, and every column is now in the main tree.
+    for r in np.flatnonzero(roots[:n_rows] != main):
+        cells.append((r, np.argmin(costs[r])))
+    return cells
+
+class _BasisTree:
+    # Basis tree over nodes 0..m-1 (rows) and m..m+n-1 (columns), rooted at row 0,
+    # with potentials pi so that c[r, c] = pi[r] + pi[m + c] on every basic cell.
+    # Forbidden (INF) cells never enter. One left basic from the initial plan is
+    # priced at 0 rather than INF, keeping the potentials at the scale of the real
+    # costs, and once the flows are feasible it may not take on any flow.
+    def __init__(self, cells, costs):
+        n_rows, n_cols = costs.shape
+        n_nodes = n_rows + n_cols
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.basic = np.zeros((n_rows, n_cols), dtype=bool)
+        neighbours = [[] for _ in range(n_nodes)]
+        for r, c in cells:
+            self.basic[r, c] = True
+            neighbours[r].append(n_rows + c)
+            neighbours[n_rows + c].append(r)
+        self.parent = np.full(n_nodes, -1)
+        self.depth = np.zeros(n_nodes, dtype=int)
+        self.children = [set() for _ in range(n_nodes)]
+        stack = [0]
+        seen = np.zeros(n_nodes, dtype=bool)
+        seen[0] = True
+        while stack:
+            node = stack.pop()
+            for other in neighbours[node]:
+                if not seen[other]:
+                    seen[other] = True
+                    self.parent[other] = node
+                    self.depth[other] = self.depth[node] + 1
+                    self.children[node].add(other)
+                    stack.append(other)
+        self.spanning = bool(seen.all())
+        self.priced_blocks = 0
+        self.degenerate_pivots = 0
+        if self.spanning:
+            self.set_costs(costs)
+
+    def cell(self, child):
+        if child < self.n_rows:
+            return child, self.parent[child] - self.n_rows
+        return self.parent[child], child - self.n_rows
+
+    def order(self):
+        order = [0]
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            order.extend(self.children[node])
+            stack.extend(self.children[node])
+        return order
+
+    def set_costs(self, costs, forbidden=None):
+        # `forbidden` defaults to the INF cells of `costs`; the feasibility phase
+        # passes its own 0/1 costs with the real forbidden cells.
+        self.costs = costs
+        self.forbidden = costs >= INF if forbidden is None else forbidden
+        # Cells pricing skips: basic ones (reduced cost 0 by construction) and forbidden ones.
+        self.skip = self.basic | self.forbidden
+        finite = costs[costs < INF]
+        self.pi = np.zeros(self.n_rows + self.n_cols)
+        for node in self.order()[1:]:
+            cost = costs[self.cell(node)]
+            self.pi[node] = (cost if cost < INF else 0.0) - self.pi[self.parent[node]]
+        # Reduced costs are differences of potentials: rounding grows with them.
+        scale = max(np.abs(finite).max() if finite.size else 1.0, np.abs(self.pi).max())
+        self.tol = 1e-9 * max(1.0, scale)
+
+    def flows(self, supply, demand):
+        # Flows the tree must carry for this supply and demand, pushed up from the
+        # leaves. Some may be negative when the basis no longer fits the totals.
+        flows = np.zeros((self.n_rows, self.n_cols))
+        residual = np.r_[supply, demand]
+        for node in reversed(self.order()[1:]):
+            flows[self.cell(node)] = residual[node]
+            residual[self.parent[node]] -= residual[node]
+        return flows
+
+    def cells(self):
+        return np.array([self.cell(node) for node in range(1, len(self.parent))], dtype=np.int64).reshape(-1, 2)
+
+    def _cycle(self, i, j):
+        # Tree path from row i to column j; with (i, j) it closes the cycle.
+        a, b = i, self.n_rows + j
+        up_a, up_b = [], []
+        while a != b:
+            if self.depth[a] >= self.depth[b]:
+                up_a.append(a)
+                a = self.parent[a]
+            else:
+                up_b.append(b)
+                b = self.parent[b]
+        return up_a + up_b[::-1], len(up_a)
+
+    def _pivot(self, flows, i, j, delta, path, n_up, leaving, theta):
+        for k, child in enumerate(path):
+            flows[self.cell(child)] += theta if k % 2 else -theta
+        flows[i, j] += theta
+        leaving_node = path[leaving]
+        flows[self.cell(leaving_node)] = 0.0
+        leaving_cell = self.cell(leaving_node)
+        self.basic[i, j] = self.skip[i, j] = True
+        self.basic[leaving_cell] = False
+        self.skip[leaving_cell] = self.forbidden[leaving_cell]
+
+        # Re-hang the subtree cut off by the leaving cell from the entering cell.
+        if leaving < n_up:
+            inner, outer = i, self.n_rows + j
+        else:
+            inner, outer = self.n_rows + j, i
+        prev, node = outer, inner
+        while True:
+            old_parent = self.parent[node]
+            self.children[old_parent].discard(node)
+            self.parent[node] = prev
+            self.children[prev].add(node)
+            if node == leaving_node:
+                break
+            prev, node = node, old_parent
+
+        stack = [inner]
+        while stack:
+            node = stack.pop()
+            self.depth[node] = self.depth[self.parent[node]] + 1
+            self.pi[node] += delta if (node < self.n_rows) == (inner < self.n_rows) else -delta
+            stack.extend(self.children[node])
+
+    def absorb(self, flows):
+        # Moves the flow of non-basic cells onto the tree around their cycles, so
+        # the flows fit the basis. A cell whose cycle runs dry first enters the
+        # basis in place of the emptied cell instead.
+        for i, j in np.argwhere((flows > 0) & ~self.basic):
+            path, n_up = self._cycle(i, j)
+            theta, leaving = flows[i, j], None
+            for k in range(1, len(path), 2):
+                qty = flows[self.cell(path[k])]
+                if qty < theta:
+                    theta, leaving = qty, k
+            if leaving is None:
+                for k, node in enumerate(path):
+                    flows[self.cell(node)] += theta if k % 2 == 0 else -theta
+                flows[i, j] = 0.0
+            else:
+                cost = self.costs[i, j] if self.costs[i, j] < INF else 0.0
+                delta = cost - self.pi[i] - self.pi[self.n_rows + j]
+                self._pivot(flows, i, j, delta, path, n_up, leaving, -theta)
+
+    def primal(self, flows, stop=None):
+        # MODI pivots from a feasible basis until no reduced cost is negative.
+        # `stop`, when given, is called with the pivot count before each pivot; True
+        # ends the run early, leaving feasible but not necessarily optimal flows.
+        # After more degenerate pivots in a row than there are nodes, Bland's rule
+        # (first improving cell, lowest leaving cell) takes over until flow moves
+        # again, so degenerate pivots cannot cycle.
+        n_rows, n_cols = self.n_rows, self.n_cols
+        block = max(1, min(n_rows, 65536 // n_cols))
+        start = 0
+        pivots = 0
+        degenerate_run = 0
+        while True:
+            if stop is not None and stop(pivots):
+                return pivots
+            bland = degenerate_run > n_rows + n_cols
+            entering = None
+            for offset in range(0, n_rows, block):
+                self.priced_blocks += 1
+                lo = offset if bland else (start + offset) % n_rows
+                hi = min(lo + block, n_rows)
+                reduced = self.costs[lo:hi] - self.pi[lo:hi, None] - self.pi[None, n_rows:]
+                reduced[self.skip[lo:hi]] = 0.0
+                if bland:
+                    k = np.argmax(reduced < -self.tol)
+                else:
+                    k = np.argmin(reduced)
+                if reduced.flat[k] < -self.tol:
+                    entering = (lo + k // n_cols, k % n_cols, reduced.flat[k])
+                    start = hi % n_rows
+                    break
+            if entering is None:
+                return pivots
+            i, j, delta = entering
+            path, n_up = self._cycle(i, j)
+            theta, leaving, leaving_cell = None, None, None
+            for k, node in enumerate(path):
+                cell = self.cell(node)
+                if k % 2 == 0:
+                    qty = flows[cell]
+                elif self.costs[cell] >= INF:
+                    qty = 0.0
+                else:
+                    continue
+                if theta is None or qty < theta or (qty == theta and (not bland or cell < leaving_cell)):
+                    theta, leaving, leaving_cell = qty, k, cell
+            self._pivot(flows, i, j, delta, path, n_up, leaving, theta)
+            self.degenerate_pivots += theta == 0
+            degenerate_run = degenerate_run + 1 if theta == 0 else 0
+            pivots += 1
+
+    def dual(self, flows, scale):
+        # Dual simplex pivots from an optimal but infeasible basis: the most negative
+        # basic flow leaves, and the cheapest cell reconnecting the two halves the
+        # other way round enters. Returns None when the instance is infeasible
+        # or the pivots run on too long.
+        n_rows = self.n_rows
+        tol = 1e-9 * max(1.0, scale)
+        nodes = np.arange(1, len(self.parent))
+        for pivots in range(10 * len(nodes) + 1):
+            rows = np.where(nodes < n_rows, nodes, self.parent[1:])
+            cols = np.where(nodes < n_rows, self.parent[1:], nodes) - n_rows
+            basic = flows[rows, cols]
+            k = np.argmin(basic)
+            if basic[k] >= -tol:
+                flows[flows < 0] = 0.0
+                return pivots
+            leaving_node = nodes[k]
+
+            side = np.zeros(len(self.parent), dtype=bool)
+            stack = [leaving_node]
+            while stack:
+                node = stack.pop()
+                side[node] = True
+                stack.extend(self.children[node])
+            if leaving_node < n_rows:
+                enter_rows = np.flatnonzero(~side[:n_rows])
+                enter_cols = np.flatnonzero(side[n_rows:])
+            else:
+                enter_rows = np.flatnonzero(side[:n_rows])
+                enter_cols = np.flatnonzero(~side[n_rows:])
+            if len(enter_rows) == 0 or len(enter_cols) == 0:
+                return None
+            reduced = (
+                self.costs[np.ix_(enter_rows, enter_cols)]
+                - self.pi[enter_rows, None]
+                - self.pi[None, n_rows + enter_cols]
+            )
+            best = np.argmin(reduced)
+            if self.costs[enter_rows[best // len(enter_cols)], enter_cols[best % len(enter_cols)]] >= INF:
+                return None
+            i, j = enter_rows[best // len(enter_cols)], enter_cols[best % len(enter_cols)]
+            path, n_up = self._cycle(i, j)
+            self._pivot(flows, i, j, reduced.flat[best], path, n_up, path.index(leaving_node), -basic[k])
+        return None
+
+def _drive_off_forbidden(tree, flows, costs, supply):
+    # Flow the initial plan had to put on forbidden lanes (VAM ships there when no
+    # allowed lane is left) is driven off first, by MODI on costs of 1 per unit on
+    # those lanes and 0 elsewhere. What stays there means no plan avoids them.
+    # Leaves `tree` priced at `costs` and returns the pivot count.
+    forbidden = costs >= INF
+    eps = 1e-9 * max(1.0, supply.sum())
+    if flows[forbidden].sum() <= eps:
+        return 0
+    tree.set_costs(forbidden.astype(float), forbidden)
+    pivots = tree.primal(flows)
+    if flows[forbidden].sum() > eps:
+        raise ValueError("No feasible plan: some supply or demand can only be met over forbidden lanes.")
+    flows[forbidden] = 0.0
+    tree.set_costs(costs)
+    return pivots
+
+def repair_allocation(cost_matrix, supply, demand, allocation):
+    # A plan with no flow on forbidden lanes, for callers that stop at VAM: what the
+    # VAM fallback shipped there is moved onto allowed lanes by the feasibility
+    # pivots of transportation_simplex, without optimizing further. Returns
+    # (allocation, total_cost); ValueError when no plan avoids forbidden lanes.
+    original_rows, original_cols = np.shape(cost_matrix)
+    allocation = np.asarray(allocation, dtype=float)
+    if not np.any(allocation[np.asarray(cost_matrix) >= INF] > 0):
+        return allocation, np.sum(allocation * cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    flows = np.zeros(costs.shape)
+    flows[:original_rows, :original_cols] = allocation
+    flows[:original_rows, original_cols:] = (supply[:original_rows] - allocation.sum(axis=1))[:, None]
+    flows[original_rows:, :original_cols] = demand[:original_cols] - allocation.sum(axis=0)
+    np.maximum(flows, 0.0, out=flows)
+    tree = _BasisTree(_spanning_basis(flows, costs), costs)
+    tree.absorb(flows)
+    _drive_off_forbidden(tree, flows, costs, supply)
+    allocation = flows[:original_rows, :original_cols]
+    return allocation, np.sum(allocation * costs[:original_rows, :original_cols])
+
+def transportation_simplex(cost_matrix, supply, demand, allocation=None, basis=None, basis_costs=None, return_basis=False,
+                           stats=None, time_budget=None, progress=None):
+    # `basis` is the (m + n - 1, 2) array of basic cells returned by an earlier solve
+    # with return_basis=True, and `basis_costs` the cost matrix it was optimal for.
+    # When supply or demand changed since, dual pivots on those costs first restore
+    # feasible flows; MODI then resumes on the new costs. A basis that does not fit
+    # this instance falls back to `allocation` (or VAM) as usual.
+    # Anytime use: once `time_budget` seconds have passed, the best feasible plan
+    # so far is returned (stats["optimal"] is then False). `progress` receives
+    # dicts with stage ("vam", "modi", then "done"), elapsed, allocated (VAM), and
+    # pivots, objective and bound (the best lower bound so far) during MODI; a true
+    # return value stops the solve the same way.
+    original_rows, original_cols = np.shape(cost_matrix)
+    costs, supply, demand = _balance_problem(cost_matrix, supply, demand)
+    n_rows, n_cols = costs.shape
+    anytime = None
+    if time_budget is not None or progress is not None:
+        anytime = _Anytime(time_budget, progress)
+        anytime.bound = _lower_bound(costs, supply, demand, np.zeros(n_rows), np.zeros(n_cols))
+
+    tree = None
+    dual_pivots = 0
+    if basis is not None:
+        basis = np.asarray(basis)
+        fits = (
+            basis.shape == (n_rows + n_cols - 1, 2)
+            and np.all(basis >= 0)
+            and np.all(basis[:, 0] < n_rows)
+            and np.all(basis[:, 1] < n_cols)
+        )
+        if basis_costs is not None and np.shape(basis_costs) != (original_rows, original_cols):
+            fits = False
+        if fits:
+            old_costs = costs
+            if basis_costs is not None:
+                old_costs = np.zeros_like(costs)
+                old_costs[:original_rows, :original_cols] = basis_costs
+            tree = _BasisTree(basis, old_costs)
+        if tree is not None and tree.spanning:
+            flows = tree.flows(supply, demand)
+            if flows.min() < 0:
+                repaired = tree.dual(flows, supply.sum())
+                if repaired is None:
+                    tree = None
+                else:
+                    dual_pivots = repaired
+            if tree is not None and old_costs is not costs:
+                tree.set_costs(costs)
+        else:
+            tree = None
+
+    warm = tree is not None
+    if tree is None:
+        if allocation is None:
+            flows = _vogel_allocation(costs, supply, demand, anytime=anytime)
+        else:
+            flows = np.zeros((n_rows, n_cols))
+            flows[:original_rows, :original_cols] = allocation
+            if n_cols > original_cols:
+                flows[:, -1] = np.maximum(supply - flows.sum(axis=1), 0)
+            if n_rows > original_rows:
+                flows[-1, :] = np.maximum(demand - flows.sum(axis=0), 0)
+        tree = _BasisTree(_spanning_basis(flows, costs), costs)
+        tree.absorb(flows)
+
+    feasibility_pivots = _drive_off_forbidden(tree, flows, costs, supply)
+
+    stop = None
+    if anytime is not None:
+        def modi_state(pivots):
+            anytime.bound = max(anytime.bound, _lower_bound(costs, supply, demand, tree.pi[:n_rows], tree.pi[n_rows:]))
+            return {"allocated": 1.0, "pivots": pivots, "objective": float(np.sum(flows * costs)), "bound": anytime.bound}
+
+        def stop(pivots):
+            return anytime.check("modi", lambda: modi_state(pivots))
+
+    primal_pivots = tree.primal(flows, stop)
+    pivots = dual_pivots + feasibility_pivots + primal_pivots
+    total_cost = np.sum(flows[:original_rows, :original_cols] * costs[:original_rows, :original_cols])
+    optimal = anytime is None or not anytime.stopped
+    if anytime is not None:
+        bound = total_cost
+        if not optimal:
+            bound = max(anytime.bound, _lower_bound(costs, supply, demand, tree.pi[:n_rows], tree.pi[n_rows:]))
+        anytime.report({"allocated": 1.0, "pivots": pivots, "objective": float(total_cost), "bound": float(bound)})
+    if stats is not None:
+        stats.update(
+            modi_pivots=primal_pivots,
+            dual_pivots=dual_pivots,
+            feasibility_pivots=feasibility_pivots,
+            degenerate_pivots=int(tree.degenerate_pivots),
+            priced_blocks=tree.priced_blocks,
+            warm_start=warm,
+            optimal=optimal,
+        )
+        if not optimal:
+            stats["lower_bound"] = float(bound)
+    if return_basis:
+        return flows[:original_rows, :original_cols], total_cost, pivots, tree.cells()
+    return flows[:original_rows, :original_cols], total_cost, pivots
@@ -0,0 +1,201 @@
+import io
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .cache import instance_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_hash TEXT NOT NULL,
+    name TEXT,
+    created REAL NOT NULL,
+    suppliers INTEGER NOT NULL,
+    customers INTEGER NOT NULL,
+    vam_cost REAL,
+    total_cost REAL,
+    pivots INTEGER,
+    optimal INTEGER NOT NULL,
+    timings TEXT,
+    stats TEXT,
+    inputs BLOB NOT NULL,
+    plan BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_input_hash ON runs (input_hash, optimal);
+CREATE INDEX IF NOT EXISTS runs_name ON runs (name);
+"""
+LIST_COLUMNS = ["id", "name", "created", "suppliers", "customers", "vam_cost", "total_cost", "pivots", "optimal", "input_hash"]
+
+def _pack(**arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+def _unpack(blob):
+    with np.load(io.BytesIO(blob)) as data:
+        return {name: data[name] for name in data.files}
+
+def _json_default(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+class RunStore:
+    # Solved runs in a local SQLite file. Inputs are kept compressed, the plan as
+    # its non-zero lanes (with their unit costs) plus the final basis, so listing,
+    # lookups by input hash and lane diffs never rebuild a cost matrix. One
+    # connection shared across threads, serialised by a lock.
+    def __init__(self, path="vogel_runs.sqlite"):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def save(self, costs, supply, demand, allocation, vam_cost, total_cost, pivots=0, basis=None, optimal=True,
+             name=None, source_names=None, dest_names=None, stats=None, timings=None):
+        # Returns the new run id. `allocation` may be dense or (rows, cols, qty) lanes.
+        costs = np.asarray(costs, dtype=float)
+        n_rows, n_cols = costs.shape
+        if isinstance(allocation, tuple):
+            rows, cols, qty = (np.asarray(a) for a in allocation)
+        else:
+            allocation = np.asarray(allocation)[:n_rows, :n_cols]
+            rows, cols = np.nonzero(allocation)
+            qty = allocation[rows, cols]
+        if source_names is None:
+            source_names = [f"Supplier {i+1}" for i in range(n_rows)]
+        if dest_names is None:
+            dest_names = [f"Customer {j+1}" for j in range(n_cols)]
+        inputs = _pack(
+            costs=costs,
+            supply=np.asarray(supply, dtype=float),
+            demand=np.asarray(demand, dtype=float),
+            source_names=np.asarray(source_names, dtype=str),
+            dest_names=np.asarray(dest_names, dtype=str),
+        )
+        plan = _pack(
+            rows=rows.astype(np.int32),
+            cols=cols.astype(np.int32),
+            qty=qty.astype(float),
+            unit_cost=costs[rows, cols],
+            basis=np.zeros((0, 2), dtype=np.int32) if basis is None else np.asarray(basis, dtype=np.int32),
+        )
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (input_hash, name, created, suppliers, customers, vam_cost, total_cost, pivots,"
+                " optimal, timings, stats, inputs, plan) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    instance_key(costs, supply, demand), name, time.time(), n_rows, n_cols,
+                    float(vam_cost), float(total_cost), int(pivots), int(bool(optimal)),
+                    json.dumps(timings or {}, default=_json_default), json.dumps(stats or {}, default=_json_default),
+                    inputs, plan,
+                ),
+            )
+            return cursor.lastrowid
+
+    def find(self, costs, supply, demand):
+        # Latest optimal run for exactly these inputs, or None.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM runs WHERE input_hash = ? AND optimal = 1 ORDER BY id DESC LIMIT 1",
+                (instance_key(costs, supply, demand),),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def runs(self, name=None, limit=200):
+        # Newest first, without the blobs. `name` filters with SQL LIKE.
+        query = f"SELECT {', '.join(LIST_COLUMNS)} FROM runs"
+        params = ()
+        if name:
+            query += " WHERE name LIKE ?"
+            params = (name,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id DESC LIMIT ?", params + (limit,)).fetchall()
+        runs = pd.DataFrame(rows, columns=LIST_COLUMNS)
+        runs["created"] = pd.to_datetime(runs["created"], unit="s")
+        runs["optimal"] = runs["optimal"].astype(bool)
+        return runs
+
+    def _fetch(self, run_id, columns):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(columns)} FROM runs WHERE id = ?", (int(run_id),)).fetchone()
+        if row is None:
+            raise KeyError(f"No run {run_id}")
+        return dict(zip(columns, row))
+
+    def load(self, run_id):
+        # Everything saved for a run, with the allocation rebuilt as a dense matrix.
+        run = self._fetch(run_id, LIST_COLUMNS + ["timings", "stats", "inputs", "plan"])
+        inputs, plan = _unpack(run.pop("inputs")), _unpack(run.pop("plan"))
+        allocation = np.zeros((run["suppliers"], run["customers"]))
+        allocation[plan["rows"], plan["cols"]] = plan["qty"]
+        run.update(
+            costs=inputs["costs"],
+            supply=inputs["supply"],
+            demand=inputs["demand"],
+            source_names=inputs["source_names"].tolist(),
+            dest_names=inputs["dest_names"].tolist(),
+            allocation=allocation,
+            basis=plan["basis"] if len(plan["basis"]) else None,
+            optimal=bool(run["optimal"]),
+            timings=json.loads(run["timings"]),
+            stats=json.loads(run["stats"]),
+        )
+        return run
+
+    def _lanes(self, run_id):
+        # Non-zero lanes with, next to each name, its occurrence among the run's
+        # suppliers (customers): names saved twice stay two distinct lines.
+        run = self._fetch(run_id, ["inputs", "plan"])
+        plan = _unpack(run["plan"])
+        with np.load(io.BytesIO(run["inputs"])) as inputs:
+            source_names, dest_names = inputs["source_names"], inputs["dest_names"]
+        source_seen = pd.Series(source_names).groupby(source_names).cumcount().to_numpy()
+        dest_seen = pd.Series(dest_names).groupby(dest_names).cumcount().to_numpy()
+        return pd.DataFrame({
+            "Supplier": source_names[plan["rows"]],
+            "Customer": dest_names[plan["cols"]],
+            "Qty": plan["qty"],
+            "Unit Cost": plan["unit_cost"],
+            "supplier_seen": source_seen[plan["rows"]],
+            "customer_seen": dest_seen[plan["cols"]],
+        })
+
+    def lanes(self, run_id):
+        # The run's non-zero lanes by supplier and customer name.
+        return self._lanes(run_id)[["Supplier", "Customer", "Qty", "Unit Cost"]]
+
+    def diff(self, run_a, run_b, changed_only=True):
+        # Lane-by-lane comparison of two saved plans, matched on supplier and
+        # customer names, largest cost change first. A name used more than once
+        # matches the same occurrence in the other run, never every one of them.
+        lanes = self._lanes(run_a).merge(
+            self._lanes(run_b),
+            on=["Supplier", "supplier_seen", "Customer", "customer_seen"],
+            how="outer",
+            suffixes=(" A", " B"),
+        )
+        lanes[["Qty A", "Qty B"]] = lanes[["Qty A", "Qty B"]].fillna(0.0)
+        lanes["Cost A"] = (lanes["Qty A"] * lanes["Unit Cost A"]).fillna(0.0)
+        lanes["Cost B"] = (lanes["Qty B"] * lanes["Unit Cost B"]).fillna(0.0)
+        lanes["Δ Qty"] = lanes["Qty B"] - lanes["Qty A"]
+        lanes["Δ Cost"] = lanes["Cost B"] - lanes["Cost A"]
+        if changed_only:
+            lanes = lanes[(lanes["Δ Qty"] != 0) | (lanes["Unit Cost A"] != lanes["Unit Cost B"])]
+        order = lanes["Δ Cost"].abs().sort_values(ascending=False, kind="stable").index
+        columns = ["Supplier", "Customer", "Qty A", "Qty B", "Δ Qty", "Unit Cost A", "Unit Cost B", "Cost A", "Cost B", "Δ Cost"]
+        return lanes.loc[order, columns].reset_index(drop=True)
+
+    def delete(self, run_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (int(run_id),))